@@ -1,13 +1,14 @@
 import streamlit as st
 from datetime import datetime, timedelta
+import json
 import pandas as pd
 import api_client
-import prediction_engine
-from sqlalchemy import create_engine, text
+import prediction_store
+from metrics import get_shared_metrics
+from prediction_cache import get_shared_prediction_cache
+from prediction_worker import PredictionWorker
+from sqlalchemy import text
 from sqlalchemy.orm import sessionmaker
-import json
-import os
-import hashlib
 
 # --- CONFIGURATION ---
 ALL_LEAGUES = {
@@ -98,37 +99,21 @@ ALL_LEAGUES = {
     "FIFA Club World Cup - Play-In": 1186
 }
 
-# --- CACHE CONFIGURATION ---
-CACHE_FILE = "predictions_cache.json"
-CACHE_DURATION_HOURS = 6  # Cache valide pendant 6 heures
+# Nombre d'appels API simultanés lors du préchargement
+PREFETCH_WORKERS = 8
+
+# Intervalle de rafraîchissement de l'état de la génération (secondes)
+JOB_POLL_SECONDS = 2
 
 # --- DATABASE ---
 @st.cache_resource
 def get_db_engine():
-    """Crée et met en cache le moteur de base de données SQLAlchemy."""
-    return create_engine("sqlite:///predictions.db")
-
-def init_db(engine):
-    """Crée la table de prédictions si elle n'existe pas."""
-    with engine.connect() as connection:
-        connection.execute(text("""
-            CREATE TABLE IF NOT EXISTS predictions (
-                id INTEGER PRIMARY KEY,
-                prediction_ts TIMESTAMP,
-                fixture_id INTEGER UNIQUE,
-                match_desc TEXT,
-                predicted_outcome TEXT,
-                odds_home REAL,
-                odds_draw REAL,
-                odds_away REAL,
-                status TEXT DEFAULT 'PENDING'
-            )
-        """))
-        connection.commit()
+    """Crée et met en cache le moteur de la base des prédictions (schéma migré)."""
+    return prediction_store.create_store_engine()
 
 # --- DATABASE FUNCTIONS ---
 def load_predictions_from_db_for_today(engine):
-    """Charge les prédictions du jour depuis la base de données."""
+    """Charge les prédictions du jour et leurs métadonnées d'affichage depuis la base de données."""
     today_str = datetime.today().strftime('%Y-%m-%d')
     try:
         Session = sessionmaker(bind=engine)
@@ -136,107 +121,58 @@ def load_predictions_from_db_for_today(engine):
             result = session.execute(
                 text("""
                     SELECT fixture_id, match_desc, predicted_outcome, 
-                           odds_home, odds_draw, odds_away, prediction_ts 
+                           odds_home, odds_draw, odds_away, prediction_ts,
+                           league_name, home_team_name, away_team_name, home_logo, away_logo,
+                           kickoff_ts, venue_name, venue_city
                     FROM predictions 
-                    WHERE DATE(prediction_ts) = :today
+                    WHERE prediction_date = :today
+                    ORDER BY league_name IS NULL, league_name, kickoff_ts
                 """),
                 {"today": today_str}
             )
-            predictions = result.fetchall()
+            predictions = result.mappings().fetchall()
             return predictions if predictions else None
     except Exception as e:
         st.error(f"Erreur lors du chargement depuis la DB: {e}")
         return None
 
-def get_fixture_info_for_prediction(fixture_id):
-    """Récupère les infos d'un match depuis l'API (pour l'affichage)."""
-    try:
-        # On fait un seul appel API pour récupérer les infos du match
-        today_str = datetime.today().strftime('%Y-%m-%d')
-        match_date = datetime.strptime(today_str, '%Y-%m-%d')
-        season = match_date.year - 1 if match_date.month < 7 else match_date.year
-        
-        for league_id in ALL_LEAGUES.values():
-            fixtures_data = api_client.get_fixtures_for_date(today_str, league_id, season)
-            if fixtures_data and fixtures_data.get('response'):
-                for fixture in fixtures_data['response']:
-                    if fixture['fixture']['id'] == fixture_id:
-                        return fixture
-        return None
-    except Exception as e:
-        return None
-
-def display_predictions_from_db(db_predictions, engine):
-    """Affiche les prédictions chargées depuis la base de données."""
+def display_predictions_from_db(db_predictions):
+    """Affiche les prédictions chargées depuis la base de données (sans appel API)."""
     st.success(f"🤖 {len(db_predictions)} prédictions générées automatiquement par GitHub Actions !")
     
-    # Organiser par fixture_id pour éviter les doublons
-    predictions_dict = {}
-    for pred in db_predictions:
-        fixture_id = pred[0]
-        if fixture_id not in predictions_dict:
-            predictions_dict[fixture_id] = {
-                'match_desc': pred[1],
-                'predicted_outcome': pred[2],
-                'odds_home': pred[3],
-                'odds_draw': pred[4],
-                'odds_away': pred[5],
-                'prediction_ts': pred[6]
-            }
-    
-    # Récupérer les infos des matchs depuis l'API (une seule fois)
-    with st.spinner("Chargement des informations des matchs..."):
-        today_str = datetime.today().strftime('%Y-%m-%d')
-        all_fixtures = []
-        match_date = datetime.strptime(today_str, '%Y-%m-%d')
-        season = match_date.year - 1 if match_date.month < 7 else match_date.year
-        
-        for league_id in ALL_LEAGUES.values():
-            try:
-                fixtures_data = api_client.get_fixtures_for_date(today_str, league_id, season)
-                if fixtures_data and fixtures_data.get('response'):
-                    all_fixtures.extend(fixtures_data['response'])
-            except Exception as e:
-                continue
-    
     # Organiser par ligue
     fixtures_by_league = {}
-    for fixture in all_fixtures:
-        fixture_id = fixture['fixture']['id']
-        if fixture_id in predictions_dict:
-            league_name = fixture['league']['name']
-            if league_name not in fixtures_by_league:
-                fixtures_by_league[league_name] = []
-            fixtures_by_league[league_name].append({
-                'fixture': fixture,
-                'prediction_data': predictions_dict[fixture_id]
-            })
+    for pred_data in db_predictions:
+        # Les prédictions antérieures aux métadonnées n'ont pas de ligue
+        league_name = pred_data['league_name'] or "Autres matchs"
+        fixtures_by_league.setdefault(league_name, []).append(pred_data)
     
     # Affichage
     for league_name, matches in fixtures_by_league.items():
         st.subheader(f"🏆 {league_name}")
         
-        for match_info in matches:
-            fixture = match_info['fixture']
-            pred_data = match_info['prediction_data']
-            
-            home_team = fixture['teams']['home']['name']
-            away_team = fixture['teams']['away']['name']
+        for pred_data in matches:
+            home_team, _, away_team = pred_data['match_desc'].partition(" vs ")
+            home_team = pred_data['home_team_name'] or home_team
+            away_team = pred_data['away_team_name'] or away_team
             
             with st.container():
                 col1, col2, col3, col4, col5 = st.columns([2, 1, 2, 2, 2])
                 
                 with col1:
-                    st.image(fixture['teams']['home']['logo'], width=50)
+                    if pred_data['home_logo']:
+                        st.image(pred_data['home_logo'], width=50)
                     st.write(f"**{home_team}**")
                 
                 with col2:
                     st.write("**VS**")
-                    match_time = datetime.fromtimestamp(fixture['fixture']['timestamp']).strftime('%H:%M')
-                    st.write(f"🕒 {match_time}")
+                    if pred_data['kickoff_ts']:
+                        match_time = datetime.fromtimestamp(pred_data['kickoff_ts']).strftime('%H:%M')
+                        st.write(f"🕒 {match_time}")
                 
                 with col3:
-                    st.image(fixture['teams']['away']['logo'], width=50)
+                    if pred_data['away_logo']:
+                        st.image(pred_data['away_logo'], width=50)
                     st.write(f"**{away_team}**")
                 
                 with col4:
@@ -252,227 +188,154 @@ def display_predictions_from_db(db_predictions, engine):
                     else:
                         st.write("Non disponibles")
                 
-                st.write(f"**📍 {fixture['fixture']['venue']['name']}, {fixture['fixture']['venue']['city']}**")
+                if pred_data['venue_name']:
+                    st.write(f"**📍 {pred_data['venue_name']}, {pred_data['venue_city']}**")
                 st.caption(f"Prédiction générée à: {datetime.fromisoformat(str(pred_data['prediction_ts'])).strftime('%H:%M:%S')}")
                 
                 st.divider()
 
 # --- CACHE FUNCTIONS (gardées pour fallback) ---
-def get_cache_key():
-    """Génère une clé de cache basée sur la date du jour."""
-    today_str = datetime.today().strftime('%Y-%m-%d')
-    return hashlib.md5(today_str.encode()).hexdigest()
-
 def load_cache():
-    """Charge le cache depuis le fichier."""
-    if not os.path.exists(CACHE_FILE):
-        return None
-    
+    """Charge les prédictions du jour encore valides depuis le cache local."""
     try:
-        with open(CACHE_FILE, 'r', encoding='utf-8') as f:
-            cache_data = json.load(f)
-        
-        # Vérifier si le cache est encore valide
-        cache_time = datetime.fromisoformat(cache_data['timestamp'])
-        if datetime.now() - cache_time > timedelta(hours=CACHE_DURATION_HOURS):
+        prediction_cache = get_shared_prediction_cache()
+        today_str = datetime.today().strftime('%Y-%m-%d')
+        # Une génération interrompue est reprise par le worker
+        if not prediction_cache.is_complete(today_str):
             return None
-        
-        # Vérifier si c'est le même jour
-        cache_key = cache_data.get('cache_key')
-        if cache_key != get_cache_key():
+        data, oldest = prediction_cache.load_day(today_str)
+        if not data:
             return None
-            
-        return cache_data
+        return {'timestamp': datetime.fromtimestamp(oldest).isoformat(), 'data': data}
     except Exception as e:
         st.error(f"Erreur lors du chargement du cache: {e}")
         return None
 
-def save_cache(data):
-    """Sauvegarde les données dans le cache."""
-    try:
-        cache_data = {
-            'timestamp': datetime.now().isoformat(),
-            'cache_key': get_cache_key(),
-            'data': data
-        }
-        with open(CACHE_FILE, 'w', encoding='utf-8') as f:
-            json.dump(cache_data, f, ensure_ascii=False, indent=2)
-    except Exception as e:
-        st.error(f"Erreur lors de la sauvegarde du cache: {e}")
-
-# --- API & DATA (gardées pour fallback) ---
-def load_fixtures_today():
-    """Charge les matchs du jour pour tous les championnats."""
-    today_str = datetime.today().strftime('%Y-%m-%d')
-    all_fixtures = []
-    match_date = datetime.strptime(today_str, '%Y-%m-%d')
-    season = match_date.year - 1 if match_date.month < 7 else match_date.year
-    
-    for league_id in ALL_LEAGUES.values():
-        try:
-            fixtures_data = api_client.get_fixtures_for_date(today_str, league_id, season)
-            if fixtures_data and fixtures_data.get('response'):
-                all_fixtures.extend(fixtures_data['response'])
-        except Exception as e:
-            continue
-    
-    return all_fixtures
-
-def get_prediction_and_odds(fixture):
-    """Génère la prédiction et récupère les cotes pour un match."""
-    try:
-        prediction, analysis_logs = prediction_engine.predict_match(fixture)
-        odds_data = api_client.get_odds(fixture['fixture']['id'], 8)
-        
-        parsed_odds = None
-        if odds_data and odds_data.get('response'):
-            try:
-                bookmaker = odds_data['response'][0]['bookmakers'][0]
-                bet = next((b for b in bookmaker['bets'] if b['name'] == 'Match Winner'), None)
-                if bet:
-                    parsed_odds = {
-                        'home': next((o['odd'] for o in bet['values'] if o['value'] == 'Home'), 'N/A'),
-                        'draw': next((o['odd'] for o in bet['values'] if o['value'] == 'Draw'), 'N/A'),
-                        'away': next((o['odd'] for o in bet['values'] if o['value'] == 'Away'), 'N/A'),
-                    }
-            except (IndexError, KeyError):
-                pass
-        
-        return prediction, parsed_odds, analysis_logs
-    except Exception as e:
-        return "Erreur de prédiction", None, [f"Erreur: {str(e)}"]
+# --- GÉNÉRATION EN ARRIÈRE-PLAN ---
+@st.cache_resource
+def get_prediction_worker():
+    """Worker de génération partagé par toutes les sessions du processus."""
+    return PredictionWorker(api_client.get_data, ALL_LEAGUES.values(), engine=get_db_engine(),
+                            max_workers=PREFETCH_WORKERS)
 
-def process_all_fixtures():
-    """Traite tous les matchs et génère les prédictions."""
-    fixtures_today = load_fixtures_today()
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def render_generation_status(today_str):
+    """Affiche l'état de la génération et les ligues déjà prêtes, sans jamais calculer."""
+    worker = get_prediction_worker()
+    job = worker.jobs.get(today_str)
     
-    if not fixtures_today:
-        return {}
+    if job is None:
+        st.info("⏳ Génération en attente de démarrage...")
+        return
     
-    processed_data = {}
-    total_fixtures = len(fixtures_today)
-    
-    # Progress bar
-    progress_bar = st.progress(0)
-    progress_text = st.empty()
-    
-    for i, fixture in enumerate(fixtures_today):
-        fixture_id = fixture['fixture']['id']
-        league_name = fixture['league']['name']
-        home_team = fixture['teams']['home']['name']
-        away_team = fixture['teams']['away']['name']
-        
-        # Mise à jour de la progress bar
-        progress = (i + 1) / total_fixtures
-        progress_bar.progress(progress)
-        progress_text.text(f"Traitement des matchs: {i + 1}/{total_fixtures} - {home_team} vs {away_team}")
-        
-        # Génération de la prédiction
-        prediction, odds, analysis_logs = get_prediction_and_odds(fixture)
-        
-        # Organisation par ligue
-        if league_name not in processed_data:
-            processed_data[league_name] = []
-        
-        processed_data[league_name].append({
-            'fixture': fixture,
-            'prediction': prediction,
-            'odds': odds,
-            'analysis_logs': analysis_logs
-        })
+    if job['status'] == 'done':
+        # Affichage complet par la page (base de données ou cache)
+        st.rerun()
     
-    progress_bar.empty()
-    progress_text.empty()
+    if job['status'] in ('failed', 'partial'):
+        if job['status'] == 'failed':
+            st.error(f"Erreur lors de la génération des prédictions: {job['error']}")
+        else:
+            st.warning(f"Prédictions partielles : {job['error']}")
+        if st.button("🔁 Relancer la génération"):
+            worker.ensure_started(today_str, retry=True)
+            st.rerun()
+    elif job['leagues_total']:
+        st.progress(job['leagues_done'] / job['leagues_total'],
+                    text=f"Ligues traitées: {job['leagues_done']}/{job['leagues_total']} "
+                         f"({job['fixtures_total']} matchs)")
+    else:
+        st.info("⏳ Chargement des matchs du jour...")
     
-    return processed_data
-
-def save_prediction_to_db(engine, fixture, prediction, odds):
-    """Sauvegarde une prédiction en base de données."""
-    if odds and 'N/A' not in odds.values():
-        try:
-            Session = sessionmaker(bind=engine)
-            with Session() as session:
-                home_team = fixture['teams']['home']['name']
-                away_team = fixture['teams']['away']['name']
-                session.execute(
-                    text('INSERT OR IGNORE INTO predictions (fixture_id, prediction_ts, match_desc, predicted_outcome, odds_home, odds_draw, odds_away) VALUES (:fid, :ts, :desc, :pred, :oh, :od, :oa)'),
-                    [{
-                        "fid": fixture['fixture']['id'], "ts": datetime.now(),
-                        "desc": f"{home_team} vs {away_team}", "pred": prediction,
-                        "oh": float(odds['home']), "od": float(odds['draw']),
-                        "oa": float(odds['away'])
-                    }]
-                )
-                session.commit()
-        except Exception as e:
-            st.error(f"Erreur lors de la sauvegarde: {str(e)}")
+    partial_data, _ = get_shared_prediction_cache().load_day(today_str)
+    if partial_data:
+        display_matches(partial_data)
 
-def display_matches(processed_data, engine):
+def display_matches(processed_data):
     """Affiche tous les matchs avec leurs prédictions (fallback)."""
     total_matches = sum(len(fixtures) for fixtures in processed_data.values())
     st.success(f"{total_matches} matchs trouvés avec prédictions en cache !")
     
     for league_name, fixtures_data in processed_data.items():
-        st.subheader(f"🏆 {league_name}")
+        display_league(league_name, fixtures_data)
+
+def display_league(league_name, fixtures_data):
+    """Affiche la section d'une ligue."""
+    st.subheader(f"🏆 {league_name}")
+    
+    for match_data in fixtures_data:
+        fixture = match_data['fixture']
+        prediction = match_data['prediction']
+        odds = match_data['odds']
+        analysis_logs = match_data['analysis_logs']
+        
+        home_team = fixture['teams']['home']['name']
+        away_team = fixture['teams']['away']['name']
         
-        for match_data in fixtures_data:
-            fixture = match_data['fixture']
-            prediction = match_data['prediction']
-            odds = match_data['odds']
-            analysis_logs = match_data['analysis_logs']
+        # Container pour chaque match
+        with st.container():
+            col1, col2, col3, col4, col5 = st.columns([2, 1, 2, 2, 2])
             
-            home_team = fixture['teams']['home']['name']
-            away_team = fixture['teams']['away']['name']
+            with col1:
+                st.image(fixture['teams']['home']['logo'], width=50)
+                st.write(f"**{home_team}**")
             
-            # Container pour chaque match
-            with st.container():
-                col1, col2, col3, col4, col5 = st.columns([2, 1, 2, 2, 2])
-                
-                with col1:
-                    st.image(fixture['teams']['home']['logo'], width=50)
-                    st.write(f"**{home_team}**")
-                
-                with col2:
-                    st.write("**VS**")
-                    match_time = datetime.fromtimestamp(fixture['fixture']['timestamp']).strftime('%H:%M')
-                    st.write(f"🕒 {match_time}")
-                
-                with col3:
-                    st.image(fixture['teams']['away']['logo'], width=50)
-                    st.write(f"**{away_team}**")
-                
-                with col4:
-                    st.write("**🔮 Prédiction:**")
-                    if "Erreur" in prediction:
-                        st.error(prediction)
-                    else:
-                        st.success(prediction)
-                
-                with col5:
-                    st.write("**💰 Cotes:**")
-                    if odds and 'N/A' not in odds.values():
-                        st.write(f"1: {odds['home']}")
-                        st.write(f"X: {odds['draw']}")
-                        st.write(f"2: {odds['away']}")
-                        
-                        # Sauvegarder en base
-                        save_prediction_to_db(engine, fixture, prediction, odds)
-                    else:
-                        st.write("Non disponibles")
-                
-                st.write(f"**📍 {fixture['fixture']['venue']['name']}, {fixture['fixture']['venue']['city']}**")
-                
-                if st.checkbox(f"Voir l'analyse détaillée", key=f"analysis_{fixture['fixture']['id']}"):
-                    st.text_area("Logs d'analyse", value="\n".join(analysis_logs), height=100, key=f"logs_{fixture['fixture']['id']}")
-                
-                st.divider()
+            with col2:
+                st.write("**VS**")
+                match_time = datetime.fromtimestamp(fixture['fixture']['timestamp']).strftime('%H:%M')
+                st.write(f"🕒 {match_time}")
+            
+            with col3:
+                st.image(fixture['teams']['away']['logo'], width=50)
+                st.write(f"**{away_team}**")
+            
+            with col4:
+                st.write("**🔮 Prédiction:**")
+                if "Erreur" in prediction:
+                    st.error(prediction)
+                else:
+                    st.success(prediction)
+            
+            with col5:
+                st.write("**💰 Cotes:**")
+                if odds and 'N/A' not in odds.values():
+                    st.write(f"1: {odds['home']}")
+                    st.write(f"X: {odds['draw']}")
+                    st.write(f"2: {odds['away']}")
+                else:
+                    st.write("Non disponibles")
+            
+            st.write(f"**📍 {fixture['fixture']['venue']['name']}, {fixture['fixture']['venue']['city']}**")
+            
+            if st.checkbox(f"Voir l'analyse détaillée", key=f"analysis_{fixture['fixture']['id']}"):
+                st.text_area("Logs d'analyse", value="\n".join(analysis_logs), height=100, key=f"logs_{fixture['fixture']['id']}")
+            
+            st.divider()
+
+# --- MÉTRIQUES ---
+def display_metrics_sidebar():
+    """Latences par endpoint et temps par étape du processus Streamlit."""
+    metrics = get_shared_metrics()
+    snapshot = metrics.snapshot()
+    with st.sidebar.expander("📈 Performances API"):
+        if not snapshot['endpoints'] and not snapshot['stages']:
+            st.caption("Aucune mesure pour l'instant.")
+            return
+        if snapshot['endpoints']:
+            st.dataframe(pd.DataFrame.from_dict(snapshot['endpoints'], orient='index')[
+                ['requests', 'latency_p50_ms', 'latency_p95_ms', 'latency_p99_ms', 'bytes', 'errors', 'cache_hit_ratio']
+            ])
+        if snapshot['stages']:
+            st.dataframe(pd.DataFrame.from_dict(snapshot['stages'], orient='index'))
+        st.download_button("JSON", json.dumps(snapshot, indent=2), file_name="metrics.json", mime="application/json")
+        st.download_button("Prometheus", metrics.to_prometheus(), file_name="metrics.prom", mime="text/plain")
 
 # --- MAIN APP ---
 def main():
     st.set_page_config(page_title="Jules' Football Predictor", page_icon="⚽", layout="wide")
     
     engine = get_db_engine()
-    init_db(engine)
+    display_metrics_sidebar()
 
     st.title("🔮 Jules' Football Predictor")
     st.header(f"Matchs du Jour avec Prédictions ({datetime.today().strftime('%d/%m/%Y')})")
@@ -482,7 +345,7 @@ def main():
     
     if db_predictions:
         # ✅ Prédictions trouvées dans la DB (générées par GitHub Actions)
-        display_predictions_from_db(db_predictions, engine)
+        display_predictions_from_db(db_predictions)
         
         # Option pour forcer le rechargement manuel
         if st.button("🔄 Générer de nouvelles prédictions manuellement"):
@@ -497,32 +360,26 @@ def main():
         if cache_data:
             # Cache valide trouvé
             st.info(f"📦 Prédictions chargées depuis le cache local (dernière mise à jour: {datetime.fromisoformat(cache_data['timestamp']).strftime('%H:%M:%S')})")
-            display_matches(cache_data['data'], engine)
+            display_matches(cache_data['data'])
             
             # Option pour forcer le rechargement
             if st.button("🔄 Forcer le rechargement des prédictions"):
                 st.experimental_rerun()
         else:
-            # PRIORITÉ 3 : Génération manuelle (dernier recours)
-            st.warning("⏳ Aucune prédiction trouvée. Génération manuelle en cours...")
+            # PRIORITÉ 3 : Génération en arrière-plan (une seule à la fois, toutes sessions confondues)
+            today_str = datetime.today().strftime('%Y-%m-%d')
+            job = get_prediction_worker().jobs.get(today_str)
+            if job and job['status'] == 'done' and not job['fixtures_total']:
+                st.warning("Aucun match trouvé pour aujourd'hui.")
+                return
             
-            with st.spinner("Chargement des matchs et génération des prédictions..."):
-                try:
-                    processed_data = process_all_fixtures()
-                    
-                    if not processed_data:
-                        st.warning("Aucun match trouvé pour aujourd'hui.")
-                        return
-                    
-                    # Sauvegarder dans le cache
-                    save_cache(processed_data)
-                    st.success("✅ Prédictions générées et mises en cache !")
-                    
-                    # Afficher les résultats
-                    display_matches(processed_data, engine)
-                    
-                except Exception as e:
-                    st.error(f"Erreur lors de la génération des prédictions: {e}")
+            st.warning("⏳ Aucune prédiction trouvée. Génération en arrière-plan en cours...")
+            try:
+                get_prediction_worker().ensure_started(today_str)
+            except Exception as e:
+                st.error(f"Erreur lors du lancement de la génération: {e}")
+                return
+            render_generation_status(today_str)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
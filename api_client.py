@@ -10,11 +10,38 @@ les ligues, équipes, matchs, etc.
 """
 import requests
 from config import API_KEY, BASE_URL
+from http_transport import get_shared_transport
+from quota_manager import get_shared_quota, request_priority
+from response_cache import canonical_h2h, get_shared_cache, make_key
+from singleflight import SingleFlight
 
-def get_data(endpoint, params=None):
+# Requêtes identiques en cours, partagées entre les sessions Streamlit
+_inflight = SingleFlight()
+
+def get_data(endpoint, params=None, priority=None):
     """
     Fonction générique pour faire des appels GET à l'API.
+    Les réponses sont servies depuis le cache disque lorsqu'elles sont valides,
+    et les requêtes identiques simultanées ne font qu'un seul appel.
+    `priority` (quota_manager) remplace la priorité déduite de la requête.
     """
+    cache = get_shared_cache()
+    cached = cache.get(endpoint, params)
+    if cached is not None:
+        return cached
+    
+    data, _ = _inflight.do(make_key(endpoint, params), lambda: _fetch(endpoint, params, priority))
+    return data
+
+def _fetch(endpoint, params, priority=None):
+    """Appel HTTP effectif à l'API (dans la limite du quota), résultat stocké dans le cache."""
+    quota = get_shared_quota()
+    if priority is None:
+        priority = request_priority(endpoint, params)
+    if not quota.acquire(priority):
+        print(f"Appel à l'API refusé pour préserver le quota : {endpoint}")
+        return None
+    
     headers = {
         'x-rapidapi-key': API_KEY,
         'x-rapidapi-host': "api-football-v1.p.rapidapi.com"
@@ -23,9 +50,14 @@ def get_data(endpoint, params=None):
     url = f"{BASE_URL}/{endpoint}"
     
     try:
-        response = requests.get(url, headers=headers, params=params)
+        response, _ = get_shared_transport().get(url, headers=headers, params=params, endpoint=endpoint)
+        quota.record(response.headers)
+        if response.status_code == 429:
+            quota.record_throttled(response.headers.get('retry-after'))
         response.raise_for_status()  # Lève une exception pour les codes d'erreur HTTP
-        return response.json()
+        data = response.json()
+        get_shared_cache().set(endpoint, params, data)
+        return data
     except requests.exceptions.RequestException as e:
         print(f"Erreur lors de l'appel à l'API : {e}")
         return None
@@ -53,8 +85,9 @@ def get_team_statistics(team_id, league_id, season):
 
 def get_head_to_head(team1_id, team2_id):
     """Récupère l'historique des confrontations entre deux équipes."""
-    # L'API attend les IDs des équipes séparés par un tiret
-    h2h_str = f"{team1_id}-{team2_id}"
+    # L'API attend les IDs des équipes séparés par un tiret ; l'ordre
+    # n'a pas d'importance, on utilise une clé canonique
+    h2h_str = canonical_h2h(team1_id, team2_id)
     params = {'h2h': h2h_str}
     return get_data("fixtures/headtohead", params=params)
 
@@ -0,0 +1,94 @@
+# Fichier : api_recording.py
+
+"""
+Enregistrement des réponses de l'API api-football pour les rejouer hors ligne.
+
+Avec la variable d'environnement API_RECORD_PATH, chaque réponse reçue par
+le transport HTTP est ajoutée à un fichier JSON Lines (une réponse par
+ligne : endpoint, paramètres, code HTTP, corps). Une exécution réelle du
+générateur suffit à capturer une journée complète :
+
+    API_RECORD_PATH=recordings/2025-09-01.jsonl python daily_predictions_generator.py
+
+Le fichier est ensuite servi par replay_server.py, sans clé ni quota.
+"""
+import gzip
+import json
+import os
+import threading
+from datetime import date
+
+from response_cache import make_key
+
+RECORD_PATH = os.environ.get('API_RECORD_PATH')
+
+
+def _open(path, mode):
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+class Recorder:
+    """Ajoute les réponses reçues à un fichier d'enregistrement (thread-safe)."""
+
+    def __init__(self, path, recorded_for=None):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if not os.path.exists(path):
+            # Date de la journée enregistrée, utilisée par défaut lors du rejeu
+            self._write({'meta': {'date': (recorded_for or date.today()).isoformat()}})
+
+    def _write(self, entry):
+        with self._lock, _open(self.path, 'a') as f:
+            f.write(json.dumps(entry, ensure_ascii=False, separators=(',', ':')) + '\n')
+
+    def record(self, endpoint, params, status, body):
+        """Enregistre une réponse (`body` : texte brut de la réponse)."""
+        self._write({
+            'endpoint': endpoint,
+            'params': {str(key): str(value) for key, value in (params or {}).items()},
+            'status': status,
+            'body': body,
+        })
+
+
+def load_recording(path):
+    """
+    Charge un enregistrement.
+
+    Returns:
+        tuple[dict, dict]: Les réponses par clé de requête (`make_key`),
+        sous forme (code HTTP, corps), la dernière l'emportant, et les
+        métadonnées de l'enregistrement.
+    """
+    responses = {}
+    meta = {}
+    with _open(path, 'r') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if 'meta' in entry:
+                meta.update(entry['meta'])
+                continue
+            responses[make_key(entry['endpoint'], entry['params'])] = (entry['status'], entry['body'])
+    return responses, meta
+
+
+_shared_recorder = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_recorder():
+    """Retourne l'enregistreur du processus, ou None si API_RECORD_PATH n'est pas défini."""
+    global _shared_recorder
+    if not RECORD_PATH:
+        return None
+    with _shared_lock:
+        if _shared_recorder is None:
+            _shared_recorder = Recorder(RECORD_PATH)
+        return _shared_recorder
@@ -0,0 +1,326 @@
+# Fichier : backtest.py
+
+"""
+Backtest du modèle de prédiction et recherche de ses paramètres.
+
+Les saisons passées sont rejouées match par match à partir de l'entrepôt
+local des matchs terminés (fixtures_warehouse) : la forme et le H2H de
+chaque match ne sont calculés qu'avec les résultats antérieurs à son coup
+d'envoi (batch_features, pas de fuite d'information). Les scores sont
+calculés une fois par saison et par fenêtre de forme ; chaque jeu de
+paramètres ne refait que la décision (decide_batch), en parallèle sur un
+pool de processus.
+
+Mesures par jeu de paramètres, par saison et au total :
+
+- hit_rate : part des issues correctement prédites ;
+- log_loss : la confiance est la probabilité de l'issue prédite, le reste
+  est réparti à parts égales entre les deux autres issues ;
+- roi : mise de 1 sur l'issue prédite, aux cotes enregistrées dans
+  l'historique des prédictions (matchs sans cote exclus).
+
+L'entrepôt ne contient d'abord que la saison en cours : `--ingest` charge
+les saisons demandées (un appel `fixtures?league=&season=` paginé par
+ligue et saison, via le générateur quotidien, donc avec RAPIDAPI_KEY)
+avant de les rejouer.
+
+    python backtest.py --seasons 2023 2024 --ingest --grid
+    python backtest.py --random 500 --workers 4 --output backtest.csv
+"""
+import argparse
+import itertools
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from fixtures_warehouse import get_shared_warehouse
+from history_store import HistoryStore
+from prediction_engine import (CONFIDENCE_SLOPE, FORM_WEIGHT, FORM_WINDOW, H2H_WEIGHT, batch_features,
+                               decide_batch)
+
+# Paramètres actuellement en production
+REFERENCE_PARAMS = {
+    'generator': {'form_weight': 0.7, 'h2h_weight': 0.3, 'margin': 1.5,
+                  'confidence_slope': 0.1, 'form_window': 5},
+    'engine': {'form_weight': FORM_WEIGHT, 'h2h_weight': H2H_WEIGHT, 'margin': 1.0,
+               'confidence_slope': CONFIDENCE_SLOPE, 'form_window': FORM_WINDOW},
+}
+
+PARAM_GRID = {
+    'form_weight': (0.5, 0.6, 0.7, 0.8, 0.9),
+    'h2h_weight': (0.0, 0.1, 0.3, 0.5),
+    'margin': (0.5, 1.0, 1.5, 2.0, 2.5, 3.0),
+    'confidence_slope': (0.05, 0.1, 0.15),
+    'form_window': (3, 5, 8),
+}
+
+# Bornes des tirages aléatoires (réels uniformes, fenêtre de forme entière)
+PARAM_RANGES = {
+    'form_weight': (0.3, 1.0),
+    'h2h_weight': (0.0, 0.8),
+    'margin': (0.0, 4.0),
+    'confidence_slope': (0.02, 0.2),
+    'form_window': (3, 10),
+}
+
+OUTCOMES = ('HOME', 'DRAW', 'AWAY')
+ODDS_COLUMNS = {'HOME': 'odds_home', 'DRAW': 'odds_draw', 'AWAY': 'odds_away'}
+
+# Probabilité minimale retenue pour le log-loss (évite log(0))
+MIN_PROBABILITY = 1e-6
+
+
+# --- Données ---
+
+def ingest_seasons(seasons, league_ids=None, fetch=None, warehouse=None):
+    """
+    Ingère dans l'entrepôt les matchs terminés des saisons et ligues demandées.
+
+    Args:
+        fetch (callable | None): Fonction (endpoint, params) -> dict | None ;
+            par défaut celle du générateur quotidien (clé RAPIDAPI_KEY ou
+            API_FOOTBALL_KEY).
+        league_ids (Iterable[int] | None): Ligues du générateur par défaut.
+
+    Returns:
+        int: Le nombre de matchs ingérés.
+    """
+    warehouse = warehouse or get_shared_warehouse()
+    if fetch is None or league_ids is None:
+        from daily_predictions_generator import DailyPredictionsGenerator
+        api_key = os.environ.get('RAPIDAPI_KEY') or os.environ.get('API_FOOTBALL_KEY')
+        generator = DailyPredictionsGenerator(api_key)
+        fetch = fetch or generator.make_api_request
+        league_ids = league_ids or list(generator.leagues.values())
+    return sum(warehouse.ingest_league_season(fetch, league_id, season)
+               for league_id in league_ids for season in seasons)
+
+
+def load_results(warehouse=None, league_ids=None):
+    """Matchs terminés de l'entrepôt, avec l'issue réelle (HOME/DRAW/AWAY)."""
+    warehouse = warehouse or get_shared_warehouse()
+    results = warehouse.results_frame(league_ids)
+    goals_home = results['goals_home'].to_numpy()
+    goals_away = results['goals_away'].to_numpy()
+    results['actual'] = np.where(goals_home > goals_away, 'HOME', np.where(goals_away > goals_home, 'AWAY', 'DRAW'))
+    return results
+
+
+def load_odds(history=None):
+    """Dernières cotes 1X2 enregistrées pour chaque match de l'historique des prédictions."""
+    history = history or HistoryStore()
+    odds = history.read(columns=['fixture_id', *ODDS_COLUMNS.values()])
+    odds = odds.dropna(subset=['fixture_id']).drop_duplicates('fixture_id', keep='last')
+    return odds.astype({'fixture_id': 'int64'})
+
+
+def season_features(results, odds=None, seasons=None, form_windows=(FORM_WINDOW,)):
+    """
+    Scores point-in-time de chaque match des saisons demandées.
+
+    Returns:
+        dict[int, pd.DataFrame]: Par fenêtre de forme, un match par ligne
+        (league_id, season, home_form, away_form, h2h_score, actual et cotes).
+    """
+    seasons = sorted(set(results['season'].dropna().astype(int))) if seasons is None else sorted(seasons)
+    features = {}
+    for form_window in form_windows:
+        frames = []
+        for season in seasons:
+            matches = results[results['season'] == season]
+            if matches.empty:
+                continue
+            # Les résultats postérieurs sont ignorés par batch_features (merge_asof strict)
+            frames.append(batch_features(matches, results[results['kickoff_ts'] < matches['kickoff_ts'].max()],
+                                         form_window))
+        frame = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=results.columns)
+        if odds is not None:
+            frame = frame.merge(odds, on='fixture_id', how='left')
+        else:
+            frame = frame.assign(**{column: np.nan for column in ODDS_COLUMNS.values()})
+        features[form_window] = frame
+    return features
+
+
+# --- Évaluation ---
+
+def score_predictions(outcome, confidence, actual, odds):
+    """
+    Mesures d'un ensemble de prédictions.
+
+    Args:
+        outcome, actual (np.ndarray): Issues prédites et réelles.
+        confidence (np.ndarray): Probabilité de l'issue prédite.
+        odds (np.ndarray): Cote de l'issue prédite (NaN si inconnue).
+
+    Returns:
+        dict: matches, hit_rate, log_loss, bets, roi.
+    """
+    matches = len(outcome)
+    if not matches:
+        return {'matches': 0, 'hit_rate': np.nan, 'log_loss': np.nan, 'bets': 0, 'roi': np.nan}
+    correct = outcome == actual
+    probability = np.where(correct, confidence, (1 - confidence) / 2)
+    with_odds = ~np.isnan(odds)
+    bets = int(with_odds.sum())
+    profit = np.where(correct, odds - 1, -1.0)[with_odds].sum()
+    return {
+        'matches': matches,
+        'hit_rate': float(correct.mean()),
+        'log_loss': float(-np.log(np.maximum(probability, MIN_PROBABILITY)).mean()),
+        'bets': bets,
+        'roi': float(profit / bets) if bets else np.nan,
+    }
+
+
+def evaluate(features, params):
+    """
+    Rejoue toutes les saisons avec un jeu de paramètres.
+
+    Returns:
+        list[dict]: Une ligne par saison puis une ligne 'all', paramètres inclus.
+    """
+    frame = features[params['form_window']]
+    _, _, outcome, confidence = decide_batch(
+        frame['home_form'].to_numpy(), frame['away_form'].to_numpy(), frame['h2h_score'].to_numpy(),
+        params['form_weight'], params['h2h_weight'], params['margin'], params['confidence_slope']
+    )
+    odds = np.select([outcome == name for name in OUTCOMES],
+                     [frame[ODDS_COLUMNS[name]].to_numpy(dtype=float) for name in OUTCOMES], np.nan)
+    actual = frame['actual'].to_numpy()
+    seasons = frame['season'].to_numpy()
+
+    rows = []
+    for season in np.unique(seasons):
+        mask = seasons == season
+        rows.append({**params, 'season': str(season),
+                     **score_predictions(outcome[mask], confidence[mask], actual[mask], odds[mask])})
+    rows.append({**params, 'season': 'all', **score_predictions(outcome, confidence, actual, odds)})
+    return rows
+
+
+# --- Jeux de paramètres ---
+
+def grid_params(grid=PARAM_GRID):
+    """Toutes les combinaisons de la grille."""
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+def random_params(count, ranges=PARAM_RANGES, seed=None):
+    """`count` tirages uniformes dans les bornes de `ranges`."""
+    rng = random.Random(seed)
+    params = []
+    for _ in range(count):
+        drawn = {name: round(rng.uniform(low, high), 3) for name, (low, high) in ranges.items()
+                 if name != 'form_window'}
+        drawn['form_window'] = rng.randint(*ranges['form_window'])
+        params.append(drawn)
+    return params
+
+
+# --- Exécution parallèle ---
+
+_worker_features = None
+
+
+def _init_worker(features):
+    global _worker_features
+    _worker_features = features
+
+
+def _evaluate_chunk(param_sets):
+    return [row for params in param_sets for row in evaluate(_worker_features, params)]
+
+
+def run_sweep(features, param_sets, workers=None, chunk_size=50):
+    """
+    Évalue tous les jeux de paramètres, répartis par lots sur un pool de processus.
+
+    Returns:
+        pd.DataFrame: Une ligne par (jeu de paramètres, saison), saison 'all' incluse.
+    """
+    workers = workers or os.cpu_count() or 1
+    chunks = [param_sets[start:start + chunk_size] for start in range(0, len(param_sets), chunk_size)]
+    if workers == 1 or len(chunks) == 1:
+        _init_worker(features)
+        rows = [row for chunk in chunks for row in _evaluate_chunk(chunk)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(features,)) as executor:
+            rows = [row for chunk_rows in executor.map(_evaluate_chunk, chunks) for row in chunk_rows]
+    return pd.DataFrame(rows)
+
+
+def backtest(param_sets, seasons=None, league_ids=None, workers=None, warehouse=None, history=None):
+    """
+    Backtest complet : chargement de l'entrepôt et des cotes, scores par
+    saison, puis évaluation des jeux de paramètres (références incluses).
+
+    Returns:
+        pd.DataFrame: Résultats de run_sweep, colonne 'reference' renseignée
+        pour les paramètres en production.
+    """
+    param_sets = list(REFERENCE_PARAMS.values()) + list(param_sets)
+    results = load_results(warehouse, league_ids)
+    odds = load_odds(history)
+    features = season_features(results, odds, seasons, sorted({params['form_window'] for params in param_sets}))
+    report = run_sweep(features, param_sets, workers)
+
+    report['reference'] = None
+    for name, params in REFERENCE_PARAMS.items():
+        mask = np.logical_and.reduce([report[key] == value for key, value in params.items()])
+        report.loc[mask, 'reference'] = name
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest et recherche des paramètres du modèle.")
+    sweep = parser.add_mutually_exclusive_group()
+    sweep.add_argument('--grid', action='store_true', help="Balayage de PARAM_GRID")
+    sweep.add_argument('--random', type=int, default=0, metavar='N', help="N tirages aléatoires")
+    parser.add_argument('--seasons', type=int, nargs='+', default=None, help="Saisons rejouées (toutes par défaut)")
+    parser.add_argument('--leagues', type=int, nargs='+', default=None, help="Ligues rejouées (toutes par défaut)")
+    parser.add_argument('--ingest', action='store_true',
+                        help="Charge d'abord les saisons demandées dans l'entrepôt (appels API)")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--sort', choices=('log_loss', 'hit_rate', 'roi'), default='log_loss')
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--output', help="Fichier CSV de tous les résultats")
+    args = parser.parse_args()
+    if args.ingest and not args.seasons:
+        parser.error("--ingest nécessite --seasons")
+
+    if args.ingest:
+        ingested = ingest_seasons(args.seasons, args.leagues)
+        print(f"{ingested} matchs terminés ingérés ({len(args.seasons)} saisons)")
+
+    if args.grid:
+        param_sets = grid_params()
+    elif args.random:
+        param_sets = random_params(args.random, seed=args.seed)
+    else:
+        param_sets = []
+
+    report = backtest(param_sets, args.seasons, args.leagues, args.workers)
+    if args.output:
+        report.to_csv(args.output, index=False)
+
+    overall = report[report['season'] == 'all'].drop_duplicates(subset=list(PARAM_RANGES))
+    if overall.empty or not overall['matches'].iloc[0]:
+        print("Aucun match terminé dans l'entrepôt pour ces saisons/ligues")
+        return
+    columns = [*PARAM_RANGES, 'matches', 'hit_rate', 'log_loss', 'bets', 'roi']
+    print(f"{overall['matches'].iloc[0]} matchs rejoués, {len(overall)} jeux de paramètres")
+    print("\nParamètres en production :")
+    print(overall[overall['reference'].notna()].set_index('reference')[columns].to_string())
+    print(f"\nMeilleurs jeux ({args.sort}) :")
+    ascending = args.sort == 'log_loss'
+    print(overall.sort_values(args.sort, ascending=ascending)[columns].head(args.top).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+# Fichier : benchmarks/bench_cpu.py
+
+"""
+Microbenchmarks de la partie calcul, sur données synthétiques.
+
+Cas mesurés, pour chaque taille (nombre de matchs ou de lignes d'historique) :
+
+- form_score / h2h_score : _calculate_form_score et _calculate_h2h_score
+  appelés match par match (chemin du générateur et de la page) ;
+- predict_batch : prédiction vectorisée (backtests) ;
+- history_merge / history_summary / history_filter : fusion des sources,
+  bilan (value_counts) et filtres de la page Historique & Bilan.
+
+Les résultats peuvent être comparés à benchmarks/baselines.json : le temps
+de référence est ajusté par une boucle de calibration (vitesse de la
+machine), et un cas plus lent que `--tolerance` fois sa référence fait
+échouer la commande (code de sortie 1), ce qui sert de garde-fou en CI.
+Les cas dont la référence ajustée est sous `--min-time` (quelques
+millisecondes, dominées par le bruit de la machine) sont affichés sans
+être vérifiés.
+
+    python benchmarks/bench_cpu.py --sizes 1000 100000 1000000
+    python benchmarks/bench_cpu.py --sizes 100000 --check
+    python benchmarks/bench_cpu.py --update        # enregistre de nouvelles références
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import prediction_engine  # noqa: E402
+from history_report import filter_predictions, merge_predictions, summarize  # noqa: E402
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines.json')
+DEFAULT_SIZES = (1_000, 100_000, 1_000_000)
+
+# Référence ajustée en deçà de laquelle un cas n'est pas vérifié (secondes)
+MIN_CHECK_SECONDS = 0.01
+
+# Historiques distincts réutilisés en boucle pour les scores match par match
+HISTORY_POOL = 1000
+
+OUTCOMES = np.array(["Victoire Domicile", "Match Nul", "Victoire Extérieur"], dtype=object)
+STATUSES = np.array(['PENDING', 'CORRECT', 'INCORRECT'], dtype=object)
+
+
+# --- Données synthétiques ---
+
+def _api_match(rng, home_id, away_id):
+    return {
+        'teams': {'home': {'id': int(home_id)}, 'away': {'id': int(away_id)}},
+        'goals': {'home': int(rng.integers(0, 5)), 'away': int(rng.integers(0, 4))},
+    }
+
+
+def make_histories(rng, form_window=prediction_engine.FORM_WINDOW):
+    """Pool de (équipe, derniers matchs, confrontations) au format API."""
+    pool = []
+    for index in range(HISTORY_POOL):
+        team_id, rival_id = 2 * index + 1, 2 * index + 2
+        last = {'response': [_api_match(rng, *(rng.permutation([team_id, 10_000 + k]))) for k in range(form_window)]}
+        h2h = {'response': [_api_match(rng, *(rng.permutation([team_id, rival_id]))) for _ in range(4)]}
+        pool.append((team_id, last, h2h))
+    return pool
+
+
+def make_results(rng, size, teams):
+    """Matchs terminés (colonnes de results_frame)."""
+    home = rng.integers(1, teams + 1, size)
+    away = (home + rng.integers(1, teams, size) - 1) % teams + 1
+    return pd.DataFrame({
+        'kickoff_ts': np.sort(rng.integers(1_600_000_000, 1_750_000_000, size)),
+        'home_team_id': home,
+        'away_team_id': away,
+        'goals_home': rng.integers(0, 5, size),
+        'goals_away': rng.integers(0, 4, size),
+    })
+
+
+def make_history_frames(rng, size):
+    """Historique GitHub Actions et base Streamlit (80 % / 20 %, doublons inclus)."""
+    days = pd.to_datetime('2025-01-01') + pd.to_timedelta(rng.integers(0, 365, size), unit='D')
+    frame = pd.DataFrame({
+        'prediction_ts': days,
+        'fixture_id': rng.integers(1, max(size // 2, 2), size),
+        'league_id': rng.integers(1, 60, size),
+        'match_desc': pd.Series(rng.integers(1, 500, size)).map(lambda team: f"Équipe {team} vs Équipe {team + 1}"),
+        'predicted_outcome': OUTCOMES[rng.integers(0, 3, size)],
+        'odds_home': rng.uniform(1.2, 6.0, size).round(2),
+        'odds_draw': rng.uniform(2.5, 4.5, size).round(2),
+        'odds_away': rng.uniform(1.2, 8.0, size).round(2),
+        'status': STATUSES[rng.integers(0, 3, size)],
+    })
+    split = int(size * 0.8)
+    github = frame.iloc[:split].assign(source='GitHub Actions', source_file='data/history')
+    streamlit = frame.iloc[split:].assign(source='Streamlit Local', source_file='predictions.db')
+    return github.reset_index(drop=True), streamlit.reset_index(drop=True)
+
+
+# --- Cas mesurés ---
+
+def _best_of(function, repeats):
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def calibrate():
+    """Temps d'une boucle Python fixe : mesure la vitesse de la machine."""
+    def loop():
+        total = 0
+        for index in range(2_000_000):
+            total += index % 7
+        return total
+    return _best_of(loop, 3)
+
+
+def run_cases(sizes, seed=0):
+    """
+    Mesure chaque cas à chaque taille.
+
+    Returns:
+        dict[str, float]: Meilleur temps (secondes) par cas, clé 'cas[taille]'.
+    """
+    rng = np.random.default_rng(seed)
+    pool = make_histories(rng)
+    results = {}
+    for size in sizes:
+        # Plus de répétitions sur les petites tailles, plus sensibles au bruit
+        repeats = 7 if size <= 10_000 else 3 if size <= 100_000 else 1
+
+        def form_scores():
+            for index in range(size):
+                team_id, last, _ = pool[index % HISTORY_POOL]
+                prediction_engine._calculate_form_score(team_id, last)
+
+        def h2h_scores():
+            for index in range(size):
+                team_id, _, h2h = pool[index % HISTORY_POOL]
+                prediction_engine._calculate_h2h_score(h2h, team_id)
+
+        results[f"form_score[{size}]"] = _best_of(form_scores, repeats)
+        results[f"h2h_score[{size}]"] = _best_of(h2h_scores, repeats)
+
+        teams = max(size // 10, 20)
+        results_df = make_results(rng, size, teams)
+        fixtures_df = pd.DataFrame({
+            'fixture_id': np.arange(size),
+            'kickoff_ts': rng.integers(1_600_000_000, 1_750_000_000, size),
+            'home_team_id': results_df['home_team_id'].to_numpy(),
+            'away_team_id': results_df['away_team_id'].to_numpy(),
+        })
+        results[f"predict_batch[{size}]"] = _best_of(
+            lambda: prediction_engine.predict_batch(fixtures_df, results_df), repeats)
+
+        github, streamlit = make_history_frames(rng, size)
+        merged = merge_predictions([github, streamlit])
+        results[f"history_merge[{size}]"] = _best_of(lambda: merge_predictions([github, streamlit]), repeats)
+        results[f"history_summary[{size}]"] = _best_of(lambda: summarize(merged), repeats)
+        results[f"history_filter[{size}]"] = _best_of(
+            lambda: filter_predictions(merged, 'CORRECT', 'GitHub Actions'), repeats)
+    return results
+
+
+# --- Références ---
+
+def load_baselines(path=BASELINE_PATH):
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def compare(results, calibration, baselines, tolerance, min_time=MIN_CHECK_SECONDS):
+    """
+    Compare les résultats aux références, ajustées à la vitesse de la machine.
+
+    Returns:
+        list[tuple]: (cas, temps, référence ajustée, ratio, régression ?) pour
+        chaque cas ayant une référence ; régression vaut None pour un cas trop
+        court pour être vérifié (référence ajustée sous `min_time`).
+    """
+    scale = calibration / baselines['calibration_s']
+    rows = []
+    for case, seconds in results.items():
+        reference = baselines['cases'].get(case)
+        if reference is None:
+            continue
+        expected = reference * scale
+        ratio = seconds / expected if expected else float('inf')
+        rows.append((case, seconds, expected, ratio, ratio > tolerance if expected >= min_time else None))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmarks du calcul des scores et de l'historique.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES))
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--check', action='store_true', help="Échoue si un cas régresse par rapport aux références")
+    parser.add_argument('--tolerance', type=float, default=2.0,
+                        help="Ratio temps / référence ajustée au-delà duquel un cas régresse")
+    parser.add_argument('--min-time', type=float, default=MIN_CHECK_SECONDS,
+                        help="Référence ajustée (secondes) en deçà de laquelle un cas n'est pas vérifié")
+    parser.add_argument('--update', action='store_true', help="Enregistre les résultats comme références")
+    parser.add_argument('--baselines', default=BASELINE_PATH)
+    parser.add_argument('--output', help="Fichier JSON des résultats")
+    args = parser.parse_args()
+
+    calibration = calibrate()
+    results = run_cases(args.sizes, args.seed)
+    print(f"Calibration: {calibration * 1000:.1f} ms")
+    for case, seconds in results.items():
+        print(f"  {case:<28} {seconds * 1000:>12.2f} ms")
+
+    report = {
+        'calibration_s': calibration,
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'cases': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    if args.update:
+        baselines = load_baselines(args.baselines) or {'cases': {}}
+        # Les tailles non mesurées gardent leur ancienne référence
+        baselines['cases'].update(results)
+        baselines.update({key: value for key, value in report.items() if key != 'cases'})
+        with open(args.baselines, 'w', encoding='utf-8') as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"Références mises à jour dans {args.baselines}")
+
+    if args.check:
+        baselines = load_baselines(args.baselines)
+        if baselines is None:
+            print(f"Aucune référence ({args.baselines}) : lancer d'abord --update")
+            sys.exit(1)
+        regressions = 0
+        print(f"Comparaison aux références (tolérance x{args.tolerance}, "
+              f"cas de moins de {args.min_time * 1000:.0f} ms non vérifiés) :")
+        for case, seconds, expected, ratio, regressed in compare(results, calibration, baselines, args.tolerance,
+                                                                 args.min_time):
+            regressions += bool(regressed)
+            mark = '➖' if regressed is None else '❌' if regressed else '✅'
+            print(f"  {mark} {case:<28} x{ratio:.2f} "
+                  f"({seconds * 1000:.2f} ms, référence ajustée {expected * 1000:.2f} ms)")
+        if regressions:
+            print(f"{regressions} régression(s) détectée(s)")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+# Fichier : benchmarks/bench_generator.py
+
+"""
+Benchmark de bout en bout d'une génération quotidienne, hors ligne.
+
+Un serveur de rejeu (replay_server.py) sert un enregistrement de l'API ;
+chaque exécution part d'un répertoire vide (cache, entrepôt, historique)
+dans un processus séparé, comme une exécution GitHub Actions. Mesures :
+temps total, appels API par prédiction, temps par étape, mémoire de pointe
+(tracemalloc, sur une exécution dédiée pour ne pas fausser les temps).
+
+    python benchmarks/bench_generator.py --runs 3 --latency-ms 80
+    python benchmarks/bench_generator.py --recording recordings/2025-09-01.jsonl --path worker --output bench.json
+
+Chemins mesurés : `generator` (DailyPredictionsGenerator.run) et `worker`
+(génération de la page Streamlit, PredictionWorker.generate via api_client).
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.synthetic_recording import build_synthetic_recording  # noqa: E402
+from replay_server import ReplayServer  # noqa: E402
+
+
+def _run_once(path, base_url, day, workdir, max_workers, trace_memory, results):
+    """Une génération complète dans un processus neuf (exécuté par multiprocessing)."""
+    os.chdir(workdir)
+    os.environ['API_BASE_URL'] = base_url
+    sys.path.insert(0, ROOT)
+
+    import logging
+    import resource
+    import tracemalloc
+
+    import daily_predictions_generator
+    from metrics import get_shared_metrics
+    logging.getLogger().setLevel(logging.WARNING)
+
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    if path == 'generator':
+        generator = daily_predictions_generator.DailyPredictionsGenerator('replay', max_workers=max_workers)
+        generator.today = day
+        generator.run()
+        predictions = generator.stats['total_predictions_generated']
+    else:
+        import api_client
+        import prediction_store
+        from prediction_worker import PredictionWorker
+        leagues = daily_predictions_generator.DailyPredictionsGenerator('replay').leagues.values()
+        worker = PredictionWorker(api_client.get_data, leagues, engine=prediction_store.create_store_engine(),
+                                  max_workers=max_workers)
+        processed = worker.generate(day.isoformat())
+        predictions = sum(len(matches) for matches in processed.values())
+    wall = time.perf_counter() - start
+
+    result = {
+        'wall_s': wall,
+        'predictions': predictions,
+        'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'stages': get_shared_metrics().snapshot()['stages'],
+    }
+    if trace_memory:
+        result['peak_traced_mb'] = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+        tracemalloc.stop()
+    results.put(result)
+
+
+def run_benchmark(recording, path='generator', runs=3, day=None, max_workers=8, latency_ms=0.0,
+                  jitter_ms=0.0, error_rate=0.0, throttle_rate=0.0, seed=1):
+    """
+    Exécute `runs` générations chronométrées puis une génération sous tracemalloc.
+
+    Returns:
+        dict: Les mesures de chaque exécution et leur synthèse.
+    """
+    server = ReplayServer(recording, latency_ms=latency_ms, jitter_ms=jitter_ms, error_rate=error_rate,
+                          throttle_rate=throttle_rate, quota=1_000_000, seed=seed).start()
+    day = day or date.fromisoformat(server.meta['date'])
+    context = multiprocessing.get_context('spawn')
+    measures = []
+    try:
+        for index in range(runs + 1):
+            trace_memory = index == runs
+            server.reset_stats()
+            with tempfile.TemporaryDirectory(prefix='bench-') as workdir:
+                results = context.Queue()
+                process = context.Process(target=_run_once, args=(path, server.url, day, workdir, max_workers,
+                                                                   trace_memory, results))
+                process.start()
+                result = results.get()
+                process.join()
+            result.update({f"server_{key}": value for key, value in server.stats.items()})
+            result['api_calls'] = server.stats['requests']
+            result['calls_per_prediction'] = (result['api_calls'] / result['predictions']
+                                              if result['predictions'] else None)
+            result['traced'] = trace_memory
+            measures.append(result)
+    finally:
+        server.stop()
+
+    timed = [measure for measure in measures if not measure['traced']]
+    walls = [measure['wall_s'] for measure in timed]
+    return {
+        'path': path,
+        'recording': recording,
+        'date': day.isoformat(),
+        'settings': {'runs': runs, 'max_workers': max_workers, 'latency_ms': latency_ms, 'jitter_ms': jitter_ms,
+                     'error_rate': error_rate, 'throttle_rate': throttle_rate},
+        'summary': {
+            'wall_median_s': statistics.median(walls),
+            'wall_min_s': min(walls),
+            'predictions': timed[-1]['predictions'],
+            'api_calls': timed[-1]['api_calls'],
+            'calls_per_prediction': timed[-1]['calls_per_prediction'],
+            'replay_misses': timed[-1]['server_misses'],
+            'peak_traced_mb': measures[-1]['peak_traced_mb'],
+            'max_rss_mb': max(measure['max_rss_mb'] for measure in timed),
+        },
+        'runs': measures,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark hors ligne d'une génération quotidienne.")
+    parser.add_argument('--recording', help="Enregistrement à rejouer (synthétique si absent)")
+    parser.add_argument('--path', choices=('generator', 'worker'), default='generator')
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--date', type=date.fromisoformat, default=None,
+                        help="Journée simulée (date de l'enregistrement par défaut)")
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--latency-ms', type=float, default=50.0)
+    parser.add_argument('--jitter-ms', type=float, default=10.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--throttle-rate', type=float, default=0.0)
+    parser.add_argument('--fixtures-per-league', type=int, default=6,
+                        help="Taille de la journée synthétique")
+    parser.add_argument('--output', help="Fichier JSON des résultats")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='recording-') as tmp:
+        recording = args.recording
+        if recording is None:
+            recording = os.path.join(tmp, 'synthetic.jsonl')
+            build_synthetic_recording(recording, fixtures_per_league=args.fixtures_per_league)
+        report = run_benchmark(recording, path=args.path, runs=args.runs, day=args.date,
+                               max_workers=args.workers, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                               error_rate=args.error_rate, throttle_rate=args.throttle_rate)
+
+    summary = report['summary']
+    print(f"Chemin: {report['path']} — journée du {report['date']}, {args.runs} exécutions")
+    print(f"  Temps total: médiane {summary['wall_median_s']:.2f}s, min {summary['wall_min_s']:.2f}s")
+    print(f"  Prédictions: {summary['predictions']}, appels API: {summary['api_calls']} "
+          f"({summary['calls_per_prediction'] or 0:.2f} par prédiction, {summary['replay_misses']} hors enregistrement)")
+    print(f"  Mémoire: pic tracemalloc {summary['peak_traced_mb']:.1f} Mo, RSS max {summary['max_rss_mb']:.1f} Mo")
+    for stage, stats in report['runs'][0]['stages'].items():
+        print(f"  Étape {stage}: {stats['seconds']:.2f}s")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+# Fichier : benchmarks/synthetic_recording.py
+
+"""
+Enregistrement synthétique d'une journée, au format d'api_recording.
+
+Permet de lancer les benchmarks sans avoir capturé de vraie journée :
+pour chaque ligue, une saison de matchs terminés entre équipes fictives,
+les matchs du jour, les derniers matchs de chaque équipe, les
+confrontations directes et les cotes paginées. Les données sont
+déterministes pour une graine donnée.
+
+    python benchmarks/synthetic_recording.py recordings/synthetic.jsonl --fixtures-per-league 6
+"""
+import argparse
+import json
+import os
+import random
+import sys
+from datetime import date, datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api_recording import Recorder  # noqa: E402
+from bulk_loader import ODDS_PAGE_SIZE  # noqa: E402
+from fixtures_warehouse import season_for  # noqa: E402
+from response_cache import canonical_h2h  # noqa: E402
+
+# Ligues du générateur quotidien
+LEAGUE_IDS = (2, 3, 39, 40, 61, 62, 78, 79, 88, 94, 135, 136, 140, 141, 144, 253, 262)
+
+DEFAULT_DAY = date(2025, 9, 1)
+
+
+def _fixture(fixture_id, league_id, season, kickoff, home_id, away_id, goals=None):
+    finished = goals is not None
+    return {
+        'fixture': {
+            'id': fixture_id,
+            'timestamp': int(kickoff.timestamp()),
+            'date': kickoff.isoformat(),
+            'venue': {'name': f"Stade {home_id}", 'city': f"Ville {home_id}"},
+            'status': {'short': 'FT' if finished else 'NS'},
+        },
+        'league': {'id': league_id, 'name': f"Ligue {league_id}", 'season': season},
+        'teams': {
+            'home': {'id': home_id, 'name': f"Équipe {home_id}", 'logo': f"https://media.example/teams/{home_id}.png"},
+            'away': {'id': away_id, 'name': f"Équipe {away_id}", 'logo': f"https://media.example/teams/{away_id}.png"},
+        },
+        'goals': {'home': goals[0] if finished else None, 'away': goals[1] if finished else None},
+    }
+
+
+def _page(items, current=1, total=1):
+    return json.dumps({'errors': [], 'results': len(items), 'paging': {'current': current, 'total': total},
+                       'response': items}, ensure_ascii=False, separators=(',', ':'))
+
+
+def _odds_entry(fixture_id, rng):
+    home, draw, away = (round(rng.uniform(1.3, 6.0), 2) for _ in range(3))
+    return {
+        'fixture': {'id': fixture_id},
+        'bookmakers': [{'id': 8, 'name': 'Bet365', 'bets': [{'id': 1, 'name': 'Match Winner', 'values': [
+            {'value': 'Home', 'odd': str(home)}, {'value': 'Draw', 'odd': str(draw)}, {'value': 'Away', 'odd': str(away)},
+        ]}]}],
+    }
+
+
+def build_synthetic_recording(path, day=DEFAULT_DAY, league_ids=LEAGUE_IDS, fixtures_per_league=6,
+                              teams_per_league=20, past_rounds=12, form_window=5, seed=42):
+    """
+    Écrit l'enregistrement d'une journée synthétique.
+
+    Returns:
+        int: Le nombre de matchs du jour.
+    """
+    rng = random.Random(seed)
+    if os.path.exists(path):
+        os.remove(path)
+    recorder = Recorder(path, recorded_for=day)
+    start_of_day = datetime.combine(day, datetime.min.time(), tzinfo=timezone.utc)
+    season = season_for(day)
+
+    today_fixtures = []
+    history = {}
+    next_id = 1_000_000
+    for league_id in league_ids:
+        teams = [league_id * 1000 + index for index in range(1, teams_per_league + 1)]
+
+        # Saison en cours : une journée de championnat par semaine avant le jour simulé
+        season_fixtures = []
+        for round_index in range(past_rounds, 0, -1):
+            kickoff = start_of_day - timedelta(days=7 * round_index) + timedelta(hours=15)
+            shuffled = rng.sample(teams, len(teams))
+            for home_id, away_id in zip(shuffled[::2], shuffled[1::2]):
+                next_id += 1
+                fixture = _fixture(next_id, league_id, season, kickoff, home_id, away_id,
+                                   (rng.randint(0, 4), rng.randint(0, 3)))
+                season_fixtures.append(fixture)
+                for team_id in (home_id, away_id):
+                    history.setdefault(team_id, []).append(fixture)
+        recorder.record('fixtures', {'league': league_id, 'season': season}, 200, _page(season_fixtures))
+        if day.year != season:
+            recorder.record('fixtures', {'league': league_id, 'season': day.year}, 200, _page([]))
+
+        shuffled = rng.sample(teams, len(teams))
+        for slot, (home_id, away_id) in enumerate(list(zip(shuffled[::2], shuffled[1::2]))[:fixtures_per_league]):
+            next_id += 1
+            kickoff = start_of_day + timedelta(hours=12 + 2 * (slot % 5))
+            today_fixtures.append(_fixture(next_id, league_id, season, kickoff, home_id, away_id))
+
+    recorder.record('fixtures', {'date': day.isoformat()}, 200, _page(today_fixtures))
+
+    for team_id, fixtures in history.items():
+        last = sorted(fixtures, key=lambda fixture: fixture['fixture']['timestamp'], reverse=True)[:form_window]
+        recorder.record('fixtures', {'team': team_id, 'last': form_window}, 200, _page(last))
+
+    for fixture in today_fixtures:
+        home_id = fixture['teams']['home']['id']
+        away_id = fixture['teams']['away']['id']
+        meetings = [past for past in history.get(home_id, [])
+                    if {past['teams']['home']['id'], past['teams']['away']['id']} == {home_id, away_id}]
+        recorder.record('fixtures/headtohead', {'h2h': canonical_h2h(home_id, away_id)}, 200, _page(meetings))
+
+    entries = [_odds_entry(fixture['fixture']['id'], rng) for fixture in today_fixtures]
+    total_pages = max(1, -(-len(entries) // ODDS_PAGE_SIZE))
+    for page in range(1, total_pages + 1):
+        params = {'date': day.isoformat(), 'bookmaker': 8}
+        if page > 1:
+            params['page'] = page
+        chunk = entries[(page - 1) * ODDS_PAGE_SIZE:page * ODDS_PAGE_SIZE]
+        recorder.record('odds', params, 200, _page(chunk, page, total_pages))
+    for entry in entries:
+        recorder.record('odds', {'fixture': entry['fixture']['id'], 'bookmaker': 8}, 200, _page([entry]))
+
+    return len(today_fixtures)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Crée un enregistrement synthétique d'une journée.")
+    parser.add_argument('path')
+    parser.add_argument('--date', type=date.fromisoformat, default=DEFAULT_DAY)
+    parser.add_argument('--fixtures-per-league', type=int, default=6)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    count = build_synthetic_recording(args.path, args.date, fixtures_per_league=args.fixtures_per_league,
+                                      seed=args.seed)
+    print(f"{count} matchs du {args.date} enregistrés dans {args.path}")
+
+
+if __name__ == "__main__":
+    main()
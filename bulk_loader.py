@@ -0,0 +1,151 @@
+# Fichier : bulk_loader.py
+
+"""
+Chargement groupé des données de l'API api-football.
+
+Plutôt qu'un appel par ligue, les matchs d'une journée sont récupérés en
+une seule requête `fixtures?date=` (éventuellement paginée) puis filtrés
+localement sur les ligues suivies. Les fonctions reçoivent la fonction
+d'appel à utiliser (`api_client.get_data` côté Streamlit,
+`DailyPredictionsGenerator.make_api_request` côté GitHub Actions) ; une
+priorité de quota donnée est transmise à cette fonction (argument
+`priority`), sinon elle est déduite de la requête.
+"""
+from metrics import get_shared_metrics
+
+
+def _call(fetch, endpoint, params, priority=None):
+    if priority is None:
+        return fetch(endpoint, params)
+    return fetch(endpoint, params, priority=priority)
+
+
+def fetch_all_pages(fetch, endpoint, params, priority=None):
+    """
+    Récupère toutes les pages d'un endpoint paginé.
+
+    Args:
+        fetch (callable): Fonction (endpoint, params) -> dict | None.
+        endpoint (str): Endpoint de l'API.
+        params (dict): Paramètres de la requête (sans 'page').
+        priority (int | None): Priorité de quota (quota_manager).
+
+    Returns:
+        list[dict]: La concaténation des 'response' de toutes les pages.
+    """
+    results = []
+    page = 1
+    while True:
+        page_params = dict(params)
+        if page > 1:
+            page_params['page'] = page
+        data = _call(fetch, endpoint, page_params, priority)
+        if not data or not data.get('response'):
+            break
+        results.extend(data['response'])
+
+        paging = data.get('paging') or {}
+        if page >= paging.get('total', 1):
+            break
+        page += 1
+    return results
+
+
+def load_fixtures_for_date(fetch, date_str, league_ids=None, priority=None):
+    """
+    Charge tous les matchs d'une date en un seul appel et les filtre par ligue.
+
+    Args:
+        fetch (callable): Fonction (endpoint, params) -> dict | None.
+        date_str (str): Date au format YYYY-MM-DD.
+        league_ids (Iterable[int] | None): Ligues à conserver (toutes si None).
+        priority (int | None): Priorité de quota (journée à prédire ou rattrapage).
+
+    Returns:
+        list[dict]: Les matchs du jour des ligues demandées.
+    """
+    fixtures = fetch_all_pages(fetch, 'fixtures', {'date': date_str}, priority)
+    if league_ids is None:
+        return fixtures
+
+    wanted = set(league_ids)
+    return [fixture for fixture in fixtures if fixture['league']['id'] in wanted]
+
+
+# Nombre d'entrées par page renvoyées par l'endpoint odds
+ODDS_PAGE_SIZE = 10
+
+_ODDS_KEYS = {'Home': 'home', 'Draw': 'draw', 'Away': 'away'}
+
+
+def parse_match_winner(odds_entry, bookmaker_id=None):
+    """
+    Extrait les cotes 1X2 ("Match Winner") d'une entrée de l'endpoint odds.
+
+    Returns:
+        dict | None: {'home', 'draw', 'away'} (None pour une valeur absente),
+        ou None si le marché n'est pas proposé.
+    """
+    bookmakers = odds_entry.get('bookmakers') or []
+    if not bookmakers:
+        return None
+    bookmaker = next((b for b in bookmakers if b.get('id') == bookmaker_id), bookmakers[0])
+
+    for bet in bookmaker.get('bets', []):
+        if bet.get('name') == 'Match Winner':
+            parsed = {'home': None, 'draw': None, 'away': None}
+            for value in bet.get('values', []):
+                key = _ODDS_KEYS.get(value.get('value'))
+                if key:
+                    parsed[key] = value.get('odd')
+            return parsed
+    return None
+
+
+def load_odds_table(fetch, date_str, bookmaker_id, fixture_ids):
+    """
+    Charge les cotes 1X2 d'une journée via l'endpoint paginé `odds?date=`.
+
+    Si la journée compte plus de pages que de matchs recherchés, les pages
+    restantes ne sont pas chargées et les matchs manquants sont demandés
+    individuellement (`odds?fixture=`), ce qui coûte alors moins d'appels.
+
+    Returns:
+        dict[int, dict]: Cotes 1X2 par fixture_id (matchs demandés uniquement).
+    """
+    wanted = set(fixture_ids)
+    if not wanted:
+        return {}
+    with get_shared_metrics().stage('odds'):
+        return _load_odds_table(fetch, date_str, bookmaker_id, wanted)
+
+
+def _load_odds_table(fetch, date_str, bookmaker_id, wanted):
+    table = {}
+
+    def collect(entries):
+        for entry in entries:
+            fixture_id = entry['fixture']['id']
+            if fixture_id in wanted:
+                parsed = parse_match_winner(entry, bookmaker_id)
+                if parsed:
+                    table[fixture_id] = parsed
+
+    params = {'date': date_str, 'bookmaker': bookmaker_id}
+    first_page = fetch('odds', params)
+    if not first_page:
+        return table
+    collect(first_page.get('response') or [])
+
+    total_pages = (first_page.get('paging') or {}).get('total', 1)
+    if total_pages - 1 <= len(wanted - set(table)):
+        for page in range(2, total_pages + 1):
+            data = fetch('odds', dict(params, page=page))
+            if data:
+                collect(data.get('response') or [])
+    else:
+        for fixture_id in sorted(wanted - set(table)):
+            data = fetch('odds', {'fixture': fixture_id, 'bookmaker': bookmaker_id})
+            if data:
+                collect(data.get('response') or [])
+    return table
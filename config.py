@@ -2,6 +2,8 @@
 
 # Fichier de configuration
 
+import os
+
 import streamlit as st
 
 # Clé API pour api-football
@@ -13,9 +15,9 @@ except FileNotFoundError:
     # lors d'un premier lancement local, mais les appels API échoueront.
     API_KEY = "VOTRE_CLE_API_MANQUANTE"
 
-# URL de base de l'API v3
+# URL de base de l'API v3 (API_BASE_URL permet de viser un serveur de rejeu local)
 API_HOST = "api-football-v1.p.rapidapi.com"
-BASE_URL = f"https://{API_HOST}/v3"
+BASE_URL = os.environ.get('API_BASE_URL', f"https://{API_HOST}/v3")
 
 # ID du bookmaker à utiliser pour les cotes (Bet365)
 BOOKMAKER_ID = 8
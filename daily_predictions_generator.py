@@ -4,15 +4,32 @@ Générateur automatique de prédictions quotidiennes
 Utilise le même moteur que Streamlit mais sauvegarde dans des fichiers CSV
 """
 
+import argparse
+import copy
 import os
 import sys
 import requests
 import pandas as pd
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, date, timedelta
 import json
 from typing import Dict, List, Optional
 
+from bulk_loader import load_fixtures_for_date, parse_match_winner
+from fixtures_warehouse import get_shared_warehouse
+from history_store import HistoryStore
+from http_transport import get_shared_transport
+from metrics import get_shared_metrics
+from prefetch_planner import PrefetchedData, build_plan, execute_plan, fixtures_within_budget
+from quota_manager import (PRIORITY_CRITICAL, PRIORITY_NORMAL, get_shared_quota, prioritize_fixtures,
+                           request_priority)
+from rate_limiter import RateLimiter
+from ratings import USE_RATINGS, get_shared_ratings
+from response_cache import canonical_h2h, get_shared_cache, make_key
+from singleflight import SingleFlight
+
 # Configuration du logging
 logging.basicConfig(
     level=logging.INFO,
@@ -27,9 +44,9 @@ logger = logging.getLogger(__name__)
 class DailyPredictionsGenerator:
     """Générateur de prédictions quotidiennes pour GitHub Actions"""
     
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, max_workers: Optional[int] = None, target_date: Optional[date] = None):
         self.api_key = api_key
-        self.base_url = "https://api-football-v1.p.rapidapi.com/v3"
+        self.base_url = os.environ.get('API_BASE_URL', "https://api-football-v1.p.rapidapi.com/v3")
         self.headers = {
             'x-rapidapi-host': 'api-football-v1.p.rapidapi.com',
             'x-rapidapi-key': self.api_key
@@ -56,8 +73,39 @@ class DailyPredictionsGenerator:
             "Liga MX": 262
         }
         
-        self.today = date.today()
-        self.predictions_folder = "data/predictions"
+        # Journée traitée (aujourd'hui par défaut, ou une date passée/future)
+        self.today = target_date or date.today()
+        self.history = HistoryStore()
+        
+        # Nombre de matchs traités en parallèle (1 = mode séquentiel)
+        self.max_workers = max_workers or int(os.environ.get('PREDICTION_WORKERS', 8))
+        
+        # Nombre de journées générées en parallèle sur une plage de dates
+        self.parallel_days = int(os.environ.get('PREDICTION_PARALLEL_DAYS', 3))
+        
+        # Session HTTP poolée partagée (keep-alive), dimensionnée sur la concurrence
+        self.transport = get_shared_transport(pool_size=self.max_workers)
+        
+        # Limites RapidAPI par seconde et par minute
+        self.rate_limiter = RateLimiter()
+        
+        # Quota RapidAPI restant (en-têtes de réponse), partagé entre processus
+        self.quota = get_shared_quota()
+        
+        # Cache disque des réponses API (persistant entre les exécutions)
+        self.cache = get_shared_cache()
+        
+        # Fusion des requêtes identiques en cours entre les workers
+        self.inflight = SingleFlight()
+        
+        # Entrepôt local des matchs terminés (forme et H2H sans appel API)
+        self.warehouse = get_shared_warehouse()
+        
+        # Latences par endpoint et temps par étape (exportés en fin d'exécution)
+        self.metrics = get_shared_metrics()
+        
+        # Classements Elo tirés de l'entrepôt (PREDICTION_USE_RATINGS=1), chargés après sa mise à jour
+        self.ratings = None
         
         # Statistiques
         self.stats = {
@@ -65,29 +113,88 @@ class DailyPredictionsGenerator:
             'total_matches_found': 0,
             'total_predictions_generated': 0,
             'api_calls': 0,
-            'failed_requests': 0
+            'failed_requests': 0,
+            'new_connections': 0,
+            'connect_time': 0.0,
+            'cache_hits': 0,
+            'cache_misses': 0,
+            'coalesced_requests': 0,
+            'history_local': 0,
+            'history_api': 0,
+            'quota_refused': 0,
+            'skipped_fixtures': 0
         }
+        self._stats_lock = threading.Lock()
+    
+    def for_date(self, target_date: date) -> 'DailyPredictionsGenerator':
+        """
+        Générateur d'une autre journée partageant les ressources de celui-ci
+        (rate limiter, quota, cache, fusion des requêtes, entrepôt, session HTTP),
+        avec ses propres statistiques.
+        """
+        day = copy.copy(self)
+        day.today = target_date
+        day.stats = {key: type(value)() for key, value in self.stats.items()}
+        day._stats_lock = threading.Lock()
+        return day
+    
+    def _incr_stat(self, key: str, value: float = 1) -> float:
+        """Incrémente un compteur de self.stats de façon thread-safe"""
+        with self._stats_lock:
+            self.stats[key] += value
+            return self.stats[key]
     
-    def make_api_request(self, endpoint: str, params: Dict) -> Optional[Dict]:
-        """Effectue une requête à l'API avec gestion d'erreurs"""
+    def make_api_request(self, endpoint: str, params: Dict, priority: Optional[int] = None) -> Optional[Dict]:
+        """Effectue une requête à l'API avec gestion d'erreurs (via le cache disque), à la priorité donnée"""
+        cached = self.cache.get(endpoint, params)
+        if cached is not None:
+            self._incr_stat('cache_hits')
+            return cached
+        self._incr_stat('cache_misses')
+        
+        data, shared = self.inflight.do(make_key(endpoint, params), lambda: self._fetch(endpoint, params, priority))
+        if shared:
+            self._incr_stat('coalesced_requests')
+        return data
+    
+    def _fetch(self, endpoint: str, params: Dict, priority: Optional[int] = None) -> Optional[Dict]:
+        """Appel HTTP effectif à l'API (rate limité, dans la limite du quota), résultat stocké dans le cache"""
         url = f"{self.base_url}/{endpoint}"
-        self.stats['api_calls'] += 1
+        if priority is None:
+            priority = request_priority(endpoint, params)
+        if not self.quota.acquire(priority):
+            logger.warning(f"🚫 Appel refusé pour préserver le quota: {endpoint} {params}")
+            self._incr_stat('quota_refused')
+            return None
+        self.rate_limiter.acquire()
+        call_number = self._incr_stat('api_calls')
         
         try:
-            logger.debug(f"API Request #{self.stats['api_calls']}: {endpoint}")
-            response = requests.get(url, headers=self.headers, params=params)
+            response, connect_time = self.transport.get(url, headers=self.headers, params=params, endpoint=endpoint)
+            
+            if connect_time is not None:
+                self._incr_stat('new_connections')
+                self._incr_stat('connect_time', connect_time)
+                logger.debug(f"API Request #{call_number}: {endpoint} (nouvelle connexion: {connect_time * 1000:.0f} ms)")
+            else:
+                logger.debug(f"API Request #{call_number}: {endpoint} (connexion réutilisée)")
+            
+            self.quota.record(response.headers)
+            if response.status_code == 429:
+                self.quota.record_throttled(response.headers.get('retry-after'))
             
             if response.status_code == 200:
                 data = response.json()
+                self.cache.set(endpoint, params, data)
                 return data
             else:
                 logger.error(f"❌ Erreur HTTP {response.status_code}: {response.text}")
-                self.stats['failed_requests'] += 1
+                self._incr_stat('failed_requests')
                 return None
                 
         except requests.exceptions.RequestException as e:
             logger.error(f"❌ Erreur de requête: {e}")
-            self.stats['failed_requests'] += 1
+            self._incr_stat('failed_requests')
             return None
     
     def get_fixtures_for_date(self, date_str: str, league_id: int, season: int) -> Optional[Dict]:
@@ -101,8 +208,8 @@ class DailyPredictionsGenerator:
         return self.make_api_request('fixtures', params)
     
     def get_head_to_head(self, team1_id: int, team2_id: int) -> Optional[Dict]:
-        """Récupère l'historique des confrontations"""
-        h2h_str = f"{team1_id}-{team2_id}"
+        """Récupère l'historique des confrontations (clé indépendante de l'ordre des équipes)"""
+        h2h_str = canonical_h2h(team1_id, team2_id)
         params = {'h2h': h2h_str}
         return self.make_api_request('fixtures/headtohead', params)
     
@@ -111,10 +218,49 @@ class DailyPredictionsGenerator:
         params = {'fixture': fixture_id, 'bookmaker': bookmaker_id}
         return self.make_api_request('odds', params)
     
-    def calculate_form_score(self, team_id: int) -> float:
-        """Calcule le score de forme d'une équipe (derniers 5 matchs)"""
+    def _history_cutoff_ts(self) -> int:
+        """Timestamp de début de journée : l'historique utilisé s'arrête la veille"""
+        return int(datetime.combine(self.today, datetime.min.time()).timestamp())
+    
+    def get_team_history(self, team_id: int, n: int = 5) -> Optional[Dict]:
+        """Derniers matchs d'une équipe, depuis l'entrepôt local si possible, sinon l'API"""
+        if self.warehouse.covers_form(team_id, n, before_ts=self._history_cutoff_ts()):
+            self._incr_stat('history_local')
+            return self.warehouse.last_n_fixtures(team_id, n, before_ts=self._history_cutoff_ts())
+        self._incr_stat('history_api')
+        return self.get_team_last_fixtures(team_id, n)
+    
+    def get_head_to_head_history(self, home_team_id: int, away_team_id: int) -> Optional[Dict]:
+        """Confrontations entre deux équipes, depuis l'entrepôt local si la paire est couverte, sinon l'API"""
+        if self.warehouse.covers_head_to_head(home_team_id, away_team_id, before_ts=self._history_cutoff_ts()):
+            self._incr_stat('history_local')
+            return self.warehouse.head_to_head(home_team_id, away_team_id, before_ts=self._history_cutoff_ts())
+        self._incr_stat('history_api')
+        h2h_data = self.get_head_to_head(home_team_id, away_team_id)
+        self.warehouse.record_head_to_head(home_team_id, away_team_id, h2h_data)
+        return h2h_data
+    
+    def sync_warehouse(self, until: Optional[date] = None) -> None:
+        """Ingère dans l'entrepôt local les matchs terminés manquants jusqu'à la veille (ou `until`)"""
+        # Pas de matchs terminés à ingérer après hier
+        until = min(until or self.today - timedelta(days=1), date.today() - timedelta(days=1))
+        try:
+            with self.metrics.stage('warehouse_sync'):
+                ingested = self.warehouse.sync(self.make_api_request, self.leagues.values(), until=until)
+            logger.info(f"🗄️ Entrepôt local: {ingested} matchs terminés ingérés")
+        except Exception as e:
+            logger.error(f"❌ Erreur mise à jour de l'entrepôt local: {e}")
+        if USE_RATINGS:
+            with self.metrics.stage('ratings'):
+                self.ratings = get_shared_ratings(self.warehouse)
+            logger.info(f"📐 Classements Elo: {self.ratings.applied} matchs appliqués, "
+                        f"{len(self.ratings.tables)} ligues")
+    
+    def calculate_form_score(self, team_id: int, last_fixtures: Optional[Dict] = None) -> float:
+        """Calcule le score de forme d'une équipe (derniers 5 matchs, chargés si non fournis)"""
         form_score = 0
-        last_fixtures = self.get_team_last_fixtures(team_id, 5)
+        if last_fixtures is None:
+            last_fixtures = self.get_team_history(team_id, 5)
         
         if not last_fixtures or not last_fixtures.get('response'):
             return form_score
@@ -170,8 +316,8 @@ class DailyPredictionsGenerator:
                 
         return home_score
     
-    def predict_match(self, fixture: Dict) -> tuple[str, List[str], float]:
-        """Génère une prédiction pour un match"""
+    def predict_match(self, fixture: Dict, prefetched: Optional[PrefetchedData] = None) -> tuple[str, List[str], float]:
+        """Génère une prédiction pour un match (sans appel API si les données sont préchargées)"""
         home_team_id = fixture['teams']['home']['id']
         away_team_id = fixture['teams']['away']['id']
         
@@ -181,13 +327,29 @@ class DailyPredictionsGenerator:
         analysis_logs = []
         analysis_logs.append(f"--- Analyse: {home_team_name} vs {away_team_name} ---")
 
+        # 0. Classements Elo à la veille de la journée traitée, s'ils couvrent les deux équipes
+        rated = self.ratings.predict(fixture, before_ts=self._history_cutoff_ts()) if self.ratings else None
+        if rated is not None:
+            outcome, confidence, expected, home_rating, away_rating = rated
+            analysis_logs.append(f"Elo: {home_team_name} ({home_rating:.0f}) vs {away_team_name} ({away_rating:.0f})")
+            prediction = {'HOME': "Victoire Domicile", 'AWAY': "Victoire Extérieur"}.get(outcome, "Match Nul")
+            analysis_logs.append(f"Prédiction: {prediction} (Score attendu: {expected:.2f}, Confiance: {confidence:.2f})")
+            return prediction, analysis_logs, confidence
+
         # 1. Calcul du score de forme
-        home_form_score = self.calculate_form_score(home_team_id)
-        away_form_score = self.calculate_form_score(away_team_id)
+        if prefetched is not None:
+            home_form_score = self.calculate_form_score(home_team_id, prefetched.team_last(home_team_id) or {})
+            away_form_score = self.calculate_form_score(away_team_id, prefetched.team_last(away_team_id) or {})
+        else:
+            home_form_score = self.calculate_form_score(home_team_id)
+            away_form_score = self.calculate_form_score(away_team_id)
         analysis_logs.append(f"Forme: {home_team_name} ({home_form_score}) vs {away_team_name} ({away_form_score})")
         
         # 2. Calcul du score H2H
-        h2h_data = self.get_head_to_head(home_team_id, away_team_id)
+        if prefetched is not None:
+            h2h_data = prefetched.head_to_head(home_team_id, away_team_id)
+        else:
+            h2h_data = self.get_head_to_head_history(home_team_id, away_team_id)
         h2h_score = self.calculate_h2h_score(h2h_data, home_team_id)
         analysis_logs.append(f"H2H (avantage {home_team_name}): {h2h_score}")
 
@@ -212,153 +374,169 @@ class DailyPredictionsGenerator:
         analysis_logs.append(f"Prédiction: {prediction} (Confiance: {confidence:.2f})")
         return prediction, analysis_logs, confidence
     
-    def get_prediction_and_odds(self, fixture: Dict) -> tuple[str, Optional[Dict], List[str], float]:
+    def get_prediction_and_odds(self, fixture: Dict, prefetched: Optional[PrefetchedData] = None) -> tuple[str, Optional[Dict], List[str], float]:
         """Génère prédiction et récupère les cotes"""
-        prediction, analysis_logs, confidence = self.predict_match(fixture)
+        prediction, analysis_logs, confidence = self.predict_match(fixture, prefetched)
         
-        # Récupérer les cotes
-        odds_data = self.get_odds(fixture['fixture']['id'])
+        # Récupérer les cotes (table 1X2 préchargée, ou appel individuel)
         parsed_odds = None
-        
-        if odds_data and odds_data.get('response'):
-            try:
-                bookmaker = odds_data['response'][0]['bookmakers'][0]
-                bet = next((b for b in bookmaker['bets'] if b['name'] == 'Match Winner'), None)
-                if bet:
-                    parsed_odds = {
-                        'home': next((o['odd'] for o in bet['values'] if o['value'] == 'Home'), None),
-                        'draw': next((o['odd'] for o in bet['values'] if o['value'] == 'Draw'), None), 
-                        'away': next((o['odd'] for o in bet['values'] if o['value'] == 'Away'), None),
-                    }
-            except (IndexError, KeyError):
-                analysis_logs.append("⚠️ Erreur récupération cotes")
+        if prefetched is not None:
+            parsed_odds = prefetched.odds_for(fixture['fixture']['id'])
         else:
+            odds_data = self.get_odds(fixture['fixture']['id'])
+            if odds_data and odds_data.get('response'):
+                try:
+                    parsed_odds = parse_match_winner(odds_data['response'][0], 8)
+                except (IndexError, KeyError):
+                    analysis_logs.append("⚠️ Erreur récupération cotes")
+        
+        if parsed_odds is None:
             analysis_logs.append("⚠️ Aucune cote disponible")
         
         return prediction, parsed_odds, analysis_logs, confidence
     
     def load_fixtures_today(self) -> List[Dict]:
-        """Charge tous les matchs du jour"""
+        """Charge tous les matchs du jour (un seul appel, filtré par ligue localement)"""
         today_str = self.today.strftime('%Y-%m-%d')
-        all_fixtures = []
-        season = self.today.year - 1 if self.today.month < 7 else self.today.year
         
-        logger.info(f"🔍 Recherche des matchs pour le {today_str} (saison {season})")
+        logger.info(f"🔍 Recherche des matchs pour le {today_str}")
         
-        for league_name, league_id in self.leagues.items():
-            try:
-                fixtures_data = self.get_fixtures_for_date(today_str, league_id, season)
-                self.stats['total_leagues_checked'] += 1
-                
-                if fixtures_data and fixtures_data.get('response'):
-                    league_matches = len(fixtures_data['response'])
-                    logger.info(f"🏆 {league_name}: {league_matches} matchs trouvés")
-                    all_fixtures.extend(fixtures_data['response'])
-                    self.stats['total_matches_found'] += league_matches
-                else:
-                    logger.debug(f"ℹ️ {league_name}: Aucun match")
-                    
-            except Exception as e:
-                logger.error(f"❌ Erreur pour {league_name}: {e}")
-                continue
+        try:
+            with self.metrics.stage('fixture_load'):
+                all_fixtures = load_fixtures_for_date(self.make_api_request, today_str, self.leagues.values(),
+                                                      priority=PRIORITY_CRITICAL)
+        except Exception as e:
+            logger.error(f"❌ Erreur chargement des matchs du {today_str}: {e}")
+            return []
+        
+        self.stats['total_leagues_checked'] = len(self.leagues)
+        self.stats['total_matches_found'] = len(all_fixtures)
+        
+        league_names = {league_id: name for name, league_id in self.leagues.items()}
+        matches_by_league = {}
+        for fixture in all_fixtures:
+            league_id = fixture['league']['id']
+            matches_by_league[league_id] = matches_by_league.get(league_id, 0) + 1
+        for league_id, league_matches in matches_by_league.items():
+            logger.info(f"🏆 {league_names[league_id]}: {league_matches} matchs trouvés")
         
         logger.info(f"📊 Total: {len(all_fixtures)} matchs trouvés dans {self.stats['total_leagues_checked']} ligues")
         return all_fixtures
     
+    def build_prediction_record(self, fixture: Dict, today_str: str,
+                                prefetched: Optional[PrefetchedData] = None) -> Dict:
+        """Génère la prédiction d'un match et prépare la ligne à sauvegarder"""
+        prediction, odds, analysis_logs, confidence = self.get_prediction_and_odds(fixture, prefetched)
+        
+        # Préparer les données
+        match_data = {
+            'prediction_date': today_str,
+            'prediction_timestamp': datetime.now().isoformat(),
+            'fixture_id': fixture['fixture']['id'],
+            'league_id': fixture['league']['id'],
+            'league_name': fixture['league']['name'],
+            'match_datetime': datetime.fromtimestamp(fixture['fixture']['timestamp']).isoformat(),
+            'home_team_id': fixture['teams']['home']['id'],
+            'home_team_name': fixture['teams']['home']['name'],
+            'away_team_id': fixture['teams']['away']['id'], 
+            'away_team_name': fixture['teams']['away']['name'],
+            'venue_name': fixture['fixture']['venue']['name'],
+            'venue_city': fixture['fixture']['venue']['city'],
+            'predicted_outcome': prediction,
+            'confidence': confidence,
+            'match_desc': f"{fixture['teams']['home']['name']} vs {fixture['teams']['away']['name']}",
+            'status': 'PENDING',
+            'source': 'GitHub Actions',
+            'analysis_summary': ' | '.join(analysis_logs[-3:])  # Dernières 3 lignes d'analyse
+        }
+        
+        # Ajouter les cotes si disponibles
+        if odds:
+            match_data.update({
+                'odds_home': odds.get('home'),
+                'odds_draw': odds.get('draw'),
+                'odds_away': odds.get('away')
+            })
+        else:
+            match_data.update({
+                'odds_home': None,
+                'odds_draw': None,
+                'odds_away': None
+            })
+        
+        return match_data
+    
     def process_and_save_predictions(self, fixtures: List[Dict]) -> None:
         """Traite tous les matchs et sauvegarde les prédictions"""
         if not fixtures:
             logger.warning("❌ Aucun match à traiter")
             return
         
-        predictions_data = []
         today_str = self.today.strftime('%Y-%m-%d')
         
-        logger.info(f"🔮 Génération des prédictions pour {len(fixtures)} matchs...")
+        # 0. Si le quota restant ne couvre pas tous les matchs : ligues importantes et premiers coups d'envoi d'abord
+        budget = self.quota.budget(PRIORITY_NORMAL)
+        if budget is not None:
+            selected = fixtures_within_budget(prioritize_fixtures(fixtures), budget, self.cache, form_window=5,
+                                              warehouse=self.warehouse, before_ts=self._history_cutoff_ts(),
+                                              odds_date=today_str, ratings=self.ratings)
+            if len(selected) < len(fixtures):
+                logger.warning(f"⚠️ Quota insuffisant ({budget} appels disponibles): "
+                               f"{len(selected)}/{len(fixtures)} matchs traités")
+                self._incr_stat('skipped_fixtures', len(fixtures) - len(selected))
+                fixtures = selected
+        total = len(fixtures)
         
-        for i, fixture in enumerate(fixtures, 1):
-            try:
-                logger.info(f"⚽ [{i}/{len(fixtures)}] {fixture['teams']['home']['name']} vs {fixture['teams']['away']['name']}")
-                
-                prediction, odds, analysis_logs, confidence = self.get_prediction_and_odds(fixture)
-                
-                # Préparer les données
-                match_data = {
-                    'prediction_date': today_str,
-                    'prediction_timestamp': datetime.now().isoformat(),
-                    'fixture_id': fixture['fixture']['id'],
-                    'league_id': fixture['league']['id'],
-                    'league_name': fixture['league']['name'],
-                    'match_datetime': datetime.fromtimestamp(fixture['fixture']['timestamp']).isoformat(),
-                    'home_team_id': fixture['teams']['home']['id'],
-                    'home_team_name': fixture['teams']['home']['name'],
-                    'away_team_id': fixture['teams']['away']['id'], 
-                    'away_team_name': fixture['teams']['away']['name'],
-                    'venue_name': fixture['fixture']['venue']['name'],
-                    'venue_city': fixture['fixture']['venue']['city'],
-                    'predicted_outcome': prediction,
-                    'confidence': confidence,
-                    'match_desc': f"{fixture['teams']['home']['name']} vs {fixture['teams']['away']['name']}",
-                    'status': 'PENDING',
-                    'source': 'GitHub Actions',
-                    'analysis_summary': ' | '.join(analysis_logs[-3:])  # Dernières 3 lignes d'analyse
-                }
-                
-                # Ajouter les cotes si disponibles
-                if odds:
-                    match_data.update({
-                        'odds_home': odds.get('home'),
-                        'odds_draw': odds.get('draw'),
-                        'odds_away': odds.get('away')
-                    })
-                else:
-                    match_data.update({
-                        'odds_home': None,
-                        'odds_draw': None,
-                        'odds_away': None
-                    })
-                
-                predictions_data.append(match_data)
-                self.stats['total_predictions_generated'] += 1
-                
-                # Pause pour ne pas surcharger l'API
-                if i % 10 == 0:
-                    logger.info("⏱️ Pause de 2 secondes...")
-                    import time
-                    time.sleep(2)
-                
-            except Exception as e:
-                logger.error(f"❌ Erreur traitement match {fixture['fixture']['id']}: {e}")
-                continue
+        # 1. Planification : liste dédoublonnée des données nécessaires
+        plan = build_plan(fixtures, form_window=5, warehouse=self.warehouse,
+                          before_ts=self._history_cutoff_ts(), odds_date=today_str, ratings=self.ratings)
+        logger.info(f"🗺️ Plan de préchargement: {plan.summary(self.cache)}")
+        self._incr_stat('history_local', len(plan.local_teams) + len(plan.local_pairs))
+        self._incr_stat('history_api', len(plan.api_teams) + len(plan.api_pairs))
+        
+        # 2. Préchargement en parallèle (débit régulé par le rate limiter)
+        with self.metrics.stage('prefetch'):
+            prefetched = execute_plan(plan, self.make_api_request, self.max_workers)
+        
+        # 3. Calcul des prédictions sur les données en mémoire
+        logger.info(f"🔮 Génération des prédictions pour {total} matchs...")
+        predictions_data = []
+        with self.metrics.stage('scoring'):
+            for i, fixture in enumerate(fixtures, 1):
+                try:
+                    logger.info(f"⚽ [{i}/{total}] {fixture['teams']['home']['name']} vs {fixture['teams']['away']['name']}")
+                    predictions_data.append(self.build_prediction_record(fixture, today_str, prefetched))
+                    self._incr_stat('total_predictions_generated')
+                except Exception as e:
+                    logger.error(f"❌ Erreur traitement match {fixture['fixture']['id']}: {e}")
         
         # Sauvegarder les prédictions
         if predictions_data:
-            self.save_predictions_to_csv(predictions_data, today_str)
+            with self.metrics.stage('save'):
+                self.save_predictions_to_history(predictions_data, today_str)
         else:
             logger.warning("⚠️ Aucune prédiction générée")
     
-    def save_predictions_to_csv(self, predictions: List[Dict], date_str: str) -> None:
-        """Sauvegarde les prédictions dans un fichier CSV"""
-        
-        # Créer le dossier si nécessaire
-        os.makedirs(self.predictions_folder, exist_ok=True)
-        
-        # Nom du fichier avec timestamp
-        timestamp = datetime.now().strftime('%H%M')
-        filename = f"predictions_{date_str}_{timestamp}.csv"
-        filepath = os.path.join(self.predictions_folder, filename)
-        
+    def save_predictions_to_history(self, predictions: List[Dict], date_str: str) -> None:
+        """
+        Ajoute les prédictions à l'historique Parquet puis compacte la partition du jour
+        (un enregistrement par fixture_id). Les matchs déjà réglés ne sont pas réécrits,
+        pour qu'une nouvelle génération de la journée ne remette pas leur statut à PENDING.
+        """
         try:
             df = pd.DataFrame(predictions)
-            df.to_csv(filepath, index=False, encoding='utf-8')
-            
-            logger.info(f"💾 Prédictions sauvegardées: {filepath}")
-            logger.info(f"📊 {len(predictions)} prédictions dans le fichier")
+            existing = self.history.read_partition(date_str)
+            settled = existing.loc[existing['status'].notna() & (existing['status'] != 'PENDING'), 'fixture_id']
+            if not settled.empty:
+                df = df[~df['fixture_id'].isin(settled)]
+                logger.info(f"🔒 {len(predictions) - len(df)} matchs déjà réglés conservés tels quels")
+                if df.empty:
+                    return
+            self.history.append(df)
+            self.history.compact([date_str])
             
-            # Créer aussi un fichier "latest" pour faciliter l'accès
-            latest_filepath = os.path.join(self.predictions_folder, "latest_predictions.csv")
-            df.to_csv(latest_filepath, index=False, encoding='utf-8')
-            logger.info(f"💾 Fichier latest mis à jour: {latest_filepath}")
+            logger.info(f"💾 Prédictions sauvegardées dans {self.history.root}/prediction_date={date_str}/")
+            logger.info(f"📊 {len(df)} prédictions ajoutées")
             
             # Afficher un échantillon
             logger.info("🔍 Échantillon des prédictions générées:")
@@ -368,6 +546,57 @@ class DailyPredictionsGenerator:
         except Exception as e:
             logger.error(f"❌ Erreur sauvegarde: {e}")
     
+    def write_metrics(self) -> None:
+        """Exporte les métriques de l'exécution (JSON et Prometheus)"""
+        try:
+            self.metrics.write()
+            logger.info("📈 Métriques exportées (JSON et Prometheus)")
+        except OSError as e:
+            logger.error(f"❌ Erreur export des métriques: {e}")
+    
+    def generate_day(self) -> None:
+        """Charge les matchs de la journée traitée, puis génère et sauvegarde leurs prédictions"""
+        fixtures = self.load_fixtures_today()
+        
+        if not fixtures:
+            logger.warning(f"⚠️ Aucun match trouvé pour le {self.today}")
+            return
+        
+        self.process_and_save_predictions(fixtures)
+    
+    def log_summary(self, duration: timedelta) -> None:
+        """Résumé final de l'exécution"""
+        logger.info(f"\n🎉 === GÉNÉRATION TERMINÉE ===")
+        logger.info(f"⏱️ Durée totale: {duration}")
+        logger.info(f"🏆 Ligues vérifiées: {self.stats['total_leagues_checked']}")
+        logger.info(f"⚽ Matchs trouvés: {self.stats['total_matches_found']}")
+        logger.info(f"🔮 Prédictions générées: {self.stats['total_predictions_generated']}")
+        logger.info(f"🌐 Requêtes API: {self.stats['api_calls']}")
+        logger.info(f"❌ Requêtes échouées: {self.stats['failed_requests']}")
+        logger.info(f"🗄️ Historiques (forme/H2H) servis localement: {self.stats['history_local']}, "
+                    f"via l'API: {self.stats['history_api']}")
+        logger.info(f"🔗 Requêtes économisées par fusion des appels simultanés: {self.stats['coalesced_requests']}")
+        cache_lookups = self.stats['cache_hits'] + self.stats['cache_misses']
+        if cache_lookups:
+            logger.info(f"📦 Cache API: {self.stats['cache_hits']} hits / {self.stats['cache_misses']} misses "
+                        f"({self.stats['cache_hits'] / cache_lookups * 100:.1f}% de hits)")
+        logger.info(f"🔌 Connexions ouvertes: {self.stats['new_connections']} "
+                    f"({self.stats['connect_time'] * 1000:.0f} ms d'établissement, "
+                    f"{self.stats['api_calls'] - self.stats['new_connections']} requêtes sur connexion réutilisée)")
+        logger.info(f"⏳ Attente cumulée imposée par le rate limiter: {self.rate_limiter.total_wait:.1f}s "
+                    f"({self.rate_limiter.per_second}/s, {self.rate_limiter.per_minute}/min)")
+        logger.info(f"🎫 Quota API: {self.quota.summary()}")
+        logger.info(f"📈 Métriques: {self.metrics.summary()}")
+        self.write_metrics()
+        if self.stats['skipped_fixtures']:
+            logger.info(f"⏭️ Matchs non traités faute de quota: {self.stats['skipped_fixtures']}")
+        
+        if self.stats['total_predictions_generated'] > 0:
+            if self.stats['api_calls']:
+                success_rate = ((self.stats['api_calls'] - self.stats['failed_requests']) / self.stats['api_calls']) * 100
+                logger.info(f"✅ Taux de succès API: {success_rate:.1f}%")
+            logger.info(f"📁 Historique disponible dans: {self.history.root}/")
+    
     def run(self) -> None:
         """Exécution principale du générateur"""
         logger.info("🚀 === DÉBUT DE LA GÉNÉRATION DES PRÉDICTIONS QUOTIDIENNES ===")
@@ -376,40 +605,80 @@ class DailyPredictionsGenerator:
         start_time = datetime.now()
         
         try:
-            # 1. Charger les matchs du jour
-            fixtures = self.load_fixtures_today()
-            
-            if not fixtures:
-                logger.warning("⚠️ Aucun match trouvé pour aujourd'hui")
-                return
+            # 0. Mettre à jour l'historique local
+            self.sync_warehouse()
             
-            # 2. Traiter et sauvegarder les prédictions
-            self.process_and_save_predictions(fixtures)
+            # 1. Charger les matchs du jour, puis 2. traiter et sauvegarder les prédictions
+            self.generate_day()
             
         except Exception as e:
             logger.error(f"❌ Erreur critique: {e}")
             return
         
         # 3. Résumé final
-        end_time = datetime.now()
-        duration = end_time - start_time
+        self.log_summary(datetime.now() - start_time)
+    
+    def run_range(self, start: date, end: date, parallel_days: Optional[int] = None) -> None:
+        """
+        Génère les prédictions de chaque journée de [start, end] (prévisions à
+        l'avance ou rattrapage de journées manquées).
         
-        logger.info(f"\n🎉 === GÉNÉRATION TERMINÉE ===")
-        logger.info(f"⏱️ Durée totale: {duration}")
-        logger.info(f"🏆 Ligues vérifiées: {self.stats['total_leagues_checked']}")
-        logger.info(f"⚽ Matchs trouvés: {self.stats['total_matches_found']}")
-        logger.info(f"🔮 Prédictions générées: {self.stats['total_predictions_generated']}")
-        logger.info(f"🌐 Requêtes API: {self.stats['api_calls']}")
-        logger.info(f"❌ Requêtes échouées: {self.stats['failed_requests']}")
+        Les journées sont traitées en parallèle et partagent le rate limiter, le
+        quota, le cache des réponses et la fusion des requêtes : les données
+        d'une équipe récupérées pour une journée servent aux autres. Chaque
+        journée est compactée dans sa partition de l'historique (un enregistrement
+        par fixture_id) : relancer la même plage ne crée pas de doublon.
+        """
+        days = [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+        if not days:
+            logger.warning(f"⚠️ Plage de dates vide: {start} → {end}")
+            return
+        parallel_days = max(1, min(parallel_days or self.parallel_days, len(days)))
         
-        if self.stats['total_predictions_generated'] > 0:
-            success_rate = ((self.stats['api_calls'] - self.stats['failed_requests']) / self.stats['api_calls']) * 100
-            logger.info(f"✅ Taux de succès API: {success_rate:.1f}%")
-            logger.info(f"📁 Fichiers disponibles dans: {self.predictions_folder}/")
+        logger.info("🚀 === DÉBUT DE LA GÉNÉRATION DES PRÉDICTIONS SUR UNE PLAGE DE DATES ===")
+        logger.info(f"📅 Du {start} au {end} ({len(days)} journées, {parallel_days} en parallèle)")
+        
+        start_time = datetime.now()
+        
+        # Session HTTP dimensionnée sur la concurrence totale (journées x matchs)
+        self.transport = get_shared_transport(pool_size=self.max_workers * parallel_days)
+        
+        # 0. Mettre à jour l'historique local une seule fois pour toute la plage
+        self.sync_warehouse(until=end - timedelta(days=1))
+        
+        # 1-2. Une journée par worker, ressources partagées
+        generators = [self.for_date(day) for day in days]
+        
+        def generate(generator):
+            try:
+                generator.generate_day()
+            except Exception as e:
+                logger.error(f"❌ Erreur critique pour le {generator.today}: {e}")
+        
+        with ThreadPoolExecutor(max_workers=parallel_days, thread_name_prefix='day') as executor:
+            list(executor.map(generate, generators))
+        
+        # 3. Résumé par journée puis global
+        for generator in generators:
+            logger.info(f"📅 {generator.today}: {generator.stats['total_matches_found']} matchs, "
+                        f"{generator.stats['total_predictions_generated']} prédictions, "
+                        f"{generator.stats['api_calls']} requêtes API")
+            for key, value in generator.stats.items():
+                if key != 'total_leagues_checked':
+                    self.stats[key] += value
+        self.stats['total_leagues_checked'] = len(self.leagues)
+        self.log_summary(datetime.now() - start_time)
 
 def main():
     """Fonction principale"""
-    import os
+    parser = argparse.ArgumentParser(description="Génère les prédictions d'une journée ou d'une plage de dates.")
+    parser.add_argument('--from', dest='date_from', type=date.fromisoformat, default=None,
+                        help="Première journée (AAAA-MM-JJ, aujourd'hui par défaut)")
+    parser.add_argument('--to', dest='date_to', type=date.fromisoformat, default=None,
+                        help="Dernière journée incluse (AAAA-MM-JJ, égale à --from par défaut)")
+    parser.add_argument('--parallel-days', type=int, default=None,
+                        help="Journées générées en parallèle (PREDICTION_PARALLEL_DAYS, 3 par défaut)")
+    args = parser.parse_args()
     
     # Récupérer la clé API (essayer les deux variables)
     api_key = os.environ.get('RAPIDAPI_KEY') or os.environ.get('API_FOOTBALL_KEY')
@@ -420,8 +689,21 @@ def main():
     logger.info("✅ Clé API récupérée depuis les variables d'environnement")
     
     # Lancer le générateur
-    generator = DailyPredictionsGenerator(api_key)
-    generator.run()
+    if args.date_from is None and args.date_to is None:
+        generator = DailyPredictionsGenerator(api_key)
+        generator.run()
+        return
+    
+    start = args.date_from or date.today()
+    end = args.date_to or start
+    if end < start:
+        parser.error(f"--to ({end}) est antérieure à --from ({start})")
+    
+    generator = DailyPredictionsGenerator(api_key, target_date=start)
+    if start == end:
+        generator.run()
+    else:
+        generator.run_range(start, end, args.parallel_days)
 
 if __name__ == "__main__":
-    main() 
+    main()
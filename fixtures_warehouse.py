@@ -0,0 +1,409 @@
+# Fichier : fixtures_warehouse.py
+
+"""
+Entrepôt local des résultats de matchs terminés.
+
+Les matchs terminés des ligues suivies sont ingérés de façon incrémentale
+dans une base SQLite (une requête `fixtures?date=` par jour manquant, ou
+une requête par ligue et saison lors de l'initialisation). Les calculs de
+forme et de H2H interrogent ensuite cette base localement au lieu
+d'appeler l'API pour chaque prédiction.
+
+Les requêtes renvoient des données au même format que l'API
+(`{'response': [...]}`) afin d'être utilisables par les fonctions de
+score existantes.
+
+Couverture : les journées ingérées jour par jour sont complètes (tous
+les matchs des équipes connues, toutes compétitions confondues) ;
+l'initialisation par ligue et saison marque aussi ses journées, de la
+première journée des saisons ingérées à la veille (les coupes non
+suivies de cette période n'y figurent pas). La forme d'une équipe n'est
+servie localement que si ses `n` derniers matchs tombent dans la
+dernière période continue de journées couvertes (covers_form).
+
+Le H2H remonte aux saisons passées : une paire n'est servie localement
+qu'après une première réponse de l'API, enregistrée avec la date
+jusqu'à laquelle elle est sûre (record_head_to_head). Les confrontations
+suivantes sont ingérées jour par jour, tant que la période couverte
+rejoint cette date (covers_head_to_head).
+"""
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+from bulk_loader import fetch_all_pages, load_fixtures_for_date
+from quota_manager import PRIORITY_LOW
+from response_cache import ENDPOINT_TTLS
+
+DEFAULT_WAREHOUSE_PATH = os.environ.get('FIXTURES_WAREHOUSE_PATH', 'data/warehouse/fixtures.sqlite')
+
+FINISHED_STATUSES = ('FT', 'AET', 'PEN')
+
+# Au-delà de ce retard, on réinitialise par ligue/saison plutôt que jour par jour
+MAX_CATCH_UP_DAYS = 14
+
+# Âge maximal d'une réponse H2H servie par le cache disque
+H2H_RESPONSE_MAX_AGE = ENDPOINT_TTLS['fixtures/headtohead']
+
+
+def _day_start_ts(day):
+    """Timestamp du début d'une journée (heure locale, comme les coupures du générateur)."""
+    return int(datetime.combine(day, datetime.min.time()).timestamp())
+
+
+def season_for(day):
+    """Saison api-football la plus probable pour une date (août -> juillet)."""
+    return day.year - 1 if day.month < 7 else day.year
+
+
+class FixturesWarehouse:
+    """Base SQLite des matchs terminés, indexée par équipe et par confrontation."""
+
+    def __init__(self, path=DEFAULT_WAREHOUSE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS fixtures (
+                fixture_id INTEGER PRIMARY KEY,
+                league_id INTEGER NOT NULL,
+                season INTEGER,
+                kickoff_ts INTEGER NOT NULL,
+                home_id INTEGER NOT NULL,
+                away_id INTEGER NOT NULL,
+                home_name TEXT,
+                away_name TEXT,
+                goals_home INTEGER NOT NULL,
+                goals_away INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                team_low INTEGER NOT NULL,
+                team_high INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_fixtures_pair_date
+                ON fixtures (team_low, team_high, kickoff_ts);
+
+            CREATE TABLE IF NOT EXISTS team_fixtures (
+                team_id INTEGER NOT NULL,
+                kickoff_ts INTEGER NOT NULL,
+                fixture_id INTEGER NOT NULL,
+                PRIMARY KEY (team_id, kickoff_ts, fixture_id)
+            ) WITHOUT ROWID;
+
+            CREATE TABLE IF NOT EXISTS ingested_dates (
+                match_date TEXT PRIMARY KEY,
+                ingested_at TEXT NOT NULL
+            );
+
+            -- Journées ingérées en entier (toutes compétitions), base de la couverture
+            CREATE TABLE IF NOT EXISTS complete_dates (
+                match_date TEXT PRIMARY KEY
+            );
+
+            -- Paires dont toutes les confrontations antérieures à known_until sont connues
+            CREATE TABLE IF NOT EXISTS h2h_pairs (
+                team_low INTEGER NOT NULL,
+                team_high INTEGER NOT NULL,
+                known_until INTEGER NOT NULL,
+                PRIMARY KEY (team_low, team_high)
+            ) WITHOUT ROWID;
+        """)
+        self._conn.commit()
+        # (début, fin) de la période complète, en timestamps ; recalculée après ingestion
+        self._coverage = None
+
+    # --- Ingestion ---
+
+    def upsert_fixtures(self, fixtures):
+        """Insère ou met à jour les matchs terminés d'une liste au format API."""
+        rows = []
+        for fixture in fixtures:
+            status = fixture['fixture']['status']['short']
+            goals_home = fixture['goals']['home']
+            goals_away = fixture['goals']['away']
+            if status not in FINISHED_STATUSES or goals_home is None or goals_away is None:
+                continue
+            home_id = fixture['teams']['home']['id']
+            away_id = fixture['teams']['away']['id']
+            rows.append((
+                fixture['fixture']['id'], fixture['league']['id'], fixture['league'].get('season'),
+                fixture['fixture']['timestamp'], home_id, away_id,
+                fixture['teams']['home'].get('name'), fixture['teams']['away'].get('name'),
+                goals_home, goals_away, status, min(home_id, away_id), max(home_id, away_id)
+            ))
+        if not rows:
+            return 0
+
+        team_rows = [(row[4], row[3], row[0]) for row in rows] + [(row[5], row[3], row[0]) for row in rows]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO fixtures (fixture_id, league_id, season, kickoff_ts, home_id, away_id, "
+                "home_name, away_name, goals_home, goals_away, status, team_low, team_high) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO team_fixtures (team_id, kickoff_ts, fixture_id) VALUES (?, ?, ?)",
+                team_rows
+            )
+            self._conn.commit()
+        return len(rows)
+
+    def _mark_ingested(self, day):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO ingested_dates (match_date, ingested_at) VALUES (?, ?)",
+                (day.isoformat(), datetime.now().isoformat())
+            )
+            self._conn.commit()
+
+    def last_ingested_date(self):
+        with self._lock:
+            row = self._conn.execute("SELECT MAX(match_date) FROM ingested_dates").fetchone()
+        return date.fromisoformat(row[0]) if row and row[0] else None
+
+    def ingest_date(self, fetch, day, league_ids):
+        """
+        Ingère les matchs terminés d'une journée (un appel API) : ceux des
+        ligues suivies et, toutes compétitions confondues, ceux des équipes
+        déjà connues (coupes, matchs européens...). La journée est alors complète.
+        """
+        fixtures = load_fixtures_for_date(fetch, day.isoformat(), priority=PRIORITY_LOW)
+        wanted = set(league_ids)
+        with self._lock:
+            known_teams = {row[0] for row in self._conn.execute("SELECT DISTINCT team_id FROM team_fixtures")}
+        count = self.upsert_fixtures([
+            fixture for fixture in fixtures
+            if fixture['league']['id'] in wanted
+            or fixture['teams']['home']['id'] in known_teams or fixture['teams']['away']['id'] in known_teams
+        ])
+        self._mark_ingested(day)
+        self._mark_complete(day, day)
+        return count
+
+    def _mark_complete(self, first, last):
+        """Marque les journées de `first` à `last` incluses comme couvertes."""
+        days = [(first + timedelta(days=offset)).isoformat() for offset in range((last - first).days + 1)]
+        with self._lock:
+            self._conn.executemany("INSERT OR IGNORE INTO complete_dates (match_date) VALUES (?)",
+                                   [(day,) for day in days])
+            self._conn.commit()
+            self._coverage = None
+
+    def ingest_league_season(self, fetch, league_id, season):
+        """Ingère tous les matchs terminés d'une ligue pour une saison (un appel API)."""
+        fixtures = fetch_all_pages(fetch, 'fixtures', {'league': league_id, 'season': season}, PRIORITY_LOW)
+        return self.upsert_fixtures(fixtures)
+
+    def sync(self, fetch, league_ids, until=None, bootstrap=True):
+        """
+        Met l'entrepôt à jour jusqu'à la veille (ou `until`) inclus.
+
+        Si l'entrepôt est vide ou trop en retard et que `bootstrap` est vrai,
+        les saisons en cours sont ingérées ligue par ligue ; sinon seuls les
+        jours manquants sont ingérés.
+
+        Returns:
+            int: Le nombre de matchs ingérés.
+        """
+        until = until or (date.today() - timedelta(days=1))
+        last = self.last_ingested_date()
+        ingested = 0
+
+        if last is None or (until - last).days > MAX_CATCH_UP_DAYS:
+            if not bootstrap:
+                return 0
+            # Couvre les championnats sur année civile et ceux à cheval sur deux ans
+            league_ids = list(league_ids)
+            seasons = sorted({until.year, season_for(until)})
+            for league_id in league_ids:
+                for season in seasons:
+                    ingested += self.ingest_league_season(fetch, league_id, season)
+            self._mark_ingested(until)
+            # Journées couvertes : de la première journée des saisons ingérées à `until`
+            if not league_ids:
+                return ingested
+            with self._lock:
+                first_ts = self._conn.execute(
+                    f"SELECT MIN(kickoff_ts) FROM fixtures WHERE league_id IN ({','.join('?' * len(league_ids))}) "
+                    f"AND season IN ({','.join('?' * len(seasons))})",
+                    (*league_ids, *seasons)
+                ).fetchone()[0]
+            if first_ts is not None and date.fromtimestamp(first_ts) <= until:
+                self._mark_complete(date.fromtimestamp(first_ts), until)
+            return ingested
+
+        day = last + timedelta(days=1)
+        while day <= until:
+            ingested += self.ingest_date(fetch, day, league_ids)
+            day += timedelta(days=1)
+        return ingested
+
+    # --- Requêtes ---
+
+    def team_fixture_count(self, team_id):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM team_fixtures WHERE team_id = ?", (team_id,)
+            ).fetchone()[0]
+
+    def coverage(self):
+        """
+        Période dont tous les matchs des équipes connues sont dans l'entrepôt :
+        (début, fin) en timestamps, fin exclue, ou None.
+
+        C'est la dernière suite continue de journées ingérées jour par jour.
+        """
+        with self._lock:
+            if self._coverage is None:
+                days = [date.fromisoformat(row[0]) for row in self._conn.execute(
+                    "SELECT match_date FROM complete_dates ORDER BY match_date DESC")]
+                if not days:
+                    self._coverage = ()
+                else:
+                    first = days[0]
+                    for day in days[1:]:
+                        if (first - day).days != 1:
+                            break
+                        first = day
+                    self._coverage = (_day_start_ts(first), _day_start_ts(days[0] + timedelta(days=1)))
+            return self._coverage or None
+
+    def covers_form(self, team_id, n=5, before_ts=None):
+        """
+        Indique si les `n` derniers matchs de l'équipe avant `before_ts` (début
+        de la journée par défaut) sont connus avec certitude : ils doivent tous
+        se trouver dans la période complète, qui doit s'étendre jusqu'à `before_ts`.
+        """
+        coverage = self.coverage()
+        if coverage is None:
+            return False
+        before_ts = before_ts if before_ts is not None else _day_start_ts(date.today())
+        start_ts, end_ts = coverage
+        if before_ts > end_ts:
+            return False
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT kickoff_ts FROM team_fixtures WHERE team_id = ? AND kickoff_ts < ? "
+                "ORDER BY kickoff_ts DESC LIMIT 1 OFFSET ?",
+                (team_id, before_ts, n - 1)
+            ).fetchone()
+        return row is not None and row[0] >= start_ts
+
+    def record_head_to_head(self, team1_id, team2_id, h2h_data, known_until=None):
+        """
+        Enregistre une réponse H2H de l'API : ses matchs terminés et, pour la
+        paire, la date jusqu'à laquelle toutes les confrontations sont connues
+        (par défaut, l'âge maximal d'une réponse du cache disque déduit).
+        """
+        if not h2h_data or h2h_data.get('response') is None:
+            return
+        self.upsert_fixtures(h2h_data['response'])
+        known_until = known_until if known_until is not None else int(time.time()) - H2H_RESPONSE_MAX_AGE
+        low, high = sorted((team1_id, team2_id))
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO h2h_pairs (team_low, team_high, known_until) VALUES (?, ?, ?) "
+                "ON CONFLICT (team_low, team_high) DO UPDATE SET known_until = MAX(known_until, excluded.known_until)",
+                (low, high, known_until)
+            )
+            self._conn.commit()
+
+    def covers_head_to_head(self, team1_id, team2_id, before_ts=None):
+        """
+        Indique si toutes les confrontations des deux équipes avant `before_ts`
+        (début de la journée par défaut) sont connues : la réponse enregistrée
+        va jusque-là, ou la période couverte prend le relais jusqu'à `before_ts`.
+        """
+        before_ts = before_ts if before_ts is not None else _day_start_ts(date.today())
+        low, high = sorted((team1_id, team2_id))
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT known_until FROM h2h_pairs WHERE team_low = ? AND team_high = ?", (low, high)
+            ).fetchone()
+        if row is None:
+            return False
+        if before_ts <= row[0]:
+            return True
+        coverage = self.coverage()
+        return coverage is not None and coverage[0] <= row[0] and before_ts <= coverage[1]
+
+    def last_n_fixtures(self, team_id, n=5, before_ts=None):
+        """Les n derniers matchs terminés d'une équipe, au format API."""
+        before_ts = before_ts if before_ts is not None else 2 ** 62
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT f.* FROM team_fixtures t JOIN fixtures f ON f.fixture_id = t.fixture_id "
+                "WHERE t.team_id = ? AND t.kickoff_ts < ? ORDER BY t.kickoff_ts DESC LIMIT ?",
+                (team_id, before_ts, n)
+            ).fetchall()
+        return {'response': [self._to_api_fixture(row) for row in rows]}
+
+    def head_to_head(self, team1_id, team2_id, before_ts=None):
+        """Les confrontations terminées entre deux équipes, au format API."""
+        before_ts = before_ts if before_ts is not None else 2 ** 62
+        low, high = sorted((team1_id, team2_id))
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM fixtures WHERE team_low = ? AND team_high = ? AND kickoff_ts < ? "
+                "ORDER BY kickoff_ts DESC",
+                (low, high, before_ts)
+            ).fetchall()
+        return {'response': [self._to_api_fixture(row) for row in rows]}
+
+    def results_frame(self, league_ids=None, since_ts=None):
+        """
+        Tous les matchs terminés sous forme de DataFrame (entrée de predict_batch),
+        ou seulement ceux dont le coup d'envoi est postérieur ou égal à `since_ts`.
+        """
+        import pandas as pd
+
+        query = ("SELECT fixture_id, league_id, season, kickoff_ts, home_id AS home_team_id, "
+                 "away_id AS away_team_id, goals_home, goals_away FROM fixtures")
+        conditions = []
+        params = []
+        if league_ids is not None:
+            league_ids = list(league_ids)
+            conditions.append(f"league_id IN ({','.join('?' * len(league_ids))})")
+            params.extend(league_ids)
+        if since_ts is not None:
+            conditions.append("kickoff_ts >= ?")
+            params.append(since_ts)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        with self._lock:
+            return pd.read_sql_query(query + " ORDER BY kickoff_ts, fixture_id", self._conn, params=tuple(params))
+
+    @staticmethod
+    def _to_api_fixture(row):
+        (fixture_id, league_id, season, kickoff_ts, home_id, away_id,
+         home_name, away_name, goals_home, goals_away, status, _, _) = row
+        return {
+            'fixture': {'id': fixture_id, 'timestamp': kickoff_ts, 'status': {'short': status}},
+            'league': {'id': league_id, 'season': season},
+            'teams': {
+                'home': {'id': home_id, 'name': home_name},
+                'away': {'id': away_id, 'name': away_name},
+            },
+            'goals': {'home': goals_home, 'away': goals_away},
+        }
+
+
+_shared_warehouse = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_warehouse():
+    """Retourne l'entrepôt partagé du processus."""
+    global _shared_warehouse
+    with _shared_lock:
+        if _shared_warehouse is None:
+            _shared_warehouse = FixturesWarehouse()
+        return _shared_warehouse
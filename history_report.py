@@ -0,0 +1,72 @@
+# Fichier : history_report.py
+
+"""
+Agrégations de la page "Historique & Bilan", sans dépendance à Streamlit.
+
+Fusion des prédictions GitHub Actions et Streamlit, bilan (répartition
+par source et par statut, taux de réussite) et filtres du tableau. Les
+fonctions ne font que du pandas : la page les affiche, les benchmarks
+(benchmarks/bench_cpu.py) les mesurent sur de gros volumes.
+"""
+import pandas as pd
+
+
+def merge_predictions(frames):
+    """
+    Concatène les prédictions des différentes sources, de la plus récente à la
+    plus ancienne, sans doublon (même fixture_id à la même date).
+    """
+    frames = [df for df in frames if not df.empty]
+    if not frames:
+        return pd.DataFrame()
+
+    combined = pd.concat(frames, ignore_index=True, sort=False)
+
+    # Standardiser les colonnes dates
+    if 'prediction_ts' in combined.columns:
+        combined['prediction_ts'] = pd.to_datetime(combined['prediction_ts'])
+        combined = combined.sort_values('prediction_ts', ascending=False)
+
+    # Supprimer les doublons potentiels (même fixture_id et même date)
+    if 'fixture_id' in combined.columns and 'prediction_ts' in combined.columns:
+        combined = combined.drop_duplicates(subset=['fixture_id', 'prediction_ts'], keep='first')
+
+    return combined
+
+
+def summarize(df):
+    """
+    Chiffres du bilan global.
+
+    Returns:
+        dict: total, github, streamlit, latest (horodatage ou None),
+        source_counts et status_counts (pd.Series), correct, incorrect,
+        pending et success_rate (en %, None sans prédiction réglée).
+    """
+    source_counts = df['source'].value_counts() if 'source' in df.columns else pd.Series(dtype='int64')
+    status_counts = df['status'].value_counts() if 'status' in df.columns else pd.Series(dtype='int64')
+    correct = int(status_counts.get('CORRECT', 0))
+    incorrect = int(status_counts.get('INCORRECT', 0))
+    latest = df['prediction_ts'].max() if 'prediction_ts' in df.columns else None
+    return {
+        'total': len(df),
+        'github': int(source_counts.get('GitHub Actions', 0)),
+        'streamlit': int(source_counts.get('Streamlit Local', 0)),
+        'latest': latest if latest is not None and pd.notna(latest) else None,
+        'source_counts': source_counts,
+        'status_counts': status_counts,
+        'correct': correct,
+        'incorrect': incorrect,
+        'pending': int(status_counts.get('PENDING', 0)),
+        'success_rate': correct / (correct + incorrect) * 100 if correct + incorrect else None,
+    }
+
+
+def filter_predictions(df, status="Tous", source="Tous"):
+    """Prédictions correspondant aux filtres du tableau ("Tous" = pas de filtre)."""
+    mask = pd.Series(True, index=df.index)
+    if 'status' in df.columns and status != "Tous":
+        mask &= df['status'] == status
+    if 'source' in df.columns and source != "Tous":
+        mask &= df['source'] == source
+    return df[mask]
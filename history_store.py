@@ -0,0 +1,301 @@
+# Fichier : history_store.py
+
+"""
+Historique des prédictions GitHub Actions au format Parquet, partitionné par date.
+
+Disposition sur disque :
+
+    data/history/prediction_date=2025-09-01/part-<horodatage>-<id>.parquet
+
+Chaque exécution du générateur ajoute un fichier à la partition du jour,
+puis la partition est compactée (un seul fichier, un enregistrement par
+fixture_id). Le schéma est explicite : les lectures ne font aucune
+inférence de types et ne chargent que les colonnes et les partitions
+demandées.
+
+Import des anciens CSV :
+
+    python history_store.py import data/predictions/*.csv
+"""
+import argparse
+import glob
+import os
+import threading
+import uuid
+from datetime import datetime
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+DEFAULT_HISTORY_PATH = os.environ.get('PREDICTIONS_HISTORY_PATH', 'data/history')
+
+PARTITION_COLUMN = 'prediction_date'
+
+# Colonnes stockées dans les fichiers (la date est portée par le nom du dossier)
+FILE_SCHEMA = pa.schema([
+    ('prediction_timestamp', pa.timestamp('us')),
+    ('fixture_id', pa.int64()),
+    ('league_id', pa.int64()),
+    ('league_name', pa.string()),
+    ('match_datetime', pa.timestamp('us')),
+    ('home_team_id', pa.int64()),
+    ('home_team_name', pa.string()),
+    ('away_team_id', pa.int64()),
+    ('away_team_name', pa.string()),
+    ('venue_name', pa.string()),
+    ('venue_city', pa.string()),
+    ('predicted_outcome', pa.string()),
+    ('confidence', pa.float64()),
+    ('match_desc', pa.string()),
+    ('status', pa.string()),
+    ('source', pa.string()),
+    ('analysis_summary', pa.string()),
+    ('odds_home', pa.float64()),
+    ('odds_draw', pa.float64()),
+    ('odds_away', pa.float64()),
+    ('actual_result', pa.string()),
+    ('home_score', pa.int64()),
+    ('away_score', pa.int64()),
+])
+
+SCHEMA = FILE_SCHEMA.append(pa.field(PARTITION_COLUMN, pa.string()))
+
+_PARTITIONING = ds.partitioning(pa.schema([(PARTITION_COLUMN, pa.string())]), flavor='hive')
+
+
+def _conform(df):
+    """Aligne un DataFrame sur FILE_SCHEMA (colonnes manquantes à null, valeurs invalides à null)."""
+    df = df.copy()
+    for field in FILE_SCHEMA:
+        if field.name not in df.columns:
+            df[field.name] = None
+        if pa.types.is_timestamp(field.type):
+            df[field.name] = pd.to_datetime(df[field.name], errors='coerce')
+        elif pa.types.is_integer(field.type):
+            df[field.name] = pd.to_numeric(df[field.name], errors='coerce').astype('Int64')
+        elif pa.types.is_floating(field.type):
+            # Les cotes absentes sont notées 'N/A' dans les anciens CSV
+            df[field.name] = pd.to_numeric(df[field.name], errors='coerce')
+        else:
+            df[field.name] = df[field.name].astype(object).where(df[field.name].notna(), None)
+            df[field.name] = df[field.name].map(lambda value: None if value is None or value == '' else str(value))
+    return pa.Table.from_pandas(df[FILE_SCHEMA.names], schema=FILE_SCHEMA, preserve_index=False)
+
+
+class HistoryStore:
+    """Partitions Parquet de l'historique des prédictions."""
+
+    def __init__(self, root=DEFAULT_HISTORY_PATH):
+        self.root = root
+
+    def _partition_dir(self, day):
+        return os.path.join(self.root, f"{PARTITION_COLUMN}={day}")
+
+    def _part_files(self, day):
+        return sorted(glob.glob(os.path.join(self._partition_dir(day), "part-*.parquet")))
+
+    def _write_part(self, day, table):
+        """Écrit un fichier de partition de façon atomique (fichier caché puis renommage)."""
+        directory = self._partition_dir(day)
+        os.makedirs(directory, exist_ok=True)
+        name = f"part-{datetime.now().strftime('%Y%m%d%H%M%S%f')}-{uuid.uuid4().hex[:8]}.parquet"
+        tmp_path = os.path.join(directory, f".{name}.tmp")
+        pq.write_table(table, tmp_path, compression='zstd')
+        os.replace(tmp_path, os.path.join(directory, name))
+        return name
+
+    def partitions(self):
+        """Dates disponibles, dans l'ordre chronologique."""
+        prefix = f"{PARTITION_COLUMN}="
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name[len(prefix):] for name in os.listdir(self.root)
+                      if name.startswith(prefix) and self._part_files(name[len(prefix):]))
+
+    # --- Écriture ---
+
+    def append(self, records):
+        """
+        Ajoute des prédictions (liste de dicts ou DataFrame contenant prediction_date).
+
+        Returns:
+            int: Le nombre de lignes écrites.
+        """
+        df = records if isinstance(records, pd.DataFrame) else pd.DataFrame(records)
+        if df.empty:
+            return 0
+        for day, group in df.groupby(df[PARTITION_COLUMN].astype(str)):
+            self._write_part(day, _conform(group))
+        return len(df)
+
+    def read_partition(self, day):
+        """Toutes les lignes d'une date (fichiers dans l'ordre d'écriture)."""
+        files = self._part_files(day)
+        if not files:
+            return pd.DataFrame(columns=FILE_SCHEMA.names)
+        table = pa.concat_tables([pq.read_table(path, schema=FILE_SCHEMA) for path in files])
+        return table.to_pandas()
+
+    def write_partition(self, day, df):
+        """Remplace le contenu d'une date par un seul fichier."""
+        old_files = self._part_files(day)
+        self._write_part(day, _conform(df))
+        for path in old_files:
+            os.remove(path)
+
+    def compact(self, days=None):
+        """
+        Fusionne les fichiers de chaque partition et garde la dernière version de chaque match.
+
+        Returns:
+            int: Le nombre de partitions réécrites.
+        """
+        compacted = 0
+        for day in (days or self.partitions()):
+            files = self._part_files(day)
+            if not files:
+                continue
+            rows = self.read_partition(day)
+            df = rows.drop_duplicates('fixture_id', keep='last')
+            # Un seul fichier peut aussi contenir des doublons (import de CSV qui se recouvrent)
+            if len(files) < 2 and len(df) == len(rows):
+                continue
+            self.write_partition(day, df)
+            compacted += 1
+        return compacted
+
+    def import_csv(self, paths):
+        """Importe d'anciens fichiers CSV puis compacte les partitions touchées."""
+        frames = [pd.read_csv(path, dtype=str, keep_default_na=False) for path in paths]
+        frames = [df for df in frames if PARTITION_COLUMN in df.columns and not df.empty]
+        if not frames:
+            return 0
+        df = pd.concat(frames, ignore_index=True)
+        count = self.append(df)
+        self.compact(sorted(df[PARTITION_COLUMN].unique()))
+        return count
+
+    # --- Lecture ---
+
+    def read(self, columns=None, start=None, end=None):
+        """
+        Lit l'historique en ne chargeant que les colonnes et les dates demandées.
+
+        Args:
+            columns (list[str] | None): Colonnes à lire (toutes si None).
+            start (str | None): Date minimale incluse (YYYY-MM-DD).
+            end (str | None): Date maximale incluse (YYYY-MM-DD).
+
+        Returns:
+            pd.DataFrame: Les prédictions correspondantes.
+        """
+        columns = list(columns) if columns else SCHEMA.names
+        if not self.partitions():
+            return pd.DataFrame(columns=columns)
+
+        dataset = ds.dataset(self.root, format='parquet', schema=SCHEMA, partitioning=_PARTITIONING)
+        condition = None
+        if start is not None:
+            condition = ds.field(PARTITION_COLUMN) >= str(start)
+        if end is not None:
+            upper = ds.field(PARTITION_COLUMN) <= str(end)
+            condition = upper if condition is None else condition & upper
+        return dataset.to_table(columns=columns, filter=condition).to_pandas()
+
+
+class IncrementalHistoryLoader:
+    """
+    Lecture incrémentale de l'historique pour un processus de longue durée (Streamlit).
+
+    Un manifeste (mtime, taille) des fichiers de partition est conservé :
+    à chaque rafraîchissement, seuls les fichiers nouveaux ou modifiés sont
+    relus, les fichiers supprimés (compaction) sont oubliés.
+    """
+
+    def __init__(self, store, columns=None):
+        self.store = store
+        self.columns = [column for column in (columns or SCHEMA.names) if column != PARTITION_COLUMN]
+        self.version = 0
+        self.parsed_files = 0
+        self._manifest = {}
+        self._frames = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _day_of(path):
+        return os.path.basename(os.path.dirname(path))[len(PARTITION_COLUMN) + 1:]
+
+    def refresh(self, start=None, end=None):
+        """
+        Met à jour les fichiers des dates demandées.
+
+        Returns:
+            int: Le nombre de fichiers relus.
+        """
+        days = [day for day in self.store.partitions()
+                if (start is None or day >= str(start)) and (end is None or day <= str(end))]
+        parsed = 0
+        with self._lock:
+            for path in [path for path in self._manifest if not os.path.exists(path)]:
+                del self._manifest[path]
+                del self._frames[path]
+                self.version += 1
+
+            for day in days:
+                for path in self.store._part_files(day):
+                    stat = os.stat(path)
+                    signature = (stat.st_mtime_ns, stat.st_size)
+                    if self._manifest.get(path) == signature:
+                        continue
+                    df = pq.read_table(path, columns=self.columns, schema=FILE_SCHEMA).to_pandas()
+                    df.insert(0, PARTITION_COLUMN, day)
+                    self._frames[path] = df
+                    self._manifest[path] = signature
+                    parsed += 1
+            if parsed:
+                self.version += 1
+                self.parsed_files += parsed
+        return parsed
+
+    def frame(self, start=None, end=None):
+        """Les lignes en mémoire des dates demandées (sans relire le disque)."""
+        with self._lock:
+            frames = [df for path, df in sorted(self._frames.items())
+                      if (start is None or self._day_of(path) >= str(start))
+                      and (end is None or self._day_of(path) <= str(end))]
+        if not frames:
+            return pd.DataFrame(columns=[PARTITION_COLUMN] + self.columns)
+        return pd.concat(frames, ignore_index=True)
+
+
+_shared_store = None
+
+
+def get_shared_store():
+    """Retourne l'historique partagé du processus."""
+    global _shared_store
+    if _shared_store is None:
+        _shared_store = HistoryStore()
+    return _shared_store
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gestion de l'historique Parquet des prédictions.")
+    parser.add_argument('--root', default=DEFAULT_HISTORY_PATH)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    import_parser = subparsers.add_parser('import', help="Importe des fichiers CSV de prédictions")
+    import_parser.add_argument('paths', nargs='+')
+    subparsers.add_parser('compact', help="Compacte toutes les partitions")
+    args = parser.parse_args()
+
+    store = HistoryStore(args.root)
+    if args.command == 'import':
+        print(f"{store.import_csv(args.paths)} lignes importées dans {args.root}")
+    else:
+        print(f"{store.compact()} partitions compactées")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+# Fichier : http_transport.py
+
+"""
+Couche de transport HTTP partagée pour les appels à l'API api-football.
+
+Une seule `requests.Session` est réutilisée par l'api_client (Streamlit)
+et par le DailyPredictionsGenerator (GitHub Actions) : les connexions TLS
+vers l'hôte RapidAPI sont gardées ouvertes (keep-alive) et mises en pool
+au lieu d'être rouvertes à chaque requête.
+
+Le temps d'établissement des connexions est mesuré à chaque appel, ce qui
+permet de voir combien d'appels réutilisent une connexion existante ;
+latence, taille et code de chaque réponse alimentent le module metrics.
+Avec API_RECORD_PATH, les réponses sont aussi enregistrées pour être
+rejouées hors ligne (api_recording.py, replay_server.py).
+"""
+import os
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from api_recording import get_shared_recorder
+from metrics import get_shared_metrics
+
+# Valeurs par défaut, surchargeables par variables d'environnement
+DEFAULT_CONNECT_TIMEOUT = float(os.environ.get('HTTP_CONNECT_TIMEOUT', 5))
+DEFAULT_READ_TIMEOUT = float(os.environ.get('HTTP_READ_TIMEOUT', 30))
+DEFAULT_POOL_SIZE = int(os.environ.get('HTTP_POOL_SIZE', 10))
+
+# Temps de connexion mesuré pour la requête en cours, par thread
+_connect_timer = threading.local()
+
+
+def _record_connect_time(duration):
+    _connect_timer.total = getattr(_connect_timer, 'total', 0.0) + duration
+    _connect_timer.count = getattr(_connect_timer, 'count', 0) + 1
+
+
+class _TimedHTTPConnection(HTTPConnection):
+    def connect(self):
+        start = time.perf_counter()
+        super().connect()
+        _record_connect_time(time.perf_counter() - start)
+
+
+class _TimedHTTPSConnection(HTTPSConnection):
+    def connect(self):
+        start = time.perf_counter()
+        super().connect()
+        _record_connect_time(time.perf_counter() - start)
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class _TimedAdapter(HTTPAdapter):
+    """Adapter dont les connexions mesurent leur temps d'établissement."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _TimedHTTPConnectionPool,
+            'https': _TimedHTTPSConnectionPool,
+        }
+
+
+class HttpTransport:
+    """Session HTTP poolée avec keep-alive et timeouts configurables."""
+
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE,
+                 connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+                 read_timeout=DEFAULT_READ_TIMEOUT):
+        self.pool_size = pool_size
+        self.timeout = (connect_timeout, read_timeout)
+
+        self.session = requests.Session()
+        self.session.headers['Connection'] = 'keep-alive'
+        adapter = _TimedAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self._lock = threading.Lock()
+        self.stats = {
+            'requests': 0,
+            'new_connections': 0,
+            'connect_time': 0.0
+        }
+
+    def get(self, url, headers=None, params=None, endpoint=None):
+        """
+        Effectue un GET sur la session partagée.
+
+        `endpoint` sert d'étiquette aux métriques (chemin de l'URL par défaut).
+
+        Returns:
+            tuple[requests.Response, float | None]: La réponse et le temps
+            d'établissement de connexion en secondes (None si la connexion
+            du pool a été réutilisée).
+
+        Raises:
+            requests.exceptions.RequestException: En cas d'erreur réseau.
+        """
+        _connect_timer.total = 0.0
+        _connect_timer.count = 0
+        response = None
+        start = time.perf_counter()
+        try:
+            response = self.session.get(url, headers=headers, params=params, timeout=self.timeout)
+        finally:
+            retries = getattr(getattr(response, 'raw', None), 'retries', None)
+            get_shared_metrics().observe_request(
+                endpoint or urlparse(url).path,
+                time.perf_counter() - start,
+                size=len(response.content) if response is not None else 0,
+                status=response.status_code if response is not None else None,
+                retries=len(retries.history) if retries is not None else 0
+            )
+            connect_time = _connect_timer.total if _connect_timer.count else None
+            with self._lock:
+                self.stats['requests'] += 1
+                self.stats['new_connections'] += _connect_timer.count
+                self.stats['connect_time'] += _connect_timer.total
+        recorder = get_shared_recorder()
+        if recorder is not None:
+            recorder.record(endpoint or urlparse(url).path, params, response.status_code, response.text)
+        return response, connect_time
+
+    def summary(self):
+        """Résumé lisible de la réutilisation des connexions."""
+        with self._lock:
+            requests_count = self.stats['requests']
+            new_connections = self.stats['new_connections']
+            connect_time = self.stats['connect_time']
+        reused = requests_count - new_connections
+        return (f"{requests_count} requêtes, {new_connections} connexions ouvertes "
+                f"({connect_time * 1000:.0f} ms d'établissement), {max(reused, 0)} réutilisées")
+
+    def close(self):
+        self.session.close()
+
+
+_shared_transport = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_transport(pool_size=None):
+    """
+    Retourne le transport partagé du processus, créé au premier appel.
+
+    Si une taille de pool supérieure est demandée (niveau de concurrence
+    plus élevé), le transport est recréé avec cette taille et l'ancien est
+    fermé (les requêtes en cours se terminent, leurs connexions ne sont pas
+    réutilisées).
+    """
+    global _shared_transport
+    with _shared_lock:
+        if _shared_transport is None or (pool_size and pool_size > _shared_transport.pool_size):
+            previous = _shared_transport
+            _shared_transport = HttpTransport(pool_size=pool_size or DEFAULT_POOL_SIZE)
+            if previous is not None:
+                previous.close()
+        return _shared_transport
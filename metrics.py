@@ -0,0 +1,227 @@
+# Fichier : metrics.py
+
+"""
+Métriques de performance des appels API et des étapes de génération.
+
+Par endpoint : latence (p50/p95/p99), octets reçus, codes HTTP, tentatives
+supplémentaires et taux de succès du cache de réponses. Par étape
+(chargement des matchs, préchargement, cotes, calcul, sauvegarde) : temps
+cumulé et nombre d'exécutions.
+
+Les métriques sont exportées en JSON (artefact d'une exécution, comparable
+d'un jour à l'autre) et au format texte Prometheus :
+
+    python daily_predictions_generator.py   # écrit METRICS_JSON_PATH et METRICS_PROM_PATH
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+DEFAULT_JSON_PATH = os.environ.get('METRICS_JSON_PATH', 'metrics/daily_metrics.json')
+DEFAULT_PROM_PATH = os.environ.get('METRICS_PROM_PATH', 'metrics/daily_metrics.prom')
+
+# Nombre maximal de latences conservées par endpoint (processus Streamlit de longue durée)
+MAX_SAMPLES = 10000
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+PROM_PREFIX = 'football_predictor'
+
+
+def quantile(sorted_values, q):
+    """Quantile par interpolation linéaire d'une liste triée (None si vide)."""
+    if not sorted_values:
+        return None
+    position = (len(sorted_values) - 1) * q
+    low = int(position)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (position - low)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class _EndpointStats:
+    def __init__(self):
+        self.latencies = deque(maxlen=MAX_SAMPLES)
+        self.count = 0
+        self.latency_sum = 0.0
+        self.bytes = 0
+        self.retries = 0
+        self.errors = 0
+        self.statuses = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+
+class Metrics:
+    """Registre thread-safe des métriques d'un processus."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+        self._stages = {}
+        self.started_at = time.time()
+
+    def _endpoint(self, endpoint):
+        if endpoint not in self._endpoints:
+            self._endpoints[endpoint] = _EndpointStats()
+        return self._endpoints[endpoint]
+
+    # --- Enregistrement ---
+
+    def observe_request(self, endpoint, seconds, size=0, status=None, retries=0):
+        """Enregistre un appel HTTP (status None = erreur réseau)."""
+        with self._lock:
+            stats = self._endpoint(endpoint)
+            stats.latencies.append(seconds)
+            stats.count += 1
+            stats.latency_sum += seconds
+            stats.bytes += size
+            stats.retries += retries
+            key = str(status) if status is not None else 'error'
+            stats.statuses[key] = stats.statuses.get(key, 0) + 1
+            if status is None or status >= 400:
+                stats.errors += 1
+
+    def observe_cache(self, endpoint, hit):
+        with self._lock:
+            stats = self._endpoint(endpoint)
+            if hit:
+                stats.cache_hits += 1
+            else:
+                stats.cache_misses += 1
+
+    def observe_stage(self, name, seconds):
+        with self._lock:
+            total, count = self._stages.get(name, (0.0, 0))
+            self._stages[name] = (total + seconds, count + 1)
+
+    @contextmanager
+    def stage(self, name):
+        """Mesure le temps d'exécution d'un bloc, cumulé sous `name`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe_stage(name, time.perf_counter() - start)
+
+    # --- Export ---
+
+    def snapshot(self):
+        """Toutes les métriques sous forme de dict sérialisable en JSON."""
+        with self._lock:
+            endpoints = {}
+            for endpoint, stats in sorted(self._endpoints.items()):
+                latencies = sorted(stats.latencies)
+                lookups = stats.cache_hits + stats.cache_misses
+                endpoints[endpoint] = {
+                    'requests': stats.count,
+                    'errors': stats.errors,
+                    'retries': stats.retries,
+                    'bytes': stats.bytes,
+                    'statuses': dict(stats.statuses),
+                    'latency_sum_s': round(stats.latency_sum, 6),
+                    **{f"latency_p{int(q * 100)}_ms": (None if not latencies
+                                                       else round(quantile(latencies, q) * 1000, 2))
+                       for q in QUANTILES},
+                    'cache_hits': stats.cache_hits,
+                    'cache_misses': stats.cache_misses,
+                    'cache_hit_ratio': round(stats.cache_hits / lookups, 4) if lookups else None,
+                }
+            stages = {name: {'seconds': round(total, 6), 'count': count}
+                      for name, (total, count) in sorted(self._stages.items())}
+        return {
+            'started_at': self.started_at,
+            'generated_at': time.time(),
+            'endpoints': endpoints,
+            'stages': stages,
+        }
+
+    def to_prometheus(self):
+        """Métriques au format texte d'exposition Prometheus."""
+        snapshot = self.snapshot()
+        with self._lock:
+            latencies = {endpoint: sorted(stats.latencies) for endpoint, stats in self._endpoints.items()}
+
+        lines = []
+
+        def family(name, kind, help_text):
+            lines.append(f"# HELP {PROM_PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {PROM_PREFIX}_{name} {kind}")
+
+        def sample(name, labels, value):
+            label_text = ','.join(f'{key}="{_escape(val)}"' for key, val in labels.items())
+            lines.append(f"{PROM_PREFIX}_{name}{{{label_text}}} {value}")
+
+        endpoints = snapshot['endpoints']
+        family('api_request_duration_seconds', 'summary', "Latence des appels API par endpoint.")
+        for endpoint, stats in endpoints.items():
+            for q in QUANTILES:
+                value = quantile(latencies[endpoint], q)
+                if value is not None:
+                    sample('api_request_duration_seconds', {'endpoint': endpoint, 'quantile': q}, f"{value:.6f}")
+            sample('api_request_duration_seconds_sum', {'endpoint': endpoint}, stats['latency_sum_s'])
+            sample('api_request_duration_seconds_count', {'endpoint': endpoint}, stats['requests'])
+
+        family('api_requests_total', 'counter', "Appels API par endpoint et code HTTP.")
+        for endpoint, stats in endpoints.items():
+            for status, count in sorted(stats['statuses'].items()):
+                sample('api_requests_total', {'endpoint': endpoint, 'status': status}, count)
+
+        for name, key, help_text in (
+            ('api_response_bytes_total', 'bytes', "Octets reçus par endpoint."),
+            ('api_retries_total', 'retries', "Tentatives supplémentaires par endpoint."),
+            ('api_cache_hits_total', 'cache_hits', "Réponses servies par le cache, par endpoint."),
+            ('api_cache_misses_total', 'cache_misses', "Réponses absentes du cache, par endpoint."),
+        ):
+            family(name, 'counter', help_text)
+            for endpoint, stats in endpoints.items():
+                sample(name, {'endpoint': endpoint}, stats[key])
+
+        family('stage_duration_seconds_total', 'counter', "Temps cumulé par étape de génération.")
+        for stage, stats in snapshot['stages'].items():
+            sample('stage_duration_seconds_total', {'stage': stage}, stats['seconds'])
+        family('stage_runs_total', 'counter', "Exécutions par étape de génération.")
+        for stage, stats in snapshot['stages'].items():
+            sample('stage_runs_total', {'stage': stage}, stats['count'])
+
+        return '\n'.join(lines) + '\n'
+
+    def write(self, json_path=DEFAULT_JSON_PATH, prom_path=DEFAULT_PROM_PATH):
+        """Écrit les exports JSON et Prometheus."""
+        for path, content in ((json_path, json.dumps(self.snapshot(), indent=2, ensure_ascii=False)),
+                              (prom_path, self.to_prometheus())):
+            if not path:
+                continue
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(content)
+
+    def summary(self):
+        """Résumé lisible : latences par endpoint et temps par étape."""
+        snapshot = self.snapshot()
+        parts = [f"{endpoint}: {stats['requests']} appels, p50 {stats['latency_p50_ms']} ms, "
+                 f"p95 {stats['latency_p95_ms']} ms, p99 {stats['latency_p99_ms']} ms"
+                 for endpoint, stats in snapshot['endpoints'].items() if stats['requests']]
+        parts += [f"{stage}: {stats['seconds']:.2f}s" for stage, stats in snapshot['stages'].items()]
+        return ' | '.join(parts) if parts else "aucune mesure"
+
+
+_shared_metrics = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_metrics():
+    """Retourne le registre de métriques partagé du processus."""
+    global _shared_metrics
+    with _shared_lock:
+        if _shared_metrics is None:
+            _shared_metrics = Metrics()
+        return _shared_metrics
@@ -0,0 +1,213 @@
+# Fichier : prediction_cache.py
+
+"""
+Cache local des prédictions générées par la page "Matchs du Jour".
+
+Une ligne par match dans une base SQLite (WAL) : les écritures sont
+atomiques et verrouillées entre processus par SQLite, chaque entrée a sa
+propre date d'expiration et l'on peut lire, remplacer ou invalider une
+seule ligue sans toucher au reste de la journée. Seuls les champs du
+match utiles à l'affichage sont conservés. Une journée marquée complète
+ne l'est que jusqu'à l'expiration de sa plus ancienne entrée : au-delà,
+des ligues manqueraient et la génération doit reprendre.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_PREDICTION_CACHE_PATH = os.environ.get('PREDICTION_CACHE_PATH', 'data/cache/predictions_cache.sqlite')
+DEFAULT_PREDICTION_TTL = int(os.environ.get('PREDICTION_CACHE_TTL', 6 * 3600))
+
+
+def slim_fixture(fixture):
+    """Champs d'un match au format API nécessaires à l'affichage."""
+    venue = fixture['fixture'].get('venue') or {}
+    return {
+        'fixture': {
+            'id': fixture['fixture']['id'],
+            'timestamp': fixture['fixture']['timestamp'],
+            'venue': {'name': venue.get('name'), 'city': venue.get('city')},
+        },
+        'league': {'id': fixture['league']['id'], 'name': fixture['league']['name']},
+        'teams': {
+            side: {
+                'id': fixture['teams'][side]['id'],
+                'name': fixture['teams'][side]['name'],
+                'logo': fixture['teams'][side].get('logo'),
+            }
+            for side in ('home', 'away')
+        },
+    }
+
+
+class PredictionCache:
+    """Cache SQLite des prédictions, une entrée par match."""
+
+    def __init__(self, path=DEFAULT_PREDICTION_CACHE_PATH, ttl=DEFAULT_PREDICTION_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS cached_predictions (
+                fixture_id INTEGER PRIMARY KEY,
+                match_date TEXT NOT NULL,
+                league_name TEXT NOT NULL,
+                kickoff_ts INTEGER NOT NULL,
+                payload TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_cached_predictions_day "
+            "ON cached_predictions (match_date, league_name, kickoff_ts)"
+        )
+        # Journées entièrement générées (une génération interrompue reste partielle)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS completed_days (
+                match_date TEXT PRIMARY KEY,
+                completed_at REAL NOT NULL,
+                expires_at REAL NOT NULL DEFAULT 0
+            )
+        """)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(completed_days)")}
+        if 'expires_at' not in columns:
+            # Anciens caches : les journées marquées sont considérées expirées
+            self._conn.execute("ALTER TABLE completed_days ADD COLUMN expires_at REAL NOT NULL DEFAULT 0")
+        self._conn.commit()
+
+    # --- Écriture ---
+
+    def _rows(self, match_date, matches, now):
+        rows = []
+        for match_data in matches:
+            fixture = slim_fixture(match_data['fixture'])
+            payload = dict(match_data, fixture=fixture)
+            rows.append((
+                fixture['fixture']['id'], match_date, fixture['league']['name'], fixture['fixture']['timestamp'],
+                json.dumps(payload, ensure_ascii=False, separators=(',', ':')), now, now + self.ttl
+            ))
+        return rows
+
+    def put_many(self, match_date, matches):
+        """Ajoute ou remplace des prédictions (dicts fixture/prediction/odds/analysis_logs)."""
+        now = time.time()
+        rows = self._rows(match_date, matches, now)
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO cached_predictions "
+                "(fixture_id, match_date, league_name, kickoff_ts, payload, created_at, expires_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+        return len(rows)
+
+    def replace_league(self, match_date, league_name, matches):
+        """Remplace en une transaction toutes les prédictions d'une ligue pour la journée."""
+        now = time.time()
+        rows = self._rows(match_date, matches, now)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM cached_predictions WHERE match_date = ? AND league_name = ?",
+                (match_date, league_name)
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO cached_predictions "
+                "(fixture_id, match_date, league_name, kickoff_ts, payload, created_at, expires_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+        return len(rows)
+
+    def mark_complete(self, match_date):
+        """
+        Indique que toutes les ligues de la journée sont en cache, jusqu'à
+        l'expiration de la plus ancienne de ses entrées.
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            earliest = self._conn.execute(
+                "SELECT MIN(expires_at) FROM cached_predictions WHERE match_date = ? AND expires_at > ?",
+                (match_date, now)
+            ).fetchone()[0]
+            self._conn.execute(
+                "INSERT OR REPLACE INTO completed_days (match_date, completed_at, expires_at) VALUES (?, ?, ?)",
+                (match_date, now, earliest if earliest is not None else now + self.ttl)
+            )
+
+    def is_complete(self, match_date):
+        """Vrai si la journée a été entièrement générée et qu'aucune de ses entrées n'a expiré."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT 1 FROM completed_days WHERE match_date = ? AND expires_at > ?", (match_date, time.time())
+            ).fetchone() is not None
+
+    def invalidate(self, match_date, league_name=None):
+        """Supprime les prédictions d'une journée, ou d'une seule de ses ligues."""
+        query = "DELETE FROM cached_predictions WHERE match_date = ?"
+        params = (match_date,)
+        if league_name is not None:
+            query += " AND league_name = ?"
+            params += (league_name,)
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM completed_days WHERE match_date = ?", (match_date,))
+            return self._conn.execute(query, params).rowcount
+
+    def evict_expired(self):
+        """Supprime les entrées expirées et les marques de complétude des journées concernées."""
+        now = time.time()
+        with self._lock, self._conn:
+            evicted = self._conn.execute(
+                "DELETE FROM cached_predictions WHERE expires_at <= ?", (now,)
+            ).rowcount
+            self._conn.execute("DELETE FROM completed_days WHERE expires_at <= ?", (now,))
+        return evicted
+
+    # --- Lecture ---
+
+    def load_day(self, match_date, leagues=None):
+        """
+        Prédictions valides d'une journée, éventuellement limitées à certaines ligues.
+
+        Returns:
+            tuple[dict, float | None]: Les prédictions par ligue (ligues et matchs
+            dans l'ordre du coup d'envoi) et l'horodatage de la plus ancienne entrée.
+        """
+        query = ("SELECT league_name, payload, created_at FROM cached_predictions "
+                 "WHERE match_date = ? AND expires_at > ?")
+        params = [match_date, time.time()]
+        if leagues is not None:
+            leagues = list(leagues)
+            query += f" AND league_name IN ({','.join('?' * len(leagues))})"
+            params.extend(leagues)
+        query += " ORDER BY kickoff_ts"
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+
+        data = {}
+        for league_name, payload, _ in rows:
+            data.setdefault(league_name, []).append(json.loads(payload))
+        oldest = min((row[2] for row in rows), default=None)
+        return data, oldest
+
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_prediction_cache():
+    """Retourne le cache de prédictions partagé du processus."""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = PredictionCache()
+        return _shared_cache
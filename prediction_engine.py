@@ -5,8 +5,49 @@ Moteur de prédiction des résultats de matchs de football.
 
 Ce module utilisera les données collectées par l'api_client pour
 calculer des probabilités et prédire l'issue des matchs.
+La forme et le H2H sont lus dans l'entrepôt local des matchs terminés
+lorsqu'il couvre les derniers matchs de l'équipe ou les confrontations
+de la paire, sinon ils sont demandés à l'API.
 """
+import numpy as np
+import pandas as pd
+
 import api_client
+from fixtures_warehouse import get_shared_warehouse
+
+# Paramètres du modèle
+FORM_WINDOW = 5          # Nombre de matchs pris en compte pour la forme
+FORM_WEIGHT = 0.7        # Poids de la forme dans le score final
+H2H_WEIGHT = 0.3         # Poids du H2H dans le score final (équipe à domicile)
+DECISION_MARGIN = 1.0    # Écart de score minimal pour prédire une victoire
+
+# Paramètres de confiance (identiques au générateur quotidien)
+CONFIDENCE_BASE = 0.5
+CONFIDENCE_SLOPE = 0.1
+CONFIDENCE_CAP = 0.9
+DRAW_CONFIDENCE = 0.6
+
+OUTCOME_LABELS = {
+    'HOME': "Victoire Domicile",
+    'DRAW': "Match Nul",
+    'AWAY': "Victoire Extérieur",
+}
+
+def _get_team_history(team_id, n=5):
+    """Derniers matchs d'une équipe : entrepôt local si possible, sinon API."""
+    warehouse = get_shared_warehouse()
+    if warehouse.covers_form(team_id, n):
+        return warehouse.last_n_fixtures(team_id, n)
+    return api_client.get_last_n_fixtures(team_id, n=n)
+
+def _get_head_to_head_history(home_team_id, away_team_id):
+    """Confrontations entre deux équipes : entrepôt local si la paire est couverte, sinon API."""
+    warehouse = get_shared_warehouse()
+    if warehouse.covers_head_to_head(home_team_id, away_team_id):
+        return warehouse.head_to_head(home_team_id, away_team_id)
+    h2h_data = api_client.get_head_to_head(home_team_id, away_team_id)
+    warehouse.record_head_to_head(home_team_id, away_team_id, h2h_data)
+    return h2h_data
 
 def _calculate_h2h_score(h2h_data, home_team_id):
     """Calcule un score basé sur l'historique des confrontations."""
@@ -37,10 +78,11 @@ def _calculate_h2h_score(h2h_data, home_team_id):
             
     return home_score
 
-def _calculate_form_score(team_id):
-    """Calcule un score de forme basé sur les 5 derniers matchs."""
+def _calculate_form_score(team_id, last_fixtures=None):
+    """Calcule un score de forme basé sur les 5 derniers matchs (chargés si non fournis)."""
     form_score = 0
-    last_fixtures = api_client.get_last_n_fixtures(team_id, n=5)
+    if last_fixtures is None:
+        last_fixtures = _get_team_history(team_id, n=FORM_WINDOW)
     
     if not last_fixtures or not last_fixtures.get('response'):
         return form_score
@@ -67,12 +109,16 @@ def _calculate_form_score(team_id):
         
     return form_score
 
-def predict_match(fixture):
+def predict_match(fixture, prefetched=None, ratings=None):
     """
     Analyse un match et prédit son issue.
     
     Args:
         fixture (dict): Un dictionnaire représentant un match, venant de l'API.
+        prefetched (PrefetchedData, optional): Données préchargées par le
+            prefetch_planner ; si fournies, aucun appel API n'est effectué.
+        ratings (TeamRatings, optional): Classements Elo ; si les deux équipes
+            sont classées, la prédiction en découle sans lecture d'historique.
         
     Returns:
         tuple[str, list[str]]: La prédiction et une liste de logs d'analyse.
@@ -86,27 +132,214 @@ def predict_match(fixture):
     analysis_logs = []
     analysis_logs.append(f"--- Analyse du match : {home_team_name} vs {away_team_name} ---")
 
+    # 0. Classements Elo, s'ils couvrent les deux équipes
+    rated = ratings.predict(fixture) if ratings is not None else None
+    if rated is not None:
+        outcome, _, expected, home_rating, away_rating = rated
+        analysis_logs.append(f"Classement Elo : {home_team_name} ({home_rating:.0f}) vs {away_team_name} ({away_rating:.0f})")
+        analysis_logs.append(f"Score attendu de {home_team_name} : {expected:.2f}")
+        if outcome == 'HOME':
+            return f"Victoire {home_team_name}", analysis_logs
+        if outcome == 'AWAY':
+            return f"Victoire {away_team_name}", analysis_logs
+        return "Match Nul", analysis_logs
+
     # 1. Calcul du score de forme
-    home_form_score = _calculate_form_score(home_team_id)
-    away_form_score = _calculate_form_score(away_team_id)
+    if prefetched is not None:
+        home_form_score = _calculate_form_score(home_team_id, prefetched.team_last(home_team_id) or {})
+        away_form_score = _calculate_form_score(away_team_id, prefetched.team_last(away_team_id) or {})
+    else:
+        home_form_score = _calculate_form_score(home_team_id)
+        away_form_score = _calculate_form_score(away_team_id)
     analysis_logs.append(f"Score de Forme : {home_team_name} ({home_form_score}) vs {away_team_name} ({away_form_score})")
     
     # 2. Calcul du score H2H (Head-to-Head)
-    h2h_data = api_client.get_head_to_head(home_team_id, away_team_id)
+    if prefetched is not None:
+        h2h_data = prefetched.head_to_head(home_team_id, away_team_id)
+    else:
+        h2h_data = _get_head_to_head_history(home_team_id, away_team_id)
     h2h_score = _calculate_h2h_score(h2h_data, home_team_id)
     analysis_logs.append(f"Score H2H (avantage {home_team_name}): {h2h_score}")
 
     # 3. Calcul du score final et prédiction
-    final_home_score = (home_form_score * 0.7) + (h2h_score * 0.3)
-    final_away_score = away_form_score * 0.7
+    final_home_score = (home_form_score * FORM_WEIGHT) + (h2h_score * H2H_WEIGHT)
+    final_away_score = away_form_score * FORM_WEIGHT
     analysis_logs.append(f"Score Final Pondéré : {home_team_name} ({final_home_score:.2f}) vs {away_team_name} ({final_away_score:.2f})")
 
     # Logique de décision
-    if final_home_score > final_away_score + 1:
+    if final_home_score > final_away_score + DECISION_MARGIN:
         prediction = f"Victoire {home_team_name}"
-    elif final_away_score > final_home_score + 1:
+    elif final_away_score > final_home_score + DECISION_MARGIN:
         prediction = f"Victoire {away_team_name}"
     else:
         prediction = "Match Nul"
 
     return prediction, analysis_logs
+
+
+# --- Prédiction vectorisée ---
+
+def fixtures_to_frame(fixtures):
+    """Convertit une liste de matchs au format API en DataFrame pour predict_batch."""
+    return pd.DataFrame({
+        'fixture_id': [f['fixture']['id'] for f in fixtures],
+        'kickoff_ts': [f['fixture']['timestamp'] for f in fixtures],
+        'home_team_id': [f['teams']['home']['id'] for f in fixtures],
+        'away_team_id': [f['teams']['away']['id'] for f in fixtures],
+    })
+
+def _form_table(results_df, window):
+    """
+    Forme cumulée de chaque équipe après chacun de ses matchs.
+
+    Une ligne par (équipe, match) avec la somme des points (2/1/0) des
+    `window` derniers matchs joués, match courant inclus.
+    """
+    goals_home = results_df['goals_home'].to_numpy()
+    goals_away = results_df['goals_away'].to_numpy()
+    home_points = np.select([goals_home > goals_away, goals_home == goals_away], [2, 1], 0)
+    away_points = np.select([goals_away > goals_home, goals_home == goals_away], [2, 1], 0)
+
+    long_df = pd.DataFrame({
+        'team_id': np.concatenate([results_df['home_team_id'].to_numpy(), results_df['away_team_id'].to_numpy()]),
+        'kickoff_ts': np.concatenate([results_df['kickoff_ts'].to_numpy(), results_df['kickoff_ts'].to_numpy()]),
+        'points': np.concatenate([home_points, away_points]),
+    }).sort_values(['team_id', 'kickoff_ts'], kind='mergesort')
+
+    cumulative = long_df.groupby('team_id')['points'].cumsum()
+    previous = cumulative.groupby(long_df['team_id']).shift(window, fill_value=0)
+    long_df['form'] = cumulative - previous
+    return long_df[['team_id', 'kickoff_ts', 'form']].sort_values('kickoff_ts', kind='mergesort')
+
+def _h2h_table(results_df):
+    """
+    Score H2H cumulé de chaque paire d'équipes après chacune de ses confrontations,
+    du point de vue de l'équipe au plus petit id (h2h_low) et de l'autre (h2h_high).
+    """
+    home_ids = results_df['home_team_id'].to_numpy()
+    away_ids = results_df['away_team_id'].to_numpy()
+    goals_home = results_df['goals_home'].to_numpy()
+    goals_away = results_df['goals_away'].to_numpy()
+
+    team_low = np.minimum(home_ids, away_ids)
+    winner = np.where(goals_home > goals_away, home_ids, np.where(goals_away > goals_home, away_ids, -1))
+    score_low = np.where(winner == -1, 1, np.where(winner == team_low, 2, -2))
+    score_high = np.where(winner == -1, 1, np.where(winner == team_low, -2, 2))
+
+    pairs_df = pd.DataFrame({
+        'team_low': team_low,
+        'team_high': np.maximum(home_ids, away_ids),
+        'kickoff_ts': results_df['kickoff_ts'].to_numpy(),
+        'h2h_low': score_low,
+        'h2h_high': score_high,
+    }).sort_values(['team_low', 'team_high', 'kickoff_ts'], kind='mergesort')
+
+    grouped = pairs_df.groupby(['team_low', 'team_high'])
+    pairs_df['h2h_low'] = grouped['h2h_low'].cumsum()
+    pairs_df['h2h_high'] = grouped['h2h_high'].cumsum()
+    return pairs_df.sort_values('kickoff_ts', kind='mergesort')
+
+def batch_features(fixtures_df, results_df, form_window=FORM_WINDOW):
+    """
+    Scores de forme et H2H de chaque match, calculés à partir des seuls
+    résultats antérieurs à son coup d'envoi (pas de fuite d'information).
+
+    Args:
+        fixtures_df (pd.DataFrame): Colonnes fixture_id, kickoff_ts,
+            home_team_id, away_team_id (colonnes supplémentaires conservées).
+        results_df (pd.DataFrame): Matchs terminés, colonnes kickoff_ts,
+            home_team_id, away_team_id, goals_home, goals_away.
+
+    Returns:
+        pd.DataFrame: fixtures_df enrichi des colonnes home_form, away_form
+        et h2h_score, dans l'ordre d'origine.
+    """
+    fixtures = fixtures_df.reset_index(drop=True).copy()
+    fixtures['_order'] = np.arange(len(fixtures))
+    fixtures['kickoff_ts'] = fixtures['kickoff_ts'].astype('int64')
+    fixtures['team_low'] = np.minimum(fixtures['home_team_id'], fixtures['away_team_id'])
+    fixtures['team_high'] = np.maximum(fixtures['home_team_id'], fixtures['away_team_id'])
+    fixtures = fixtures.sort_values('kickoff_ts', kind='mergesort')
+
+    results = results_df.dropna(subset=['goals_home', 'goals_away'])
+    results = results.astype({'kickoff_ts': 'int64', 'home_team_id': 'int64', 'away_team_id': 'int64'})
+
+    # 1. Forme : dernier état strictement antérieur au coup d'envoi
+    form = _form_table(results, form_window)
+    for side in ('home', 'away'):
+        fixtures = pd.merge_asof(
+            fixtures, form.rename(columns={'team_id': f'{side}_team_id', 'form': f'{side}_form'}),
+            on='kickoff_ts', by=f'{side}_team_id', allow_exact_matches=False, direction='backward'
+        )
+        fixtures[f'{side}_form'] = fixtures[f'{side}_form'].fillna(0)
+
+    # 2. H2H du point de vue de l'équipe à domicile
+    h2h = _h2h_table(results)
+    fixtures = pd.merge_asof(
+        fixtures, h2h, on='kickoff_ts', by=['team_low', 'team_high'],
+        allow_exact_matches=False, direction='backward'
+    )
+    home_is_low = fixtures['home_team_id'] == fixtures['team_low']
+    fixtures['h2h_score'] = np.where(home_is_low, fixtures['h2h_low'], fixtures['h2h_high'])
+    fixtures['h2h_score'] = fixtures['h2h_score'].fillna(0)
+
+    fixtures = fixtures.sort_values('_order').reset_index(drop=True)
+    return fixtures.drop(columns=['_order', 'team_low', 'team_high', 'h2h_low', 'h2h_high'])
+
+def decide_batch(home_form, away_form, h2h_score, form_weight=FORM_WEIGHT, h2h_weight=H2H_WEIGHT,
+                 margin=DECISION_MARGIN, confidence_slope=CONFIDENCE_SLOPE):
+    """
+    Scores pondérés, décision et confiance (mêmes expressions que le chemin
+    match par match) sur des tableaux numpy.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]: final_home,
+        final_away, outcome ('HOME'/'DRAW'/'AWAY') et confidence.
+    """
+    final_home = home_form * form_weight + h2h_score * h2h_weight
+    final_away = away_form * form_weight
+    home_win = final_home > final_away + margin
+    away_win = ~home_win & (final_away > final_home + margin)
+
+    outcome = np.where(home_win, 'HOME', np.where(away_win, 'AWAY', 'DRAW'))
+    confidence = np.where(
+        home_win | away_win,
+        np.minimum(CONFIDENCE_CAP, CONFIDENCE_BASE + np.abs(final_home - final_away) * confidence_slope),
+        DRAW_CONFIDENCE
+    )
+    return final_home, final_away, outcome, confidence
+
+def predict_batch(fixtures_df, results_df, form_weight=FORM_WEIGHT, h2h_weight=H2H_WEIGHT,
+                  margin=DECISION_MARGIN, confidence_slope=CONFIDENCE_SLOPE, form_window=FORM_WINDOW):
+    """
+    Prédit l'issue d'un ensemble de matchs en une seule passe vectorisée.
+
+    Les scores sont calculés à partir des seuls résultats antérieurs au
+    coup d'envoi de chaque match (pas de fuite d'information), avec les
+    mêmes règles que predict_match.
+
+    Args:
+        fixtures_df (pd.DataFrame): Colonnes fixture_id, kickoff_ts,
+            home_team_id, away_team_id.
+        results_df (pd.DataFrame): Matchs terminés, colonnes kickoff_ts,
+            home_team_id, away_team_id, goals_home, goals_away.
+
+    Returns:
+        pd.DataFrame: fixtures_df enrichi des colonnes home_form, away_form,
+        h2h_score, final_home_score, final_away_score, outcome
+        ('HOME'/'DRAW'/'AWAY'), predicted_outcome et confidence, dans
+        l'ordre d'origine.
+    """
+    fixtures = batch_features(fixtures_df, results_df, form_window)
+
+    # 3. Scores pondérés et décision
+    final_home, final_away, outcome, confidence = decide_batch(
+        fixtures['home_form'].to_numpy(), fixtures['away_form'].to_numpy(), fixtures['h2h_score'].to_numpy(),
+        form_weight, h2h_weight, margin, confidence_slope
+    )
+    fixtures['final_home_score'] = final_home
+    fixtures['final_away_score'] = final_away
+    fixtures['outcome'] = outcome
+    fixtures['predicted_outcome'] = fixtures['outcome'].map(OUTCOME_LABELS)
+    fixtures['confidence'] = confidence
+    return fixtures
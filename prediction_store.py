@@ -0,0 +1,225 @@
+# Fichier : prediction_store.py
+
+"""
+Base SQLite des prédictions Streamlit : connexion et migrations du schéma.
+
+Le schéma est versionné par `PRAGMA user_version` : chaque migration n'est
+appliquée qu'une fois, dans l'ordre, au premier accès à la base. La
+colonne `prediction_date` (date du jour de la prédiction, stockée) et les
+index associés permettent de filtrer par jour, statut ou ligue sans
+parcourir toute la table ; la recherche par fixture_id s'appuie sur l'index
+de la contrainte UNIQUE.
+"""
+import os
+
+from sqlalchemy import create_engine, event, text
+
+DEFAULT_DB_PATH = os.environ.get('PREDICTIONS_DB_PATH', 'predictions.db')
+
+# Réglages appliqués à chaque nouvelle connexion SQLite
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-16000",  # 16 Mo
+    "PRAGMA foreign_keys=ON",
+)
+
+
+def _columns(connection, table):
+    return {row[1] for row in connection.execute(text(f"PRAGMA table_info({table})")).fetchall()}
+
+
+def _add_columns(connection, table, columns):
+    """Ajoute les colonnes absentes (les anciennes bases ont pu en recevoir certaines à la main)."""
+    existing = _columns(connection, table)
+    for name, definition in columns:
+        if name not in existing:
+            connection.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {definition}"))
+
+
+def _migration_1(connection):
+    """Table initiale des prédictions."""
+    connection.execute(text("""
+        CREATE TABLE IF NOT EXISTS predictions (
+            id INTEGER PRIMARY KEY,
+            prediction_ts TIMESTAMP,
+            fixture_id INTEGER UNIQUE,
+            match_desc TEXT,
+            predicted_outcome TEXT,
+            odds_home REAL,
+            odds_draw REAL,
+            odds_away REAL,
+            status TEXT DEFAULT 'PENDING'
+        )
+    """))
+
+
+def _migration_2(connection):
+    """Colonnes de résultat renseignées par le règlement."""
+    _add_columns(connection, 'predictions', [
+        ('actual_result', 'TEXT'),
+        ('home_score', 'INTEGER'),
+        ('away_score', 'INTEGER'),
+    ])
+
+
+def _migration_3(connection):
+    """Date de prédiction stockée et index de consultation."""
+    _add_columns(connection, 'predictions', [('prediction_date', 'TEXT')])
+    connection.execute(text(
+        "UPDATE predictions SET prediction_date = DATE(prediction_ts) WHERE prediction_date IS NULL"
+    ))
+    connection.execute(text(
+        "CREATE INDEX IF NOT EXISTS idx_predictions_date ON predictions (prediction_date)"
+    ))
+    connection.execute(text(
+        "CREATE INDEX IF NOT EXISTS idx_predictions_status_ts ON predictions (status, prediction_ts)"
+    ))
+
+
+def _migration_4(connection):
+    """Ligue du match, indexée pour le filtrage de l'historique."""
+    _add_columns(connection, 'predictions', [
+        ('league_id', 'INTEGER'),
+        ('league_name', 'TEXT'),
+    ])
+    connection.execute(text(
+        "CREATE INDEX IF NOT EXISTS idx_predictions_league ON predictions (league_id, prediction_date)"
+    ))
+
+
+def _migration_5(connection):
+    """Métadonnées d'affichage du match, pour afficher la page du jour sans appel API."""
+    _add_columns(connection, 'predictions', [
+        ('home_team_name', 'TEXT'),
+        ('away_team_name', 'TEXT'),
+        ('home_logo', 'TEXT'),
+        ('away_logo', 'TEXT'),
+        ('kickoff_ts', 'INTEGER'),
+        ('venue_name', 'TEXT'),
+        ('venue_city', 'TEXT'),
+    ])
+
+
+# Migrations dans l'ordre ; la version du schéma est l'indice + 1
+MIGRATIONS = [_migration_1, _migration_2, _migration_3, _migration_4, _migration_5]
+
+
+def fixture_metadata(fixture):
+    """Colonnes d'affichage d'une prédiction, extraites d'un match au format API."""
+    venue = fixture['fixture'].get('venue') or {}
+    return {
+        'league_id': fixture['league']['id'],
+        'league_name': fixture['league']['name'],
+        'home_team_name': fixture['teams']['home']['name'],
+        'away_team_name': fixture['teams']['away']['name'],
+        'home_logo': fixture['teams']['home'].get('logo'),
+        'away_logo': fixture['teams']['away'].get('logo'),
+        'kickoff_ts': fixture['fixture']['timestamp'],
+        'venue_name': venue.get('name'),
+        'venue_city': venue.get('city'),
+    }
+
+
+def prediction_row(fixture, prediction, odds, predicted_at):
+    """Ligne de la table predictions pour un match, ou None si les cotes sont incomplètes."""
+    if not odds or any(odds.get(key) in (None, 'N/A') for key in ('home', 'draw', 'away')):
+        return None
+    home_team = fixture['teams']['home']['name']
+    away_team = fixture['teams']['away']['name']
+    return {
+        'fixture_id': fixture['fixture']['id'],
+        'prediction_ts': predicted_at,
+        'prediction_date': predicted_at.strftime('%Y-%m-%d'),
+        'match_desc': f"{home_team} vs {away_team}",
+        'predicted_outcome': prediction,
+        'odds_home': float(odds['home']),
+        'odds_draw': float(odds['draw']),
+        'odds_away': float(odds['away']),
+        **fixture_metadata(fixture),
+    }
+
+
+_UPSERT_COLUMNS = (
+    'fixture_id', 'prediction_ts', 'prediction_date', 'match_desc', 'predicted_outcome',
+    'odds_home', 'odds_draw', 'odds_away', 'league_id', 'league_name', 'home_team_name', 'away_team_name',
+    'home_logo', 'away_logo', 'kickoff_ts', 'venue_name', 'venue_city',
+)
+
+# Colonnes rafraîchies si le match est déjà enregistré et pas encore réglé
+_REFRESHED_COLUMNS = [column for column in _UPSERT_COLUMNS
+                      if column not in ('fixture_id', 'prediction_ts', 'prediction_date')]
+
+
+def save_predictions(engine, rows):
+    """
+    Enregistre un lot de prédictions en une transaction (executemany).
+
+    Un match déjà présent garde sa date de prédiction ; sa prédiction, ses
+    cotes et ses métadonnées ne sont mises à jour que tant qu'il est PENDING.
+
+    Returns:
+        int: Le nombre de lignes envoyées.
+    """
+    rows = [row for row in rows if row is not None]
+    if not rows:
+        return 0
+    statement = text(f"""
+        INSERT INTO predictions ({', '.join(_UPSERT_COLUMNS)})
+        VALUES ({', '.join(':' + column for column in _UPSERT_COLUMNS)})
+        ON CONFLICT(fixture_id) DO UPDATE SET
+            {', '.join(f'{column} = excluded.{column}' for column in _REFRESHED_COLUMNS)}
+        WHERE predictions.status = 'PENDING'
+    """)
+    with engine.begin() as connection:
+        connection.execute(statement, rows)
+    return len(rows)
+
+
+def schema_version(connection):
+    return connection.execute(text("PRAGMA user_version")).scalar()
+
+
+def migrate(engine):
+    """
+    Applique les migrations manquantes, chacune dans sa transaction.
+
+    Le pilote sqlite3 n'ouvre pas de transaction avant un ordre DDL : la
+    connexion passe en autocommit et chaque migration est encadrée par
+    BEGIN IMMEDIATE / COMMIT, `PRAGMA user_version` compris. Une migration
+    qui échoue est annulée en entier ; un autre processus qui migre en même
+    temps attend le verrou puis relit la version.
+
+    Returns:
+        int: La version du schéma après migration.
+    """
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        version = schema_version(connection)
+        for index, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+            connection.execute(text("BEGIN IMMEDIATE"))
+            try:
+                if schema_version(connection) < index:
+                    migration(connection)
+                    connection.execute(text(f"PRAGMA user_version = {index}"))
+            except Exception:
+                connection.execute(text("ROLLBACK"))
+                raise
+            connection.execute(text("COMMIT"))
+        return max(schema_version(connection), len(MIGRATIONS))
+
+
+def create_store_engine(path=DEFAULT_DB_PATH):
+    """Moteur SQLAlchemy de la base des prédictions, pragmas appliqués et schéma à jour."""
+    engine = create_engine(f"sqlite:///{path}")
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, _):
+        cursor = dbapi_connection.cursor()
+        for pragma in CONNECTION_PRAGMAS:
+            cursor.execute(pragma)
+        cursor.close()
+
+    migrate(engine)
+    return engine
@@ -0,0 +1,294 @@
+# Fichier : prediction_worker.py
+
+"""
+Génération des prédictions du jour en arrière-plan, une seule à la fois.
+
+La génération appartient à un thread de fond. Avant de démarrer, le
+worker « réclame » la journée dans la table `generation_jobs` (dans la base
+du cache de prédictions) : la réclamation est une écriture SQL atomique,
+donc un seul processus ou thread l'obtient, même avec plusieurs sessions
+Streamlit ou plusieurs processus. Les sessions ne calculent rien : elles
+lisent l'état du job et les ligues déjà en cache.
+
+Le heartbeat est mis à jour par un thread dédié toutes les
+JOB_HEARTBEAT_SECONDS, quelle que soit la durée d'une étape (ingestion,
+chargement des matchs, ligue lente). Un job dont le heartbeat n'a pas été
+mis à jour depuis JOB_STALE_SECONDS (processus arrêté en cours de route)
+peut être repris par un autre worker ;
+les ligues déjà en cache ne sont pas recalculées. Un job en échec, ou
+partiel (matchs écartés faute de quota, journée non marquée complète dans
+le cache), n'est relancé que sur demande explicite (bouton de la page),
+pour ne pas consommer le quota à chaque interaction.
+"""
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+
+import prediction_engine
+import prediction_store
+from bulk_loader import load_fixtures_for_date
+from fixtures_warehouse import get_shared_warehouse
+from metrics import get_shared_metrics
+from prediction_cache import DEFAULT_PREDICTION_CACHE_PATH, get_shared_prediction_cache
+from prefetch_planner import build_plan, execute_plan_streaming, fixtures_within_budget
+from quota_manager import PRIORITY_CRITICAL, PRIORITY_NORMAL, get_shared_quota, prioritize_fixtures
+from ratings import USE_RATINGS, get_shared_ratings
+from response_cache import get_shared_cache
+
+logger = logging.getLogger(__name__)
+
+JOB_STALE_SECONDS = int(os.environ.get('PREDICTION_JOB_STALE_SECONDS', 600))
+JOB_HEARTBEAT_SECONDS = max(1, JOB_STALE_SECONDS // 10)
+
+BOOKMAKER_ID = 8
+
+
+class GenerationJobs:
+    """Table d'état des générations, une ligne par journée."""
+
+    def __init__(self, path=DEFAULT_PREDICTION_CACHE_PATH):
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS generation_jobs (
+                match_date TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                owner TEXT NOT NULL,
+                started_at REAL NOT NULL,
+                heartbeat_at REAL NOT NULL,
+                finished_at REAL,
+                leagues_total INTEGER NOT NULL DEFAULT 0,
+                leagues_done INTEGER NOT NULL DEFAULT 0,
+                fixtures_total INTEGER NOT NULL DEFAULT 0,
+                error TEXT
+            )
+        """)
+        self._conn.commit()
+
+    def claim(self, match_date, owner, retry=False):
+        """
+        Réclame la génération d'une journée.
+
+        Réussit si aucun job n'existe, si le précédent est terminé, ou si le
+        job en cours ne donne plus signe de vie. Un job en échec ou partiel
+        n'est réclamé que si `retry` est vrai.
+
+        Returns:
+            bool: True si `owner` doit lancer la génération.
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            cursor = self._conn.execute("""
+                INSERT INTO generation_jobs (match_date, status, owner, started_at, heartbeat_at)
+                VALUES (?, 'running', ?, ?, ?)
+                ON CONFLICT(match_date) DO UPDATE SET
+                    status = 'running', owner = excluded.owner, started_at = excluded.started_at,
+                    heartbeat_at = excluded.heartbeat_at, finished_at = NULL,
+                    leagues_total = 0, leagues_done = 0, fixtures_total = 0, error = NULL
+                WHERE generation_jobs.status = 'done'
+                   OR (generation_jobs.status IN ('failed', 'partial') AND ?)
+                   OR (generation_jobs.status = 'running' AND generation_jobs.heartbeat_at < ?)
+            """, (match_date, owner, now, now, bool(retry), now - JOB_STALE_SECONDS))
+            return cursor.rowcount == 1
+
+    def progress(self, match_date, owner, leagues_done, leagues_total, fixtures_total):
+        """Met à jour l'avancement (et le heartbeat) du job détenu par `owner`."""
+        with self._lock, self._conn:
+            self._conn.execute("""
+                UPDATE generation_jobs
+                SET leagues_done = ?, leagues_total = ?, fixtures_total = ?, heartbeat_at = ?
+                WHERE match_date = ? AND owner = ?
+            """, (leagues_done, leagues_total, fixtures_total, time.time(), match_date, owner))
+
+    def heartbeat(self, match_date, owner):
+        """Signale que le job détenu par `owner` est toujours en cours."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE generation_jobs SET heartbeat_at = ? WHERE match_date = ? AND owner = ?",
+                (time.time(), match_date, owner)
+            )
+
+    def finish(self, match_date, owner, status, error=None):
+        with self._lock, self._conn:
+            self._conn.execute("""
+                UPDATE generation_jobs SET status = ?, error = ?, finished_at = ?, heartbeat_at = ?
+                WHERE match_date = ? AND owner = ?
+            """, (status, error, time.time(), time.time(), match_date, owner))
+
+    def get(self, match_date):
+        """État du job d'une journée (dict), ou None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM generation_jobs WHERE match_date = ?", (match_date,)
+            ).fetchone()
+        return dict(row) if row else None
+
+
+def predict_with_odds(fixture, prefetched, ratings=None):
+    """Prédiction et cotes 1X2 d'un match à partir des données préchargées."""
+    try:
+        prediction, analysis_logs = prediction_engine.predict_match(fixture, prefetched, ratings)
+        parsed_odds = prefetched.odds_for(fixture['fixture']['id'])
+        if parsed_odds is not None:
+            parsed_odds = {key: value if value is not None else 'N/A' for key, value in parsed_odds.items()}
+        return prediction, parsed_odds, analysis_logs
+    except Exception as e:
+        return "Erreur de prédiction", None, [f"Erreur: {str(e)}"]
+
+
+def group_fixtures_by_league(fixtures):
+    """Matchs par ligue : ligues dans l'ordre de leur premier coup d'envoi, matchs dans l'ordre du coup d'envoi."""
+    fixtures_by_league = {}
+    for fixture in sorted(fixtures, key=lambda fixture: fixture['fixture']['timestamp']):
+        fixtures_by_league.setdefault(fixture['league']['name'], []).append(fixture)
+    return fixtures_by_league
+
+
+class PredictionWorker:
+    """Thread de fond qui génère, met en cache et enregistre les prédictions d'une journée."""
+
+    def __init__(self, fetch, league_ids, engine=None, jobs=None, cache=None, max_workers=8):
+        self.fetch = fetch
+        self.league_ids = list(league_ids)
+        self.engine = engine
+        self.jobs = jobs or GenerationJobs()
+        self.cache = cache or get_shared_prediction_cache()
+        self.max_workers = max_workers
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        # Matchs écartés faute de quota lors de la dernière génération
+        self.skipped_fixtures = 0
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def ensure_started(self, match_date, retry=False):
+        """
+        Lance la génération de la journée si personne ne s'en occupe déjà
+        (et, si `retry` est vrai, même si la précédente a échoué).
+
+        Returns:
+            bool: True si ce worker vient de la lancer.
+        """
+        with self._lock:
+            if self.is_running() or not self.jobs.claim(match_date, self.owner, retry):
+                return False
+            self._thread = threading.Thread(target=self._run, args=(match_date,),
+                                            name=f"prediction-worker-{match_date}", daemon=True)
+            self._thread.start()
+            return True
+
+    def _heartbeat(self, match_date, stopped):
+        while not stopped.wait(JOB_HEARTBEAT_SECONDS):
+            try:
+                self.jobs.heartbeat(match_date, self.owner)
+            except sqlite3.Error:
+                logger.warning("Heartbeat de la génération du %s non enregistré", match_date, exc_info=True)
+
+    def _run(self, match_date):
+        stopped = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(match_date, stopped),
+                                     name=f"prediction-heartbeat-{match_date}", daemon=True)
+        heartbeat.start()
+        try:
+            self.generate(match_date)
+            if self.skipped_fixtures:
+                self.jobs.finish(match_date, self.owner, 'partial',
+                                 f"Quota insuffisant : {self.skipped_fixtures} matchs non traités")
+            else:
+                self.jobs.finish(match_date, self.owner, 'done')
+        except Exception as e:
+            logger.exception("Échec de la génération des prédictions du %s", match_date)
+            self.jobs.finish(match_date, self.owner, 'failed', str(e))
+        finally:
+            stopped.set()
+            heartbeat.join()
+
+    def generate(self, match_date):
+        """
+        Génère toutes les ligues de la journée ; les ligues déjà en cache sont
+        reprises telles quelles. Si des matchs sont écartés faute de quota
+        (skipped_fixtures), la journée n'est pas marquée complète.
+        """
+        self.skipped_fixtures = 0
+        warehouse = get_shared_warehouse()
+        metrics = get_shared_metrics()
+        try:
+            # Rattrapage incrémental de l'historique local (jours manquants uniquement)
+            warehouse.sync(self.fetch, self.league_ids, bootstrap=False)
+        except Exception:
+            logger.warning("Mise à jour de l'entrepôt local impossible", exc_info=True)
+        ratings = get_shared_ratings(warehouse) if USE_RATINGS else None
+
+        with metrics.stage('fixture_load'):
+            fixtures = load_fixtures_for_date(self.fetch, match_date, self.league_ids,
+                                              priority=PRIORITY_CRITICAL)
+
+        # Quota insuffisant : ligues importantes et premiers coups d'envoi d'abord
+        budget = get_shared_quota().budget(PRIORITY_NORMAL)
+        if budget is not None:
+            selected = fixtures_within_budget(prioritize_fixtures(fixtures), budget, get_shared_cache(),
+                                              form_window=prediction_engine.FORM_WINDOW, bookmaker_id=BOOKMAKER_ID,
+                                              warehouse=warehouse, odds_date=match_date, ratings=ratings)
+            if len(selected) < len(fixtures):
+                logger.warning("Quota insuffisant (%s appels) : %s/%s matchs traités",
+                               budget, len(selected), len(fixtures))
+                self.skipped_fixtures = len(fixtures) - len(selected)
+                fixtures = selected
+        fixtures_by_league = group_fixtures_by_league(fixtures)
+        self.cache.evict_expired()
+        cached_data, _ = self.cache.load_day(match_date)
+
+        processed_data = {league_name: cached_data[league_name] for league_name, league_fixtures
+                          in fixtures_by_league.items()
+                          if len(cached_data.get(league_name, [])) == len(league_fixtures)}
+        pending = {league_name: league_fixtures for league_name, league_fixtures in fixtures_by_league.items()
+                   if league_name not in processed_data}
+        self.jobs.progress(match_date, self.owner, len(processed_data), len(fixtures_by_league), len(fixtures))
+
+        if pending:
+            plan = build_plan([fixture for league_fixtures in pending.values() for fixture in league_fixtures],
+                              form_window=prediction_engine.FORM_WINDOW, bookmaker_id=BOOKMAKER_ID,
+                              warehouse=warehouse, odds_date=match_date, ratings=ratings)
+            logger.info("Plan de préchargement du %s : %s", match_date, plan.summary())
+
+            for league_name, prefetched in execute_plan_streaming(plan, self.fetch, pending, self.max_workers):
+                matches = []
+                with metrics.stage('scoring'):
+                    for fixture in pending[league_name]:
+                        prediction, odds, analysis_logs = predict_with_odds(fixture, prefetched, ratings)
+                        matches.append({
+                            'fixture': fixture,
+                            'prediction': prediction,
+                            'odds': odds,
+                            'analysis_logs': analysis_logs
+                        })
+                # Mise en cache immédiate : les sessions voient la ligue aussitôt
+                self.cache.replace_league(match_date, league_name, matches)
+                processed_data[league_name] = matches
+                self.jobs.progress(match_date, self.owner, len(processed_data), len(fixtures_by_league), len(fixtures))
+
+        if not self.skipped_fixtures:
+            self.cache.mark_complete(match_date)
+
+        # Persistance groupée, une fois par génération
+        if self.engine is not None:
+            predicted_at = datetime.now()
+            with metrics.stage('save'):
+                prediction_store.save_predictions(self.engine, [
+                    prediction_store.prediction_row(match_data['fixture'], match_data['prediction'],
+                                                    match_data['odds'], predicted_at)
+                    for league_name in fixtures_by_league for match_data in processed_data[league_name]
+                ])
+        return processed_data
@@ -0,0 +1,315 @@
+# Fichier : prefetch_planner.py
+
+"""
+Planification et préchargement des données nécessaires aux prédictions.
+
+Avant de calculer quoi que ce soit, on lit les matchs de la journée et on
+dresse la liste de toutes les données requises (derniers matchs de chaque
+équipe, confrontations de chaque paire, cotes de chaque match). Cette
+liste est dédoublonnée, le nombre d'appels API est annoncé, puis tout est
+chargé en une fois (en parallèle). Le calcul des prédictions se fait
+ensuite uniquement sur les données en mémoire.
+
+Lorsque la date est connue, les cotes sont chargées en masse par
+`odds?date=` (quelques pages) plutôt qu'un appel par match.
+
+`execute_plan_streaming` produit les données groupe par groupe (par
+exemple ligue par ligue) au fur et à mesure de leur chargement.
+
+Avec des classements (ratings.TeamRatings), les matchs dont les deux
+équipes sont classées ne demandent ni forme ni H2H : seules leurs cotes
+sont chargées.
+
+Avec l'entrepôt local (fixtures_warehouse), la forme et le H2H qu'il
+couvre sont lus localement ; les réponses H2H de l'API y sont
+enregistrées pour servir les prochaines prédictions de la paire.
+"""
+import math
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from bulk_loader import ODDS_PAGE_SIZE, load_odds_table, parse_match_winner
+from response_cache import canonical_h2h
+
+
+def team_history_request(team_id, n):
+    return 'fixtures', {'team': team_id, 'last': n}
+
+
+def h2h_request(team1_id, team2_id):
+    return 'fixtures/headtohead', {'h2h': canonical_h2h(team1_id, team2_id)}
+
+
+def odds_request(fixture_id, bookmaker_id):
+    return 'odds', {'fixture': fixture_id, 'bookmaker': bookmaker_id}
+
+
+class PrefetchedData:
+    """Données préchargées pour une journée, indexées pour le calcul."""
+
+    def __init__(self):
+        self.team_history = {}
+        self.h2h = {}
+        self.odds = {}
+
+    def team_last(self, team_id):
+        return self.team_history.get(team_id)
+
+    def head_to_head(self, team1_id, team2_id):
+        return self.h2h.get(tuple(sorted((team1_id, team2_id))))
+
+    def odds_for(self, fixture_id):
+        """Cotes 1X2 {'home', 'draw', 'away'} du match, ou None."""
+        return self.odds.get(fixture_id)
+
+
+class PrefetchPlan:
+    """Liste dédoublonnée des données à charger pour un ensemble de matchs."""
+
+    def __init__(self, form_window=5, bookmaker_id=8, warehouse=None, before_ts=None, odds_date=None,
+                 ratings=None):
+        self.form_window = form_window
+        self.bookmaker_id = bookmaker_id
+        self.warehouse = warehouse
+        self.before_ts = before_ts
+        # Date des cotes à charger en masse (None = un appel par match)
+        self.odds_date = odds_date
+        # Classements des équipes (None = prédiction par la forme et le H2H)
+        self.ratings = ratings
+
+        # Données servies par l'entrepôt local
+        self.local_teams = set()
+        self.local_pairs = set()
+        # Données à demander à l'API
+        self.api_teams = set()
+        self.api_pairs = set()
+        self.odds_fixtures = set()
+
+        self.fixture_count = 0
+        self.rated_fixtures = 0
+        self.requested_lookups = 0
+
+    def add_fixture(self, fixture, include_odds=True):
+        home_team_id = fixture['teams']['home']['id']
+        away_team_id = fixture['teams']['away']['id']
+        self.fixture_count += 1
+
+        if include_odds:
+            self.requested_lookups += 1
+            self.odds_fixtures.add(fixture['fixture']['id'])
+
+        league_id = fixture['league']['id']
+        if self.ratings is not None and all(self.ratings.is_rated(team_id, league_id, self.before_ts)
+                                            for team_id in (home_team_id, away_team_id)):
+            self.rated_fixtures += 1
+            return
+
+        for team_id in (home_team_id, away_team_id):
+            self.requested_lookups += 1
+            if self.warehouse is not None and self.warehouse.covers_form(team_id, self.form_window,
+                                                                         self.before_ts):
+                self.local_teams.add(team_id)
+            else:
+                self.api_teams.add(team_id)
+
+        self.requested_lookups += 1
+        pair = tuple(sorted((home_team_id, away_team_id)))
+        if self.warehouse is not None and self.warehouse.covers_head_to_head(*pair, self.before_ts):
+            self.local_pairs.add(pair)
+        else:
+            self.api_pairs.add(pair)
+
+    def api_requests(self):
+        """Toutes les requêtes API du plan, sous forme (clé, endpoint, params)."""
+        requests = []
+        for team_id in sorted(self.api_teams):
+            requests.append((('team', team_id),) + team_history_request(team_id, self.form_window))
+        for pair in sorted(self.api_pairs):
+            requests.append((('h2h', pair),) + h2h_request(*pair))
+        if self.odds_date is None:
+            for fixture_id in sorted(self.odds_fixtures):
+                requests.append((('odds', fixture_id),) + odds_request(fixture_id, self.bookmaker_id))
+        return requests
+
+    def estimated_odds_pages(self):
+        """Nombre minimal de pages `odds?date=` (le total exact n'est connu qu'à la première page)."""
+        if self.odds_date is None or not self.odds_fixtures:
+            return 0
+        return math.ceil(len(self.odds_fixtures) / ODDS_PAGE_SIZE)
+
+    def api_call_count(self, cache=None):
+        """Nombre d'appels API que coûtera le plan (hors réponses déjà en cache)."""
+        requests = self.api_requests()
+        if cache is None:
+            count = len(requests)
+        else:
+            count = sum(1 for _, endpoint, params in requests if not cache.contains(endpoint, params))
+        if self.odds_date is not None and self.odds_fixtures:
+            first_page = ('odds', {'date': self.odds_date, 'bookmaker': self.bookmaker_id})
+            if cache is None or not cache.contains(*first_page):
+                count += self.estimated_odds_pages()
+        return count
+
+    def summary(self, cache=None):
+        local = len(self.local_teams) + len(self.local_pairs)
+        unique = (len(self.api_requests()) + local
+                  + (len(self.odds_fixtures) if self.odds_date is not None else 0))
+        rated = f", {self.rated_fixtures} prédits par classement" if self.ratings is not None else ""
+        return (f"{self.fixture_count} matchs{rated}, {self.requested_lookups} besoins de données, "
+                f"{unique} uniques dont {local} servis localement ; "
+                f"{self.api_call_count(cache)} appels API prévus")
+
+
+def build_plan(fixtures, form_window=5, bookmaker_id=8, warehouse=None, before_ts=None,
+               include_odds=True, odds_date=None, ratings=None):
+    """Construit le plan de préchargement d'une liste de matchs."""
+    plan = PrefetchPlan(form_window=form_window, bookmaker_id=bookmaker_id,
+                        warehouse=warehouse, before_ts=before_ts, odds_date=odds_date, ratings=ratings)
+    for fixture in fixtures:
+        plan.add_fixture(fixture, include_odds=include_odds)
+    return plan
+
+
+def fixtures_within_budget(fixtures, budget, cache=None, **plan_options):
+    """
+    Plus long préfixe de `fixtures` dont le plan tient dans `budget` appels API.
+
+    Les matchs doivent être triés par priorité décroissante ; les données
+    partagées (équipes, H2H, pages de cotes) ne sont comptées qu'une fois.
+    """
+    plan = PrefetchPlan(**plan_options)
+    selected = []
+    for fixture in fixtures:
+        plan.add_fixture(fixture)
+        if plan.api_call_count(cache) > budget:
+            break
+        selected.append(fixture)
+    return selected
+
+
+def _load_local(plan, data):
+    """Lectures dans l'entrepôt local (sans appel API)."""
+    for team_id in plan.local_teams:
+        data.team_history[team_id] = plan.warehouse.last_n_fixtures(team_id, plan.form_window,
+                                                                    before_ts=plan.before_ts)
+    for pair in plan.local_pairs:
+        data.h2h[pair] = plan.warehouse.head_to_head(*pair, before_ts=plan.before_ts)
+
+
+def _load_request(plan, fetch, request):
+    """Exécute une requête du plan et renvoie (type, clé, données)."""
+    (kind, key), endpoint, params = request
+    payload = fetch(endpoint, params)
+    if kind == 'h2h' and plan.warehouse is not None:
+        plan.warehouse.record_head_to_head(*key, payload)
+    if kind == 'odds':
+        entries = (payload or {}).get('response') or []
+        payload = parse_match_winner(entries[0], plan.bookmaker_id) if entries else None
+    return kind, key, payload
+
+
+def execute_plan(plan, fetch, max_workers=8):
+    """
+    Charge toutes les données du plan : lectures locales puis appels API en parallèle.
+
+    Args:
+        plan (PrefetchPlan): Le plan à exécuter.
+        fetch (callable): Fonction (endpoint, params) -> dict | None.
+        max_workers (int): Nombre d'appels API simultanés.
+
+    Returns:
+        PrefetchedData: Les données prêtes pour le calcul.
+    """
+    data = PrefetchedData()
+    _load_local(plan, data)
+
+    requests = plan.api_requests()
+    targets = {'team': data.team_history, 'h2h': data.h2h, 'odds': data.odds}
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        bulk_odds = None
+        if plan.odds_date is not None and plan.odds_fixtures:
+            bulk_odds = executor.submit(load_odds_table, fetch, plan.odds_date,
+                                        plan.bookmaker_id, plan.odds_fixtures)
+        for kind, key, payload in executor.map(lambda request: _load_request(plan, fetch, request), requests):
+            targets[kind][key] = payload
+        if bulk_odds is not None:
+            data.odds.update(bulk_odds.result())
+
+    return data
+
+
+def _group_keys(plan, fixtures):
+    """Clés des requêtes API dont dépend un groupe de matchs."""
+    keys = set()
+    for fixture in fixtures:
+        home_team_id = fixture['teams']['home']['id']
+        away_team_id = fixture['teams']['away']['id']
+        for team_id in (home_team_id, away_team_id):
+            if team_id in plan.api_teams:
+                keys.add(('team', team_id))
+        pair = tuple(sorted((home_team_id, away_team_id)))
+        if pair in plan.api_pairs:
+            keys.add(('h2h', pair))
+        fixture_id = fixture['fixture']['id']
+        if fixture_id in plan.odds_fixtures:
+            keys.add(('odds', fixture_id) if plan.odds_date is None else ('odds_table', plan.odds_date))
+    return keys
+
+
+def execute_plan_streaming(plan, fetch, fixture_groups, max_workers=8):
+    """
+    Exécute le plan en rendant chaque groupe de matchs dès que ses données sont chargées.
+
+    Les requêtes sont soumises dans l'ordre des groupes, de sorte que les
+    premiers groupes (par exemple les ligues dont le coup d'envoi est le
+    plus proche) soient servis en premier.
+
+    Args:
+        plan (PrefetchPlan): Le plan à exécuter.
+        fetch (callable): Fonction (endpoint, params) -> dict | None.
+        fixture_groups (dict): Clé de groupe -> liste de matchs, dans l'ordre de priorité.
+        max_workers (int): Nombre d'appels API simultanés.
+
+    Yields:
+        tuple: (clé de groupe, PrefetchedData). Les données sont partagées
+        entre les groupes et complètes pour le groupe produit.
+    """
+    data = PrefetchedData()
+    _load_local(plan, data)
+    targets = {'team': data.team_history, 'h2h': data.h2h, 'odds': data.odds}
+
+    requests_by_key = {request[0]: request for request in plan.api_requests()}
+    remaining = {group: _group_keys(plan, fixtures) for group, fixtures in fixture_groups.items()}
+    done_keys = set()
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = {}
+        if plan.odds_date is not None and plan.odds_fixtures:
+            future = executor.submit(load_odds_table, fetch, plan.odds_date, plan.bookmaker_id, plan.odds_fixtures)
+            futures[future] = ('odds_table', plan.odds_date)
+        submitted = set()
+        for keys in remaining.values():
+            for key in sorted(keys - submitted, key=str):
+                if key in requests_by_key:
+                    futures[executor.submit(_load_request, plan, fetch, requests_by_key[key])] = key
+                    submitted.add(key)
+
+        while remaining:
+            for group in [group for group, keys in remaining.items() if keys <= done_keys]:
+                del remaining[group]
+                yield group, data
+            if not remaining or not futures:
+                break
+            finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in finished:
+                key = futures.pop(future)
+                if key[0] == 'odds_table':
+                    data.odds.update(future.result())
+                else:
+                    kind, request_key, payload = future.result()
+                    targets[kind][request_key] = payload
+                done_keys.add(key)
+
+    # Groupes sans requête en attente (données entièrement locales)
+    for group in remaining:
+        yield group, data
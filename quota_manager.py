@@ -0,0 +1,270 @@
+# Fichier : quota_manager.py
+
+"""
+Suivi du quota RapidAPI à partir des en-têtes de réponse.
+
+Chaque réponse de l'API indique le quota restant :
+
+    x-ratelimit-requests-limit / x-ratelimit-requests-remaining   (quota journalier)
+    x-ratelimit-requests-reset                                    (secondes avant remise à zéro)
+    x-ratelimit-limit / x-ratelimit-remaining                     (limite par minute)
+
+Ces valeurs sont enregistrées dans une base SQLite partagée entre les
+processus (générateur GitHub Actions, règlement, Streamlit). Entre deux
+réponses, chaque appel décrémente l'estimation, de sorte que des appels
+simultanés ne dépassent pas le quota.
+
+Les requêtes ont une priorité : une réserve du quota journalier est gardée
+pour les appels essentiels (matchs du jour, règlement), et les appels de
+faible priorité (rattrapage de l'entrepôt) sont refusés bien avant
+l'épuisement. Quand la limite par minute approche, les appels sont espacés
+sur le reste de la fenêtre plutôt que d'échouer en 429. La priorité est
+donnée par l'appelant quand l'usage ne se déduit pas de la requête (une
+même requête `fixtures?date=` sert à charger une journée à prédire et à
+rattraper l'entrepôt) ; request_priority fournit la valeur par défaut.
+"""
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_QUOTA_PATH = os.environ.get('API_QUOTA_PATH', 'data/cache/api_quota.sqlite')
+
+# Priorités des requêtes (plus petit = plus important)
+PRIORITY_CRITICAL = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+
+# Part du quota journalier réservée aux priorités supérieures
+RESERVES = {
+    PRIORITY_CRITICAL: 0.0,
+    PRIORITY_NORMAL: float(os.environ.get('API_QUOTA_NORMAL_RESERVE', 0.02)),
+    PRIORITY_LOW: float(os.environ.get('API_QUOTA_LOW_RESERVE', 0.15)),
+}
+
+# En dessous de cette part de la limite par minute, les appels sont espacés
+MINUTE_SLOWDOWN_RATIO = 0.25
+
+# Ligues prioritaires quand le quota ne couvre pas tous les matchs, dans l'ordre
+LEAGUE_PRIORITY = (2, 3, 848, 39, 140, 135, 78, 61, 94, 88, 144, 253, 262, 40, 136, 79, 62, 141)
+
+# Correspondance des en-têtes avec les portées suivies
+_HEADERS = {
+    'day': ('x-ratelimit-requests-limit', 'x-ratelimit-requests-remaining', 'x-ratelimit-requests-reset'),
+    'minute': ('x-ratelimit-limit', 'x-ratelimit-remaining', None),
+}
+
+
+def request_priority(endpoint, params):
+    """
+    Priorité par défaut d'un appel API selon son endpoint et ses paramètres,
+    quand l'appelant n'en précise pas (l'entrepôt passe PRIORITY_LOW).
+    """
+    params = params or {}
+    if endpoint == 'fixtures':
+        if 'id' in params or 'ids' in params or 'date' in params:
+            # Règlement et matchs d'une journée à prédire
+            return PRIORITY_CRITICAL
+        if 'league' in params and 'season' in params:
+            return PRIORITY_LOW
+        return PRIORITY_NORMAL
+    if endpoint in ('fixtures/headtohead', 'odds'):
+        return PRIORITY_NORMAL
+    return PRIORITY_LOW
+
+
+def prioritize_fixtures(fixtures, league_priority=LEAGUE_PRIORITY):
+    """Matchs triés par importance de la ligue puis par coup d'envoi."""
+    rank = {league_id: index for index, league_id in enumerate(league_priority)}
+    return sorted(fixtures, key=lambda fixture: (rank.get(fixture['league']['id'], len(rank)),
+                                                 fixture['fixture']['timestamp']))
+
+
+def _header_int(headers, name):
+    value = headers.get(name) if name else None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class QuotaManager:
+    """Quota RapidAPI restant, persistant et partagé entre processus."""
+
+    def __init__(self, path=DEFAULT_QUOTA_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self.stats = {'refused': 0, 'throttled': 0, 'throttle_wait': 0.0}
+        # Prochain créneau libre quand les appels sont espacés (propre au processus)
+        self._next_slot = 0.0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS api_quota (
+                scope TEXT PRIMARY KEY,
+                quota_limit INTEGER,
+                remaining INTEGER NOT NULL,
+                reset_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    # --- Mise à jour ---
+
+    def _store(self, scope, limit, remaining, reset_at, now):
+        """
+        Enregistre le quota d'une portée. Tant que la fenêtre enregistrée n'est
+        pas écoulée, le plus petit restant est conservé : une réponse plus
+        ancienne reçue en retard ne fait pas remonter le budget.
+        """
+        self._conn.execute(
+            "INSERT INTO api_quota (scope, quota_limit, remaining, reset_at, updated_at) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(scope) DO UPDATE SET "
+            "quota_limit = COALESCE(excluded.quota_limit, api_quota.quota_limit), "
+            "remaining = CASE WHEN api_quota.reset_at > excluded.updated_at "
+            "THEN MIN(api_quota.remaining, excluded.remaining) ELSE excluded.remaining END, "
+            "reset_at = CASE WHEN api_quota.reset_at > excluded.updated_at "
+            "THEN api_quota.reset_at ELSE excluded.reset_at END, "
+            "updated_at = excluded.updated_at",
+            (scope, limit, remaining, reset_at, now)
+        )
+
+    def record(self, headers):
+        """Enregistre le quota indiqué par les en-têtes d'une réponse."""
+        now = time.time()
+        with self._lock, self._conn:
+            for scope, (limit_name, remaining_name, reset_name) in _HEADERS.items():
+                remaining = _header_int(headers, remaining_name)
+                if remaining is None:
+                    continue
+                reset_in = _header_int(headers, reset_name)
+                if reset_in is None:
+                    reset_in = 60 if scope == 'minute' else 24 * 3600
+                self._store(scope, _header_int(headers, limit_name), remaining, now + reset_in, now)
+
+    def record_throttled(self, retry_after=None):
+        """Réponse 429 : plus d'appel avant `retry_after` secondes (60 par défaut)."""
+        try:
+            delay = float(retry_after)
+        except (TypeError, ValueError):
+            delay = 60.0
+        now = time.time()
+        with self._lock, self._conn:
+            # La pause imposée remplace la fenêtre en cours
+            self._conn.execute(
+                "INSERT OR REPLACE INTO api_quota (scope, quota_limit, remaining, reset_at, updated_at) "
+                "SELECT 'minute', (SELECT quota_limit FROM api_quota WHERE scope = 'minute'), 0, ?, ?",
+                (now + delay, now)
+            )
+
+    # --- Consultation ---
+
+    def _state(self, scope, now):
+        """(limite, restant, remise à zéro) d'une portée, ou None si inconnue ou périmée."""
+        row = self._conn.execute(
+            "SELECT quota_limit, remaining, reset_at FROM api_quota WHERE scope = ?", (scope,)
+        ).fetchone()
+        if row is None or row[2] <= now:
+            return None
+        return row
+
+    def budget(self, priority=PRIORITY_NORMAL):
+        """
+        Appels encore autorisés aujourd'hui pour une priorité.
+
+        Returns:
+            int | None: Le nombre d'appels, ou None si le quota est inconnu.
+        """
+        with self._lock:
+            state = self._state('day', time.time())
+        if state is None:
+            return None
+        limit, remaining, _ = state
+        reserve = int((limit or 0) * RESERVES[priority])
+        return max(remaining - reserve, 0)
+
+    def acquire(self, priority=PRIORITY_NORMAL):
+        """
+        Réserve un appel : refuse si le quota journalier de la priorité est
+        épuisé, attend si la limite par minute est atteinte ou proche.
+
+        Returns:
+            bool: True si l'appel peut être fait.
+        """
+        while True:
+            with self._lock, self._conn:
+                now = time.time()
+                day = self._state('day', now)
+                if day is not None:
+                    limit, remaining, _ = day
+                    if remaining <= int((limit or 0) * RESERVES[priority]):
+                        self.stats['refused'] += 1
+                        return False
+
+                delay = 0.0
+                minute = self._state('minute', now)
+                if minute is not None:
+                    limit, remaining, reset_at = minute
+                    if remaining <= 0:
+                        # Fenêtre épuisée : attente de la remise à zéro puis nouvel essai
+                        delay = reset_at - now
+                        self.stats['throttled'] += 1
+                        self.stats['throttle_wait'] += delay
+                    elif limit and remaining < limit * MINUTE_SLOWDOWN_RATIO:
+                        # Créneaux réguliers : les appels restants sont répartis sur la fenêtre
+                        slot = max(now, self._next_slot)
+                        self._next_slot = slot + (reset_at - now) / remaining
+                        if slot > now:
+                            self.stats['throttled'] += 1
+                            self.stats['throttle_wait'] += slot - now
+                        self._consume(now)
+                        spacing = slot - now
+                        break
+
+                if delay <= 0:
+                    self._consume(now)
+                    return True
+            time.sleep(delay)
+
+        time.sleep(spacing)
+        return True
+
+    def _consume(self, now):
+        self._conn.execute(
+            "UPDATE api_quota SET remaining = MAX(remaining - 1, 0) "
+            "WHERE scope IN ('day', 'minute') AND reset_at > ?", (now,)
+        )
+
+    def summary(self):
+        """Résumé lisible du quota connu."""
+        with self._lock:
+            now = time.time()
+            day = self._state('day', now)
+            minute = self._state('minute', now)
+        parts = []
+        if day is not None:
+            parts.append(f"{day[1]}/{day[0] or '?'} appels restants aujourd'hui")
+        if minute is not None:
+            parts.append(f"{minute[1]}/{minute[0] or '?'} cette minute")
+        if not parts:
+            parts.append("quota inconnu")
+        return (", ".join(parts) + f" ; {self.stats['refused']} appels refusés, "
+                f"{self.stats['throttle_wait']:.1f}s d'espacement")
+
+
+_shared_quota = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_quota():
+    """Retourne le gestionnaire de quota partagé du processus."""
+    global _shared_quota
+    with _shared_lock:
+        if _shared_quota is None:
+            _shared_quota = QuotaManager()
+        return _shared_quota
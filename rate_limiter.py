@@ -0,0 +1,73 @@
+# Fichier : rate_limiter.py
+
+"""
+Limiteur de débit à fenêtres glissantes pour l'API RapidAPI.
+
+RapidAPI impose une limite par seconde et une limite par minute. Chaque
+limite garde l'horodatage de ses `limit` dernières requêtes (journal
+glissant) : une requête n'est autorisée que si la plus ancienne d'entre
+elles date d'au moins une période. Sur n'importe quelle fenêtre de la
+période, il y a donc exactement au plus `limit` requêtes, et le débit
+atteint la limite sans la dépasser.
+"""
+import os
+import threading
+import time
+from collections import deque
+
+# Limites par défaut, surchargeables par variables d'environnement
+DEFAULT_PER_SECOND = int(os.environ.get('API_RATE_PER_SECOND', 10))
+DEFAULT_PER_MINUTE = int(os.environ.get('API_RATE_PER_MINUTE', 300))
+
+# Écart d'horloge négligeable (secondes)
+CLOCK_EPSILON = 1e-9
+
+
+class SlidingWindow:
+    """Au plus `limit` requêtes sur toute fenêtre de `period` secondes (non thread-safe)."""
+
+    def __init__(self, limit, period):
+        self.limit = max(1, int(limit))
+        self.period = float(period)
+        # Horodatages des dernières requêtes autorisées, de la plus ancienne à la plus récente
+        self.granted = deque(maxlen=self.limit)
+
+    def wait_time(self, now):
+        """Temps d'attente avant qu'une requête soit autorisée (0 si elle l'est)."""
+        if len(self.granted) < self.limit:
+            return 0.0
+        remaining = self.granted[0] + self.period - now
+        # Résidu d'arrondi après une attente exacte : la fenêtre est écoulée
+        return remaining if remaining > CLOCK_EPSILON else 0.0
+
+    def consume(self, now):
+        self.granted.append(now)
+
+
+class RateLimiter:
+    """Combine les limites par seconde et par minute de RapidAPI."""
+
+    def __init__(self, per_second=DEFAULT_PER_SECOND, per_minute=DEFAULT_PER_MINUTE,
+                 clock=time.monotonic, sleep=time.sleep):
+        self.per_second = per_second
+        self.per_minute = per_minute
+        self._windows = [SlidingWindow(per_second, 1.0), SlidingWindow(per_minute, 60.0)]
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self.total_wait = 0.0
+
+    def acquire(self):
+        """Bloque jusqu'à ce qu'une requête soit autorisée par toutes les limites."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = self._clock()
+                delay = max(window.wait_time(now) for window in self._windows)
+                if delay == 0:
+                    for window in self._windows:
+                        window.consume(now)
+                    self.total_wait += waited
+                    return waited
+            self._sleep(delay)
+            waited += delay
@@ -0,0 +1,239 @@
+# Fichier : ratings.py
+
+"""
+Classement Elo des équipes, mis à jour match par match.
+
+Chaque ligue a sa table : un index équipe -> position et des tableaux
+numpy (classement, nombre de matchs) agrandis par doublement. Un match
+terminé ne modifie que deux cases (O(1)). À chaque changement de
+journée, l'état de la veille est conservé (une copie des tableaux de la
+ligue) : le classement d'une équipe à une date donnée se lit sans
+rejouer la saison.
+
+Les matchs sont lus dans l'entrepôt local (fixtures_warehouse) de façon
+incrémentale : seuls les matchs ingérés depuis la dernière
+synchronisation sont appliqués. Une prédiction par classement ne
+nécessite donc aucune lecture de l'historique des équipes.
+
+Activation dans le générateur et la page Streamlit :
+
+    PREDICTION_USE_RATINGS=1 python daily_predictions_generator.py
+"""
+import bisect
+import os
+import threading
+from datetime import datetime
+
+import numpy as np
+
+INITIAL_RATING = 1500.0
+K_FACTOR = float(os.environ.get('RATING_K_FACTOR', 20))
+HOME_ADVANTAGE = float(os.environ.get('RATING_HOME_ADVANTAGE', 60))
+
+# Nombre de matchs joués avant qu'un classement soit jugé fiable
+MIN_RATED_MATCHES = 5
+
+# Écart du score attendu à 0.5 en deçà duquel un match nul est prédit
+DRAW_BAND = 0.1
+
+# Bornes de confiance (identiques au moteur de prédiction)
+CONFIDENCE_BASE = 0.5
+CONFIDENCE_CAP = 0.9
+DRAW_CONFIDENCE = 0.6
+
+USE_RATINGS = os.environ.get('PREDICTION_USE_RATINGS', '0') == '1'
+
+
+def expected_score(home_rating, away_rating):
+    """Score attendu de l'équipe à domicile (1 = victoire, 0.5 = nul)."""
+    return 1.0 / (1.0 + 10 ** ((away_rating - home_rating - HOME_ADVANTAGE) / 400))
+
+
+def goal_difference_factor(goal_difference):
+    """Multiplicateur de K selon l'écart de buts (barème World Football Elo)."""
+    goal_difference = abs(goal_difference)
+    if goal_difference <= 1:
+        return 1.0
+    if goal_difference == 2:
+        return 1.5
+    return (11 + goal_difference) / 8
+
+
+def _day_of(kickoff_ts):
+    return datetime.fromtimestamp(kickoff_ts).date().toordinal()
+
+
+class RatingTable:
+    """Classement d'une ligue, stocké dans des tableaux numpy."""
+
+    def __init__(self, capacity=32):
+        self.index = {}
+        self.ratings = np.full(capacity, INITIAL_RATING)
+        self.matches = np.zeros(capacity, dtype=np.int32)
+        # Journée du dernier match appliqué (ordinal de date)
+        self.day = None
+        # État en fin de chaque journée passée : jours triés et copies des tableaux
+        self.snapshot_days = []
+        self.snapshots = []
+
+    def _position(self, team_id):
+        position = self.index.get(team_id)
+        if position is None:
+            position = len(self.index)
+            if position == len(self.ratings):
+                self.ratings = np.concatenate([self.ratings, np.full(position, INITIAL_RATING)])
+                self.matches = np.concatenate([self.matches, np.zeros(position, dtype=np.int32)])
+            self.index[team_id] = position
+        return position
+
+    def _snapshot(self):
+        size = len(self.index)
+        self.snapshot_days.append(self.day)
+        self.snapshots.append((self.ratings[:size].copy(), self.matches[:size].copy()))
+
+    def update(self, kickoff_ts, home_id, away_id, goals_home, goals_away):
+        """Applique un match terminé (dans l'ordre chronologique)."""
+        day = _day_of(kickoff_ts)
+        if self.day is not None and day > self.day:
+            self._snapshot()
+        self.day = day if self.day is None else max(self.day, day)
+
+        home, away = self._position(home_id), self._position(away_id)
+        expected = expected_score(self.ratings[home], self.ratings[away])
+        actual = 1.0 if goals_home > goals_away else 0.5 if goals_home == goals_away else 0.0
+        delta = K_FACTOR * goal_difference_factor(goals_home - goals_away) * (actual - expected)
+        self.ratings[home] += delta
+        self.ratings[away] -= delta
+        self.matches[home] += 1
+        self.matches[away] += 1
+
+    def rating(self, team_id, before_day=None):
+        """
+        (classement, matchs joués) de l'équipe avant la journée `before_day`
+        (ordinal de date ; état courant si None), ou None si elle n'a pas joué.
+        """
+        position = self.index.get(team_id)
+        if position is None:
+            return None
+        if before_day is None or self.day < before_day:
+            return float(self.ratings[position]), int(self.matches[position])
+        slot = bisect.bisect_left(self.snapshot_days, before_day) - 1
+        if slot < 0:
+            return None
+        ratings, matches = self.snapshots[slot]
+        if position >= len(ratings):
+            return None
+        return float(ratings[position]), int(matches[position])
+
+
+class TeamRatings:
+    """Classements de toutes les ligues de l'entrepôt local."""
+
+    def __init__(self):
+        self.tables = {}
+        self.team_leagues = {}
+        self.applied = 0
+        self._applied_ids = set()
+        self._since_ts = None
+        self._lock = threading.Lock()
+
+    def update(self, fixture_id, league_id, kickoff_ts, home_id, away_id, goals_home, goals_away):
+        """Applique un match terminé à la table de sa ligue (une seule fois par match)."""
+        if fixture_id in self._applied_ids:
+            return
+        table = self.tables.get(league_id)
+        if table is None:
+            table = self.tables[league_id] = RatingTable()
+        table.update(kickoff_ts, home_id, away_id, goals_home, goals_away)
+        for team_id in (home_id, away_id):
+            self.team_leagues.setdefault(team_id, set()).add(league_id)
+        self._applied_ids.add(fixture_id)
+        self.applied += 1
+
+    def sync(self, warehouse):
+        """
+        Applique les matchs ingérés dans l'entrepôt depuis la dernière synchronisation.
+
+        Les matchs sont lus à partir du dernier coup d'envoi appliqué ; un match
+        antérieur ingéré tardivement est ignoré (l'ordre chronologique prime).
+
+        Returns:
+            int: Le nombre de matchs appliqués.
+        """
+        with self._lock:
+            results = warehouse.results_frame(since_ts=self._since_ts)
+            before = self.applied
+            for row in results.itertuples(index=False):
+                self.update(row.fixture_id, row.league_id, row.kickoff_ts, row.home_team_id, row.away_team_id,
+                            row.goals_home, row.goals_away)
+            if not results.empty:
+                self._since_ts = int(results['kickoff_ts'].iloc[-1])
+            return self.applied - before
+
+    def rating(self, team_id, league_id=None, before_ts=None):
+        """
+        Classement d'une équipe avant `before_ts` (état courant si None).
+
+        Le classement de la ligue du match est utilisé si l'équipe y a assez
+        joué, sinon celui de la ligue où elle a le plus joué (coupes
+        européennes, promus).
+
+        Returns:
+            float | None: Le classement, ou None si l'équipe a joué moins de
+            MIN_RATED_MATCHES matchs.
+        """
+        before_day = _day_of(before_ts) if before_ts is not None else None
+        candidates = []
+        for candidate_league in self.team_leagues.get(team_id, ()):
+            found = self.tables[candidate_league].rating(team_id, before_day)
+            if found is not None and found[1] >= MIN_RATED_MATCHES:
+                candidates.append((candidate_league == league_id, found[1], found[0]))
+        if not candidates:
+            return None
+        return max(candidates)[2]
+
+    def is_rated(self, team_id, league_id=None, before_ts=None):
+        return self.rating(team_id, league_id, before_ts) is not None
+
+    def predict(self, fixture, before_ts=None):
+        """
+        Prédiction d'un match par les classements.
+
+        Returns:
+            tuple | None: (issue 'HOME'/'DRAW'/'AWAY', confiance, score attendu
+            de l'équipe à domicile, classement domicile, classement extérieur),
+            ou None si l'une des équipes n'est pas classée.
+        """
+        league_id = fixture['league']['id']
+        home_rating = self.rating(fixture['teams']['home']['id'], league_id, before_ts)
+        away_rating = self.rating(fixture['teams']['away']['id'], league_id, before_ts)
+        if home_rating is None or away_rating is None:
+            return None
+
+        expected = expected_score(home_rating, away_rating)
+        if expected > 0.5 + DRAW_BAND:
+            outcome = 'HOME'
+        elif expected < 0.5 - DRAW_BAND:
+            outcome = 'AWAY'
+        else:
+            return 'DRAW', DRAW_CONFIDENCE, expected, home_rating, away_rating
+        confidence = min(CONFIDENCE_CAP, CONFIDENCE_BASE + abs(expected - 0.5))
+        return outcome, confidence, expected, home_rating, away_rating
+
+
+_shared_ratings = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_ratings(warehouse=None):
+    """
+    Retourne les classements partagés du processus, synchronisés avec
+    l'entrepôt s'il est fourni.
+    """
+    global _shared_ratings
+    with _shared_lock:
+        if _shared_ratings is None:
+            _shared_ratings = TeamRatings()
+    if warehouse is not None:
+        _shared_ratings.sync(warehouse)
+    return _shared_ratings
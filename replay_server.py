@@ -0,0 +1,151 @@
+# Fichier : replay_server.py
+
+"""
+Serveur HTTP local qui rejoue un enregistrement de l'API api-football.
+
+Il se substitue à RapidAPI pour mesurer le générateur ou la page Streamlit
+hors ligne : latence simulée (avec gigue), erreurs 500 et réponses 429
+injectées selon une probabilité, en-têtes de quota RapidAPI. Une requête
+absente de l'enregistrement reçoit une réponse vide (et est comptée).
+
+    python replay_server.py recordings/2025-09-01.jsonl --port 8765 --latency-ms 80 --throttle-rate 0.02
+    API_BASE_URL=http://127.0.0.1:8765/v3 python daily_predictions_generator.py
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlparse
+
+from api_recording import load_recording
+from response_cache import make_key
+
+EMPTY_BODY = json.dumps({'errors': [], 'results': 0, 'paging': {'current': 1, 'total': 1}, 'response': []})
+
+
+class ReplayServer:
+    """Serveur de rejeu démarré dans un thread de fond."""
+
+    def __init__(self, recording_path, host='127.0.0.1', port=0, latency_ms=0.0, jitter_ms=0.0,
+                 error_rate=0.0, throttle_rate=0.0, quota=None, seed=None):
+        self.responses, self.meta = load_recording(recording_path)
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.quota = quota
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {'requests': 0, 'misses': 0, 'errors': 0, 'throttled': 0}
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v3"
+
+    def reset_stats(self):
+        with self._lock:
+            for key in self.stats:
+                self.stats[key] = 0
+
+    def _respond(self, path):
+        """(code HTTP, corps, en-têtes) de la réponse à une requête."""
+        parsed = urlparse(path)
+        endpoint = parsed.path.split('/v3/', 1)[-1].strip('/')
+        params = dict(parse_qsl(parsed.query))
+        with self._lock:
+            self.stats['requests'] += 1
+            served = self.stats['requests']
+            draw = self._random.random()
+            delay = max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+
+        headers = {}
+        if self.quota is not None:
+            headers['x-ratelimit-requests-limit'] = str(self.quota)
+            headers['x-ratelimit-requests-remaining'] = str(max(self.quota - served, 0))
+
+        time.sleep(delay)
+        if draw < self.throttle_rate:
+            with self._lock:
+                self.stats['throttled'] += 1
+            headers['retry-after'] = '1'
+            return 429, json.dumps({'message': 'Too many requests'}), headers
+        if draw < self.throttle_rate + self.error_rate:
+            with self._lock:
+                self.stats['errors'] += 1
+            return 500, json.dumps({'message': 'Internal error'}), headers
+
+        recorded = self.responses.get(make_key(endpoint, params))
+        if recorded is None:
+            with self._lock:
+                self.stats['misses'] += 1
+            return 200, EMPTY_BODY, headers
+        status, body = recorded
+        return status, body, headers
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                status, body, headers = server._respond(self.path)
+                payload = body.encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name='replay-server', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rejoue un enregistrement de l'API api-football.")
+    parser.add_argument('recording')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    parser.add_argument('--jitter-ms', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Probabilité d'une réponse 500")
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help="Probabilité d'une réponse 429")
+    parser.add_argument('--quota', type=int, default=None, help="Quota journalier annoncé dans les en-têtes")
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    server = ReplayServer(args.recording, host=args.host, port=args.port, latency_ms=args.latency_ms,
+                          jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+                          throttle_rate=args.throttle_rate, quota=args.quota, seed=args.seed)
+    print(f"{len(server.responses)} réponses enregistrées ({server.meta.get('date', 'date inconnue')}), "
+          f"servies sur {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
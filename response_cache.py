@@ -0,0 +1,182 @@
+# Fichier : response_cache.py
+
+"""
+Cache persistant sur disque des réponses de l'API api-football.
+
+Les réponses sont stockées dans une base SQLite, indexées par endpoint et
+paramètres normalisés. Chaque endpoint a sa propre durée de vie : un match
+terminé ne change plus et est gardé indéfiniment, l'historique H2H est
+gardé une journée, les cotes quelques minutes. La taille du cache est
+bornée et les entrées les moins récemment utilisées sont évincées.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from metrics import get_shared_metrics
+
+DEFAULT_CACHE_PATH = os.environ.get('API_CACHE_PATH', 'data/cache/api_cache.sqlite')
+DEFAULT_MAX_ENTRIES = int(os.environ.get('API_CACHE_MAX_ENTRIES', 20000))
+
+FINISHED_STATUSES = {'FT', 'AET', 'PEN'}
+
+# Durées de vie par endpoint, en secondes
+ENDPOINT_TTLS = {
+    'fixtures/headtohead': 24 * 3600,
+    'odds': 10 * 60,
+    'leagues': 7 * 24 * 3600,
+    'teams': 7 * 24 * 3600,
+    'teams/statistics': 6 * 3600,
+}
+DEFAULT_TTL = 3600
+
+# Vérification de la taille du cache toutes les N écritures
+EVICTION_INTERVAL = 100
+
+
+def canonical_h2h(team1_id, team2_id):
+    """Paramètre h2h indépendant de l'ordre des équipes (le plus petit id d'abord)."""
+    low, high = sorted((int(team1_id), int(team2_id)))
+    return f"{low}-{high}"
+
+
+def make_key(endpoint, params):
+    """Clé de cache : endpoint + paramètres triés, valeurs converties en texte."""
+    params = dict(params or {})
+    if 'h2h' in params:
+        params['h2h'] = canonical_h2h(*str(params['h2h']).split('-'))
+    normalized = sorted((str(key), str(value)) for key, value in params.items())
+    return f"{endpoint}?{json.dumps(normalized, separators=(',', ':'))}"
+
+
+def ttl_for(endpoint, params, payload):
+    """
+    Durée de vie d'une réponse, en secondes (None = pas d'expiration).
+    """
+    params = params or {}
+    if endpoint == 'fixtures':
+        if 'id' in params or 'ids' in params:
+            # Un match terminé ne changera plus
+            statuses = {fixture['fixture']['status']['short'] for fixture in payload.get('response', [])}
+            if statuses and statuses <= FINISHED_STATUSES:
+                return None
+            return 5 * 60
+        if 'last' in params:
+            return 6 * 3600
+        if 'date' in params:
+            return 15 * 60
+    return ENDPOINT_TTLS.get(endpoint, DEFAULT_TTL)
+
+
+class ResponseCache:
+    """Cache SQLite thread-safe avec expiration par entrée et éviction LRU."""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                endpoint TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                expires_at REAL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses (last_access)")
+        self._conn.commit()
+
+    def get(self, endpoint, params):
+        """Retourne la réponse en cache, ou None si absente ou expirée."""
+        key = make_key(endpoint, params)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                get_shared_metrics().observe_cache(endpoint, hit=False)
+                return None
+            payload, expires_at = row
+            if expires_at is not None and expires_at <= now:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                self.misses += 1
+                get_shared_metrics().observe_cache(endpoint, hit=False)
+                return None
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+        get_shared_metrics().observe_cache(endpoint, hit=True)
+        return json.loads(payload)
+
+    def contains(self, endpoint, params):
+        """Indique si une réponse valide est en cache, sans modifier les compteurs."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT expires_at FROM responses WHERE key = ?", (make_key(endpoint, params),)
+            ).fetchone()
+        return row is not None and (row[0] is None or row[0] > time.time())
+
+    def set(self, endpoint, params, payload):
+        """Stocke une réponse réussie avec la durée de vie de son endpoint."""
+        # L'API renvoie parfois un code 200 avec des erreurs (quota, paramètres)
+        if not payload or payload.get('errors'):
+            return
+        ttl = ttl_for(endpoint, params, payload)
+        now = time.time()
+        expires_at = None if ttl is None else now + ttl
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, endpoint, payload, created_at, expires_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (make_key(endpoint, params), endpoint, json.dumps(payload, separators=(',', ':')),
+                 now, expires_at, now)
+            )
+            self._writes += 1
+            if self._writes % EVICTION_INTERVAL == 0:
+                self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """Supprime les entrées expirées puis les moins récemment utilisées."""
+        self._conn.execute("DELETE FROM responses WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),))
+        count = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        if count > self.max_entries:
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN "
+                "(SELECT key FROM responses ORDER BY last_access LIMIT ?)",
+                (count - self.max_entries,)
+            )
+
+    def hit_ratio(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_cache():
+    """Retourne le cache de réponses partagé du processus."""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = ResponseCache()
+        return _shared_cache
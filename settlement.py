@@ -0,0 +1,229 @@
+# Fichier : settlement.py
+
+"""
+Règlement des prédictions en attente (PENDING).
+
+Les identifiants des matchs en attente sont collectés dans toutes les
+sources de prédictions (base SQLite de Streamlit et historique Parquet
+de GitHub Actions), dédoublonnés, puis interrogés par lots via
+`fixtures?ids=` (20 matchs par appel). Les scores, le résultat réel et le
+statut CORRECT/INCORRECT sont écrits en une passe par source.
+
+Utilisable depuis la page Historique ou en ligne de commande :
+
+    python settlement.py [--days 7]
+"""
+import argparse
+import os
+import sys
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+import prediction_store
+from history_store import DEFAULT_HISTORY_PATH, HistoryStore
+from response_cache import get_shared_cache
+
+FINISHED_STATUSES = {'FT', 'AET', 'PEN'}
+
+# Nombre maximal d'identifiants acceptés par fixtures?ids=
+IDS_PER_REQUEST = 20
+
+HOME_WIN = "Victoire Domicile"
+AWAY_WIN = "Victoire Extérieur"
+DRAW = "Match Nul"
+
+
+def outcome_from_score(home_goals, away_goals):
+    """Résultat réel d'un match à partir du score."""
+    if home_goals > away_goals:
+        return HOME_WIN
+    if away_goals > home_goals:
+        return AWAY_WIN
+    return DRAW
+
+
+def normalize_outcome(predicted_outcome, match_desc=None):
+    """
+    Ramène une prédiction au vocabulaire Domicile/Nul/Extérieur.
+
+    Le moteur Streamlit formule ses prédictions avec le nom de l'équipe
+    ("Victoire Lens") ; le nom est comparé à la description "A vs B".
+    """
+    if predicted_outcome in (HOME_WIN, AWAY_WIN, DRAW):
+        return predicted_outcome
+    if match_desc and predicted_outcome and predicted_outcome.startswith("Victoire "):
+        team_name = predicted_outcome[len("Victoire "):]
+        home_team, _, away_team = match_desc.partition(" vs ")
+        if team_name == home_team:
+            return HOME_WIN
+        if team_name == away_team:
+            return AWAY_WIN
+    return predicted_outcome
+
+
+def fetch_results(fetch, fixture_ids, cache=None):
+    """
+    Récupère les scores des matchs terminés, par lots de IDS_PER_REQUEST.
+
+    Args:
+        cache (ResponseCache, optional): Cache disque consulté par `fetch` ;
+            les lots qui y sont déjà ne comptent pas comme appels API.
+
+    Returns:
+        tuple[dict[int, tuple[int, int]], int]: Score (domicile, extérieur)
+        par fixture_id, et nombre de lots demandés à l'API.
+    """
+    results = {}
+    api_calls = 0
+    fixture_ids = sorted(set(fixture_ids))
+    for start in range(0, len(fixture_ids), IDS_PER_REQUEST):
+        batch = fixture_ids[start:start + IDS_PER_REQUEST]
+        params = {'ids': '-'.join(str(fixture_id) for fixture_id in batch)}
+        if cache is None or not cache.contains('fixtures', params):
+            api_calls += 1
+        data = fetch('fixtures', params)
+        if not data or not data.get('response'):
+            continue
+        for fixture in data['response']:
+            if fixture['fixture']['status']['short'] not in FINISHED_STATUSES:
+                continue
+            home_goals = fixture['goals']['home']
+            away_goals = fixture['goals']['away']
+            if home_goals is None or away_goals is None:
+                continue
+            results[fixture['fixture']['id']] = (home_goals, away_goals)
+    return results, api_calls
+
+
+def _settle_row(predicted_outcome, match_desc, score):
+    home_goals, away_goals = score
+    actual_result = outcome_from_score(home_goals, away_goals)
+    status = "CORRECT" if normalize_outcome(predicted_outcome, match_desc) == actual_result else "INCORRECT"
+    return status, actual_result, home_goals, away_goals
+
+
+# --- Base SQLite (prédictions Streamlit) ---
+
+def pending_from_database(engine, since):
+    """Prédictions PENDING de la base depuis une date."""
+    with engine.connect() as connection:
+        return connection.execute(
+            text("""
+                SELECT fixture_id, predicted_outcome, match_desc
+                FROM predictions
+                WHERE status = 'PENDING'
+                AND prediction_ts >= :since
+            """),
+            {"since": since}
+        ).fetchall()
+
+
+def settle_database(engine, pending, results):
+    """Écrit les résultats connus dans la base en une seule transaction."""
+    updates = []
+    for fixture_id, predicted_outcome, match_desc in pending:
+        if fixture_id in results:
+            status, actual_result, home_goals, away_goals = _settle_row(
+                predicted_outcome, match_desc, results[fixture_id])
+            updates.append({
+                "status": status, "actual_result": actual_result,
+                "home_score": home_goals, "away_score": away_goals,
+                "fixture_id": fixture_id
+            })
+    if updates:
+        with engine.begin() as connection:
+            connection.execute(
+                text("""
+                    UPDATE predictions
+                    SET status = :status, actual_result = :actual_result,
+                        home_score = :home_score, away_score = :away_score
+                    WHERE fixture_id = :fixture_id
+                """),
+                updates
+            )
+    return len(updates)
+
+
+# --- Historique Parquet (prédictions GitHub Actions) ---
+
+def pending_from_history(history, since):
+    """Identifiants PENDING de l'historique, par date de partition."""
+    df = history.read(columns=['prediction_date', 'fixture_id', 'status'], start=since.strftime('%Y-%m-%d'))
+    df = df[df['status'] == 'PENDING']
+    return {day: set(group['fixture_id'].astype(int)) for day, group in df.groupby('prediction_date')}
+
+
+def settle_history(history, pending_by_day, results):
+    """Réécrit les partitions dont au moins une prédiction a été réglée."""
+    settled = 0
+    for day, fixture_ids in pending_by_day.items():
+        if not fixture_ids & results.keys():
+            continue
+        df = history.read_partition(day)
+        for index in df.index[df['status'] == 'PENDING']:
+            fixture_id = int(df.at[index, 'fixture_id'])
+            if fixture_id not in results:
+                continue
+            status, actual_result, home_goals, away_goals = _settle_row(
+                df.at[index, 'predicted_outcome'], df.at[index, 'match_desc'], results[fixture_id])
+            df.at[index, 'status'] = status
+            df.at[index, 'actual_result'] = actual_result
+            df.at[index, 'home_score'] = home_goals
+            df.at[index, 'away_score'] = away_goals
+            settled += 1
+        history.write_partition(day, df)
+    return settled
+
+
+def settle_all(fetch, engine=None, history=None, days=7, cache=None):
+    """
+    Règle en une passe toutes les prédictions PENDING des `days` derniers jours.
+
+    Returns:
+        dict: Nombre de prédictions réglées par source et d'appels API
+        effectués (hors réponses servies par le cache disque `cache`,
+        le cache partagé par défaut).
+    """
+    since = datetime.now() - timedelta(days=days)
+
+    db_pending = pending_from_database(engine, since) if engine is not None else []
+    history_pending = pending_from_history(history, since) if history is not None else {}
+
+    fixture_ids = {row[0] for row in db_pending}
+    for day_ids in history_pending.values():
+        fixture_ids |= day_ids
+
+    results, api_calls = fetch_results(fetch, fixture_ids, cache if cache is not None else get_shared_cache())
+    return {
+        'database': settle_database(engine, db_pending, results) if engine is not None else 0,
+        'history': settle_history(history, history_pending, results) if history is not None else 0,
+        'pending': len(fixture_ids),
+        'requests': api_calls,
+    }
+
+
+def main():
+    """Règlement en ligne de commande (clé API lue dans l'environnement)."""
+    from daily_predictions_generator import DailyPredictionsGenerator, logger
+
+    parser = argparse.ArgumentParser(description="Règle les prédictions en attente.")
+    parser.add_argument('--days', type=int, default=7, help="Ancienneté maximale des prédictions à régler")
+    parser.add_argument('--db', default=prediction_store.DEFAULT_DB_PATH, help="Base SQLite des prédictions Streamlit")
+    parser.add_argument('--history', default=DEFAULT_HISTORY_PATH, help="Dossier de l'historique Parquet GitHub Actions")
+    args = parser.parse_args()
+
+    api_key = os.environ.get('RAPIDAPI_KEY') or os.environ.get('API_FOOTBALL_KEY')
+    if not api_key:
+        logger.error("⚠️ Clé API non trouvée (RAPIDAPI_KEY ou API_FOOTBALL_KEY)")
+        sys.exit(1)
+
+    generator = DailyPredictionsGenerator(api_key)
+    engine = prediction_store.create_store_engine(args.db) if os.path.exists(args.db) else None
+    summary = settle_all(generator.make_api_request, engine=engine, history=HistoryStore(args.history), days=args.days)
+    logger.info(f"🏁 Règlement: {summary['pending']} matchs en attente, {summary['requests']} requêtes, "
+                f"{summary['database']} réglés en base, {summary['history']} réglés dans l'historique")
+
+
+if __name__ == "__main__":
+    main()
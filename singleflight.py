@@ -0,0 +1,62 @@
+# Fichier : singleflight.py
+
+"""
+Fusion des requêtes identiques en cours (« single flight »).
+
+Quand plusieurs threads demandent la même ressource en même temps (même
+équipe dans deux matchs, sessions Streamlit concurrentes...), un seul appel
+amont est effectué ; les autres threads attendent et reçoivent le même
+résultat.
+"""
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Regroupe les appels concurrents portant sur la même clé."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.saved = 0
+
+    def do(self, key, fn):
+        """
+        Exécute `fn` une seule fois pour tous les appelants concurrents de `key`.
+
+        Returns:
+            tuple[object, bool]: Le résultat et True s'il a été partagé avec
+            un appel déjà en cours (aucun appel amont pour cet appelant).
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.saved += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
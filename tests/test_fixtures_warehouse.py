@@ -0,0 +1,111 @@
+# Fichier : tests/test_fixtures_warehouse.py
+
+"""
+Couverture de l'entrepôt local : une paire dont le H2H est couvert et des
+équipes dont la forme est couverte sont servies sans appel API.
+"""
+import os
+import sys
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fixtures_warehouse import FixturesWarehouse, season_for  # noqa: E402
+from prefetch_planner import build_plan, execute_plan  # noqa: E402
+
+LEAGUE_ID = 39
+
+
+def _fixture(fixture_id, day, home_id, away_id, goals=(1, 0), status='FT'):
+    kickoff = datetime.combine(day, datetime.min.time()) + timedelta(hours=15)
+    return {
+        'fixture': {'id': fixture_id, 'timestamp': int(kickoff.timestamp()), 'status': {'short': status}},
+        'league': {'id': LEAGUE_ID, 'season': season_for(day)},
+        'teams': {'home': {'id': home_id, 'name': f"Équipe {home_id}"},
+                  'away': {'id': away_id, 'name': f"Équipe {away_id}"}},
+        'goals': {'home': goals[0], 'away': goals[1]},
+    }
+
+
+class FakeApi:
+    """Fonction d'appel (endpoint, params) qui enregistre les requêtes."""
+
+    def __init__(self, by_date=None, h2h=None, season=None):
+        self.by_date = by_date or {}
+        self.h2h = h2h or []
+        self.season = season or []
+        self.calls = []
+
+    def __call__(self, endpoint, params, priority=None):
+        self.calls.append((endpoint, dict(params)))
+        if endpoint == 'fixtures/headtohead':
+            response = self.h2h
+        elif endpoint == 'fixtures' and 'date' in params:
+            response = self.by_date.get(params['date'], [])
+        elif endpoint == 'fixtures' and 'season' in params:
+            response = self.season
+        else:
+            response = []
+        return {'response': response, 'paging': {'current': 1, 'total': 1}}
+
+    def endpoints(self):
+        return [endpoint for endpoint, _ in self.calls]
+
+
+def _today_fixture(home_id, away_id):
+    fixture = _fixture(9999, date.today(), home_id, away_id, goals=(None, None), status='NS')
+    fixture['league']['name'] = "Premier League"
+    return fixture
+
+
+def test_covered_pair_is_served_without_api_call(tmp_path):
+    warehouse = FixturesWarehouse(str(tmp_path / 'fixtures.sqlite'))
+    today = date.today()
+    days = [today - timedelta(days=offset) for offset in range(3, 0, -1)]
+    api = FakeApi(by_date={days[-1].isoformat(): [_fixture(3, days[-1], 1, 2, (2, 2))]},
+                  h2h=[_fixture(1, today - timedelta(days=400), 1, 2), _fixture(2, today - timedelta(days=200), 2, 1)])
+    for day in days:
+        warehouse.ingest_date(api, day, [LEAGUE_ID])
+
+    # Première prédiction de la paire : H2H demandé à l'API puis enregistré
+    plan = build_plan([_today_fixture(1, 2)], warehouse=warehouse, include_odds=False)
+    assert plan.api_pairs == {(1, 2)}
+    execute_plan(plan, api)
+    assert api.endpoints().count('fixtures/headtohead') == 1
+    assert warehouse.covers_head_to_head(2, 1)
+
+    # Suivante : servie par l'entrepôt, y compris la confrontation ingérée depuis
+    api.calls.clear()
+    plan = build_plan([_today_fixture(1, 2)], warehouse=warehouse, include_odds=False)
+    assert plan.api_pairs == set() and plan.local_pairs == {(1, 2)}
+    data = execute_plan(plan, api)
+    assert 'fixtures/headtohead' not in api.endpoints()
+    assert [match['fixture']['id'] for match in data.head_to_head(2, 1)['response']] == [3, 2, 1]
+
+
+def test_pair_not_covered_when_coverage_stops_before_cutoff(tmp_path):
+    warehouse = FixturesWarehouse(str(tmp_path / 'fixtures.sqlite'))
+    yesterday = date.today() - timedelta(days=1)
+    warehouse.record_head_to_head(1, 2, {'response': []},
+                                  known_until=int(datetime.combine(yesterday, datetime.min.time()).timestamp()))
+    # Aucune journée ingérée depuis : une confrontation d'hier pourrait manquer
+    assert not warehouse.covers_head_to_head(1, 2)
+    warehouse.ingest_date(FakeApi(), yesterday - timedelta(days=1), [LEAGUE_ID])
+    warehouse.ingest_date(FakeApi(), yesterday, [LEAGUE_ID])
+    assert warehouse.covers_head_to_head(1, 2)
+
+
+def test_bootstrap_marks_covered_days(tmp_path):
+    warehouse = FixturesWarehouse(str(tmp_path / 'fixtures.sqlite'))
+    until = date.today() - timedelta(days=1)
+    season = [_fixture(100 + index, until - timedelta(days=7 * (6 - index)), 1 + index % 2, 3 + index % 3)
+              for index in range(6)]
+    api = FakeApi(season=season)
+
+    assert warehouse.sync(api, [LEAGUE_ID], until=until) == 6
+    assert warehouse.coverage() is not None
+    assert warehouse.covers_form(1, n=3)
+    # Équipe 2 : seulement 3 matchs ingérés, la forme sur 5 reste demandée à l'API
+    assert not warehouse.covers_form(2, n=5)
+    plan = build_plan([_today_fixture(1, 3)], form_window=3, warehouse=warehouse, include_odds=False)
+    assert plan.local_teams == {1}
@@ -0,0 +1,82 @@
+# Fichier : tests/test_predict_batch.py
+
+"""
+predict_batch doit reproduire, match par match, les scores de forme et de
+H2H de _calculate_form_score / _calculate_h2h_score et la décision de
+predict_match, à partir des seuls résultats antérieurs au coup d'envoi.
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import prediction_engine  # noqa: E402
+
+
+def _api_match(row):
+    return {
+        'teams': {'home': {'id': int(row.home_team_id)}, 'away': {'id': int(row.away_team_id)}},
+        'goals': {'home': int(row.goals_home), 'away': int(row.goals_away)},
+    }
+
+
+def _results_frame(seed, size=400, teams=12):
+    """Matchs terminés au format de FixturesWarehouse.results_frame (coups d'envoi distincts)."""
+    rng = np.random.default_rng(seed)
+    home = rng.integers(1, teams + 1, size)
+    away = (home + rng.integers(1, teams, size) - 1) % teams + 1
+    return pd.DataFrame({
+        'fixture_id': np.arange(1, size + 1),
+        'league_id': 39,
+        'kickoff_ts': 1_700_000_000 + np.arange(size) * 3600,
+        'home_team_id': home,
+        'away_team_id': away,
+        'goals_home': rng.integers(0, 4, size),
+        'goals_away': rng.integers(0, 4, size),
+    })
+
+
+def _expected(fixture, results):
+    """Scores et issue calculés par le chemin match par match."""
+    before = results[results['kickoff_ts'] < fixture.kickoff_ts]
+    scores = {}
+    for side in ('home', 'away'):
+        team_id = getattr(fixture, f'{side}_team_id')
+        played = before[(before['home_team_id'] == team_id) | (before['away_team_id'] == team_id)]
+        last = {'response': [_api_match(row) for row in played.tail(prediction_engine.FORM_WINDOW).itertuples()]}
+        scores[side] = prediction_engine._calculate_form_score(team_id, last)
+
+    pair = {fixture.home_team_id, fixture.away_team_id}
+    meetings = before[before['home_team_id'].isin(pair) & before['away_team_id'].isin(pair)]
+    h2h = {'response': [_api_match(row) for row in meetings.itertuples()]}
+    h2h_score = prediction_engine._calculate_h2h_score(h2h, fixture.home_team_id)
+
+    final_home = scores['home'] * prediction_engine.FORM_WEIGHT + h2h_score * prediction_engine.H2H_WEIGHT
+    final_away = scores['away'] * prediction_engine.FORM_WEIGHT
+    if final_home > final_away + prediction_engine.DECISION_MARGIN:
+        outcome = 'HOME'
+    elif final_away > final_home + prediction_engine.DECISION_MARGIN:
+        outcome = 'AWAY'
+    else:
+        outcome = 'DRAW'
+    return scores['home'], scores['away'], h2h_score, outcome
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_predict_batch_matches_per_fixture_path(seed):
+    results = _results_frame(seed)
+    # Les matchs à prédire sont des matchs de l'entrepôt : seul le passé compte
+    fixtures = results.iloc[::-3][['fixture_id', 'kickoff_ts', 'home_team_id', 'away_team_id']]
+
+    predicted = prediction_engine.predict_batch(fixtures, results)
+
+    assert list(predicted['fixture_id']) == list(fixtures['fixture_id'])
+    for fixture, row in zip(fixtures.itertuples(index=False), predicted.itertuples(index=False)):
+        home_form, away_form, h2h_score, outcome = _expected(fixture, results)
+        assert (row.home_form, row.away_form, row.h2h_score) == (home_form, away_form, h2h_score), fixture
+        assert row.outcome == outcome, fixture
+        assert row.predicted_outcome == prediction_engine.OUTCOME_LABELS[outcome]
@@ -0,0 +1,97 @@
+# Fichier : tests/test_prediction_worker.py
+
+"""
+Générations en arrière-plan : un seul worker à la fois, pas de relance
+implicite, heartbeat continu, journée partielle jamais marquée complète.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import prediction_worker  # noqa: E402
+from fixtures_warehouse import FixturesWarehouse  # noqa: E402
+from prediction_cache import PredictionCache  # noqa: E402
+from prediction_worker import GenerationJobs, PredictionWorker  # noqa: E402
+
+
+def test_failed_job_is_only_reclaimed_on_retry(tmp_path):
+    jobs = GenerationJobs(str(tmp_path / 'cache.sqlite'))
+    assert jobs.claim('2026-10-18', 'a')
+    assert not jobs.claim('2026-10-18', 'b')
+
+    jobs.finish('2026-10-18', 'a', 'failed', "Erreur API")
+    assert not jobs.claim('2026-10-18', 'b')
+    assert jobs.claim('2026-10-18', 'b', retry=True)
+    assert jobs.get('2026-10-18')['owner'] == 'b'
+
+
+def test_heartbeat_advances_during_a_long_step(tmp_path, monkeypatch):
+    monkeypatch.setattr(prediction_worker, 'JOB_HEARTBEAT_SECONDS', 0.05)
+    jobs = GenerationJobs(str(tmp_path / 'cache.sqlite'))
+    worker = PredictionWorker(None, [], jobs=jobs, cache=object())
+    heartbeats = []
+
+    def slow_generate(match_date):
+        started = jobs.get(match_date)['heartbeat_at']
+        time.sleep(0.3)
+        heartbeats.append(jobs.get(match_date)['heartbeat_at'] - started)
+
+    monkeypatch.setattr(worker, 'generate', slow_generate)
+    assert worker.ensure_started('2026-10-18')
+    worker._thread.join()
+
+    assert heartbeats[0] > 0
+    assert jobs.get('2026-10-18')['status'] == 'done'
+
+
+class _Quota:
+    def __init__(self, budget):
+        self._budget = budget
+
+    def budget(self, priority):
+        return self._budget
+
+
+class _NoResponseCache:
+    def contains(self, endpoint, params):
+        return False
+
+
+def _fixture(fixture_id, home_id, away_id, hour):
+    return {
+        'fixture': {'id': fixture_id, 'timestamp': 1_790_000_000 + hour * 3600, 'status': {'short': 'NS'},
+                    'venue': {'name': None, 'city': None}},
+        'league': {'id': 39, 'name': "Premier League", 'season': 2026},
+        'teams': {'home': {'id': home_id, 'name': f"Équipe {home_id}"},
+                  'away': {'id': away_id, 'name': f"Équipe {away_id}"}},
+        'goals': {'home': None, 'away': None},
+    }
+
+
+def test_day_left_incomplete_when_quota_drops_fixtures(tmp_path, monkeypatch):
+    fixtures = [_fixture(1, 1, 2, 0), _fixture(2, 3, 4, 1)]
+
+    def fetch(endpoint, params, priority=None):
+        response = fixtures if endpoint == 'fixtures' and 'date' in params else []
+        return {'response': response, 'paging': {'current': 1, 'total': 1}}
+
+    # Un match : deux formes, un H2H et une page de cotes
+    monkeypatch.setattr(prediction_worker, 'get_shared_quota', lambda: _Quota(4))
+    monkeypatch.setattr(prediction_worker, 'get_shared_cache', lambda: _NoResponseCache())
+    monkeypatch.setattr(prediction_worker, 'get_shared_warehouse',
+                        lambda: FixturesWarehouse(str(tmp_path / 'fixtures.sqlite')))
+    cache = PredictionCache(str(tmp_path / 'predictions.sqlite'))
+    jobs = GenerationJobs(str(tmp_path / 'predictions.sqlite'))
+    worker = PredictionWorker(fetch, [39], jobs=jobs, cache=cache)
+
+    assert worker.ensure_started('2026-10-18')
+    worker._thread.join()
+
+    job = jobs.get('2026-10-18')
+    assert job['status'] == 'partial' and job['fixtures_total'] == 1
+    assert not cache.is_complete('2026-10-18')
+    assert [match['fixture']['fixture']['id'] for match in cache.load_day('2026-10-18')[0]["Premier League"]] == [1]
+    # Pas de relance implicite : seul le bouton de la page relance
+    assert not worker.ensure_started('2026-10-18')
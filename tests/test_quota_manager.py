@@ -0,0 +1,43 @@
+# Fichier : tests/test_quota_manager.py
+
+"""Le quota enregistré ne remonte pas quand des réponses arrivent dans le désordre."""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import quota_manager  # noqa: E402
+from quota_manager import PRIORITY_CRITICAL, QuotaManager  # noqa: E402
+
+
+def _headers(remaining, reset_in=3600):
+    return {
+        'x-ratelimit-requests-limit': '7500',
+        'x-ratelimit-requests-remaining': str(remaining),
+        'x-ratelimit-requests-reset': str(reset_in),
+    }
+
+
+def test_out_of_order_responses_keep_lowest_remaining(tmp_path, monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(quota_manager.time, 'time', lambda: now[0])
+    quota = QuotaManager(str(tmp_path / 'quota.sqlite'))
+
+    quota.record(_headers(100))
+    quota.record(_headers(120, reset_in=3599))  # réponse plus ancienne, reçue en retard
+    assert quota.budget(PRIORITY_CRITICAL) == 100
+    quota.record(_headers(90))
+    assert quota.budget(PRIORITY_CRITICAL) == 90
+
+    # Nouvelle fenêtre : le restant est remplacé
+    now[0] += 3601
+    quota.record(_headers(7400, reset_in=86400))
+    assert quota.budget(PRIORITY_CRITICAL) == 7400
+
+
+def test_throttling_blocks_minute_scope(tmp_path):
+    quota = QuotaManager(str(tmp_path / 'quota.sqlite'))
+    quota.record({'x-ratelimit-limit': '300', 'x-ratelimit-remaining': '250'})
+    quota.record_throttled('30')
+    row = quota._conn.execute("SELECT quota_limit, remaining FROM api_quota WHERE scope = 'minute'").fetchone()
+    assert row == (300, 0)
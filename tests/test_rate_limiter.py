@@ -0,0 +1,60 @@
+# Fichier : tests/test_rate_limiter.py
+
+"""
+Le limiteur ne laisse passer, sur toute fenêtre glissante de la période,
+pas plus de requêtes que la limite, et atteint exactement ce débit.
+"""
+import bisect
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rate_limiter import RateLimiter  # noqa: E402
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def _grants(limiter, clock, count):
+    times = []
+    for _ in range(count):
+        limiter.acquire()
+        times.append(clock.now)
+    return times
+
+
+def _max_in_window(times, period):
+    """Plus grand nombre de requêtes sur une fenêtre [t, t + period[."""
+    return max(bisect.bisect_left(times, start + period) - index for index, start in enumerate(times))
+
+
+@pytest.mark.parametrize('per_second,per_minute', [(10, 300), (1, 30), (1, 1000), (3, 5)])
+def test_exact_count_per_window(per_second, per_minute):
+    clock = FakeClock()
+    limiter = RateLimiter(per_second, per_minute, clock=clock, sleep=clock.sleep)
+    times = _grants(limiter, clock, 3 * min(per_minute, 60 * per_second))
+
+    assert _max_in_window(times, 1.0) == min(per_second, per_minute)
+    assert _max_in_window(times, 60.0) == min(per_minute, 60 * per_second)
+
+
+def test_full_rate_reached():
+    clock = FakeClock()
+    limiter = RateLimiter(10, 10_000, clock=clock, sleep=clock.sleep)
+    times = _grants(limiter, clock, 101)
+
+    # 10 requêtes immédiatement puis 10 par seconde : la 101e part à t = 10 s
+    assert times[:10] == [0.0] * 10
+    assert times[-1] == pytest.approx(10.0)
+    assert limiter.total_wait == pytest.approx(sum(times[index] - times[index - 1] for index in range(1, 101)))
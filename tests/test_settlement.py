@@ -0,0 +1,34 @@
+# Fichier : tests/test_settlement.py
+
+"""Le règlement ne compte comme appels API que les lots absents du cache disque."""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from settlement import IDS_PER_REQUEST, fetch_results  # noqa: E402
+
+
+class _Cache:
+    def __init__(self, cached):
+        self.cached = cached
+
+    def contains(self, endpoint, params):
+        return params['ids'] in self.cached
+
+
+def _finished(fixture_id):
+    return {'fixture': {'id': fixture_id, 'status': {'short': 'FT'}}, 'goals': {'home': 2, 'away': 1}}
+
+
+def test_cached_batches_are_not_counted_as_api_calls():
+    fixture_ids = range(1, 2 * IDS_PER_REQUEST + 2)
+    first_batch = '-'.join(str(fixture_id) for fixture_id in range(1, IDS_PER_REQUEST + 1))
+
+    def fetch(endpoint, params):
+        return {'response': [_finished(int(fixture_id)) for fixture_id in params['ids'].split('-')]}
+
+    results, api_calls = fetch_results(fetch, fixture_ids, _Cache({first_batch}))
+    assert len(results) == len(fixture_ids) and results[1] == (2, 1)
+    assert api_calls == 2
+    assert fetch_results(fetch, fixture_ids)[1] == 3